@@ -1,6 +1,6 @@
-from werkzeug.security import generate_password_hash
 from backend.models import User
 from backend.externals import db
+from backend.password_hashing import hash_password
 
 def create_admin_user():
     admin_user = User.query.filter_by(email='admin@admin.com').first()
@@ -9,7 +9,7 @@ def create_admin_user():
         admin_user = User(
             username='admin',
             email='admin@admin.com',
-            password=generate_password_hash('admin'),
+            password=hash_password('admin'),
             is_admin=True
         )
         
@@ -1,13 +1,34 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask import request, current_app
 from werkzeug.utils import secure_filename
 import os
 import hashlib
+import random
 
-from backend.models import AIDatabase, User
+from backend.models import AIDatabase
 from backend.externals import db
+from backend.fast_serialization import list_response
 from backend.constants import UPLOAD_FOLDER
+from backend.utils.compressed_blob import COMPRESSED_SUFFIX, compress_file, logical_path
+from backend.utils.storage_backends import publish_file, stat_uri
+from backend.metrics import timed_phase
+from backend.principal_cache import current_principal
+from backend.storage_quota import check_quota
+from backend.upload_preflight import DATABASE_SIGNATURES, upload_preflight
+from backend.storage_gc import bulk_delete
+from backend.rate_limiter import rate_limited
+from backend.utils.dataset_index import (
+    DEFAULT_STRIDE,
+    LINE_FORMATS,
+    UnsupportedFormat,
+    INDEX_SUFFIX,
+    build_row_index,
+    detect_format,
+    index_path_for,
+    preview_rows,
+    sample_rows,
+)
 
 databases_ns = Namespace('databases', description='A namespace for AI Databases')
 
@@ -22,14 +43,62 @@ db_model = databases_ns.model(
         'data_hash': fields.String(),      # updated name
         'merkle_root': fields.String(),
         'size_mb': fields.Float(),
+        'integrity_status': fields.String(),
+        'verified_at': fields.String(),
         'description': fields.String(),
         'user_id': fields.Integer(required=True),
         'created_at': fields.String()
     }
 )
 
+MAX_PREVIEW_ROWS = 1000
+
+
+def _publish(stored_path):
+    """ Hand the staged blob (and its row index) to the configured storage backend; returns the uri """
+    key = os.path.relpath(stored_path, UPLOAD_FOLDER)
+    idx_path = index_path_for(stored_path)
+    storage_uri = publish_file(stored_path, key)
+    if not storage_uri.startswith("file://") and os.path.exists(idx_path):
+        publish_file(idx_path, logical_path(key) + INDEX_SUFFIX)
+    return storage_uri
+
+
+def _blob_available(db_entry):
+    try:
+        return bool(db_entry.storage_uri) and stat_uri(db_entry.storage_uri) is not None
+    except ValueError:
+        return False  # storage scheme not handled by this server
+
+
+def _maybe_compress(path):
+    """
+    Store `path` zstd-compressed (seekable frames) when STORAGE_COMPRESSION is enabled
+    and it actually saves space. Returns the path of the stored blob.
+    """
+    if current_app.config.get("STORAGE_COMPRESSION") != "zstd":
+        return path
+    compressed_path = path + COMPRESSED_SUFFIX
+    try:
+        raw_size, compressed_size = compress_file(
+            path, compressed_path, level=current_app.config.get("STORAGE_COMPRESSION_LEVEL", 3)
+        )
+    except Exception:
+        current_app.logger.exception("Compressing %s failed; storing raw", path)
+        if os.path.exists(compressed_path):
+            os.remove(compressed_path)
+        return path
+
+    if compressed_size >= raw_size * current_app.config.get("STORAGE_COMPRESSION_MIN_RATIO", 0.9):
+        # not worth it (already compressed data, tiny files)
+        os.remove(compressed_path)
+        return path
+    os.remove(path)
+    return compressed_path
+
+
 # helper: merkle root by chunking file (returns hex string)
-def merkle_root_from_file(path, chunk_size=4 * 1024 * 1024):
+def merkle_root_from_file(path, chunk_size=4 * 1024 * 1024, leaves_out=None):
     def sha256_bytes(b):
         return hashlib.sha256(b).digest()
 
@@ -40,6 +109,9 @@ def merkle_root_from_file(path, chunk_size=4 * 1024 * 1024):
             if not chunk:
                 break
             leaves.append(sha256_bytes(chunk))
+    if leaves_out is not None:
+        # leaf digests are stored for the integrity scrubber
+        leaves_out.extend(leaves)
 
     if not leaves:
         return hashlib.sha256(b"").hexdigest()
@@ -59,10 +131,11 @@ def merkle_root_from_file(path, chunk_size=4 * 1024 * 1024):
 @databases_ns.route('/databases')
 class DatabaseListResource(Resource):
 
-    @databases_ns.marshal_list_with(db_model)
+    @databases_ns.response(200, "Success", [db_model])
     def get(self):
         """ Return all databases """
-        return AIDatabase.query.all()
+        # column select + orjson instead of marshal_list_with (same JSON, documented schema unchanged)
+        return list_response(AIDatabase, db_model)
 
 
 @databases_ns.route('/databases/upload')
@@ -71,18 +144,20 @@ class DatabaseUploadResource(Resource):
     @databases_ns.marshal_with(db_model)
     # request should be multipart/form-data: file + name + purpose + model_name (optional) + description (optional)
     @jwt_required()
+    @rate_limited("upload")
+    @upload_preflight(required=("name", "purpose"), signatures=DATABASE_SIGNATURES)
     def post(self):
         """ Upload a new database file """
-        # get authenticated user id from JWT (assumes identity is user id)
-        identity = get_jwt_identity()
-        if identity is None:
-            return {"message": "Unauthorized"}, 401
-
-        # find user
-        user = db.session.get(User, identity)
+        # authenticated user from the JWT claims (identity is the user id)
+        user = current_principal()
         if not user:
             return {"message": "The user does not exist"}, 404
 
+        # quota check before the multipart body is parsed / spooled to disk
+        over_quota = check_quota(user.id)
+        if over_quota:
+            return over_quota
+
         # multipart file
         file = request.files.get('file')
         name = request.form.get('name')
@@ -100,20 +175,44 @@ class DatabaseUploadResource(Resource):
         # secure filename and save
         filename = secure_filename(file.filename)
         dest_path = os.path.join(dest_dir, filename)
-        file.save(dest_path)
+        with timed_phase("databases", "save"):
+            file.save(dest_path)
+
+        # Content-Length may be missing (chunked) or cover more than the file: check the real size
+        over_quota = check_quota(user.id, os.path.getsize(dest_path))
+        if over_quota:
+            os.remove(dest_path)
+            return over_quota
 
         # compute hash (streaming) and size
-        data_hash = AIDatabase.calculate_hash(dest_path)
+        with timed_phase("databases", "hash"):
+            data_hash = AIDatabase.calculate_hash(dest_path)
         size_mb = os.path.getsize(dest_path) / (1024 * 1024)
 
         # optional merkle root for chunked verification
-        try:
-            merkle = merkle_root_from_file(dest_path)
-        except Exception:
-            merkle = None
-
-        # storage_uri (local file). If you later upload to IPFS/S3, replace this with the proper URI.
-        storage_uri = f"file://{dest_path}"
+        leaves = []
+        with timed_phase("databases", "merkle"):
+            try:
+                merkle = merkle_root_from_file(dest_path, leaves_out=leaves)
+            except Exception:
+                merkle = None
+
+        # sparse row-offset index for line based formats (used by preview / sample)
+        with timed_phase("databases", "index"):
+            try:
+                fmt = detect_format(dest_path)
+                if fmt in LINE_FORMATS:
+                    build_row_index(dest_path, fmt, current_app.config.get("DATASET_INDEX_STRIDE", DEFAULT_STRIDE))
+            except Exception:
+                current_app.logger.exception("Building row index failed")
+
+        # optional compressed tier: hashes / merkle / row index above are over the raw bytes
+        with timed_phase("databases", "compress"):
+            stored_path = _maybe_compress(dest_path)
+
+        # file:// for the local backend, s3://bucket/key when STORAGE_BACKEND = "s3"
+        with timed_phase("databases", "publish"):
+            storage_uri = _publish(stored_path)
 
         # create DB entry
         db_entry = AIDatabase(
@@ -123,11 +222,13 @@ class DatabaseUploadResource(Resource):
             storage_uri=storage_uri,
             data_hash=data_hash,
             merkle_root=merkle,
+            merkle_leaves=b"".join(leaves) if merkle else None,
             size_mb=size_mb,
             description=description,
             user_id=user.id
         )
-        db_entry.save()
+        with timed_phase("databases", "db_commit"):
+            db_entry.save()
 
         return db_entry, 201
 
@@ -148,12 +249,16 @@ class DatabaseResource(Resource):
         db_entry = AIDatabase.query.get_or_404(database_id)
 
         # Only uploader or admin should be able to update — basic check
-        identity = get_jwt_identity()
-        user = db.session.get(User, identity)
+        user = current_principal()
         if (not user) or (user.id != db_entry.user_id and not user.is_admin):
             return {"message": "Forbidden"}, 403
 
         data = request.get_json()
+        # size_mb feeds the owner's storage usage; the rest describes the stored file
+        immutable = {"storage_uri", "data_hash", "merkle_root", "merkle_leaves", "size_mb", "user_id",
+                     "integrity_status", "verified_at", "scrub_cursor", "created_at"}
+        for k in immutable:
+            data.pop(k, None)
         db_entry.update(**data)
 
         return db_entry, 200
@@ -163,10 +268,68 @@ class DatabaseResource(Resource):
         """ Delete a database and its file """
         db_entry = AIDatabase.query.get_or_404(database_id)
 
-        identity = get_jwt_identity()
-        user = db.session.get(User, identity)
+        user = current_principal()
         if (not user) or (user.id != db_entry.user_id and not user.is_admin):
             return {"message": "Forbidden"}, 403
 
         db_entry.delete()
         return {"message": "Database deleted successfully."}, 200
+
+
+@databases_ns.route('/databases/bulk-delete')
+class DatabaseBulkDeleteResource(Resource):
+    @jwt_required()
+    def post(self):
+        """ Delete databases by {"ids": [...]} or {"filter": {...}} in one transaction; files are removed by the GC """
+        user = current_principal()
+        if not user:
+            return {"message": "User not found"}, 404
+        return bulk_delete(AIDatabase, request.get_json(silent=True), user)
+
+
+@databases_ns.route('/databases/<int:database_id>/preview')
+class DatabasePreviewResource(Resource):
+
+    def get(self, database_id):
+        """ Return the first rows of a database (?rows=N) """
+        db_entry = AIDatabase.query.get_or_404(database_id)
+        rows = request.args.get('rows', default=20, type=int)
+        if rows is None or rows < 1:
+            return {"message": "rows must be a positive integer"}, 400
+        rows = min(rows, MAX_PREVIEW_ROWS)
+
+        if not _blob_available(db_entry):
+            return {"message": "Database file is not available"}, 404
+
+        try:
+            result = preview_rows(db_entry.storage_uri, rows, current_app.config.get("DATASET_INDEX_STRIDE", DEFAULT_STRIDE))
+        except UnsupportedFormat as e:
+            return {"message": str(e)}, 415
+        result["id"] = db_entry.id
+        return result, 200
+
+
+@databases_ns.route('/databases/<int:database_id>/sample')
+class DatabaseSampleResource(Resource):
+
+    def get(self, database_id):
+        """ Return a reproducible random sample of a database (?n=N&seed=S) """
+        db_entry = AIDatabase.query.get_or_404(database_id)
+        n = request.args.get('n', default=20, type=int)
+        seed = request.args.get('seed', type=int)
+        if n is None or n < 1:
+            return {"message": "n must be a positive integer"}, 400
+        n = min(n, MAX_PREVIEW_ROWS)
+        if seed is None:
+            # return the generated seed so the client can reproduce the sample
+            seed = random.randrange(2 ** 32)
+
+        if not _blob_available(db_entry):
+            return {"message": "Database file is not available"}, 404
+
+        try:
+            result = sample_rows(db_entry.storage_uri, n, seed, current_app.config.get("DATASET_INDEX_STRIDE", DEFAULT_STRIDE))
+        except UnsupportedFormat as e:
+            return {"message": str(e)}, 415
+        result["id"] = db_entry.id
+        return result, 200
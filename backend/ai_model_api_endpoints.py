@@ -5,19 +5,42 @@ import json
 import subprocess
 import time
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request, current_app
+from flask_jwt_extended import jwt_required
+from flask import Response, request, current_app
+from werkzeug.exceptions import BadRequest
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
 from werkzeug.utils import secure_filename
 
 from backend.externals import db
-from backend.models import AIModel, User
-from backend.constants import UPLOAD_FOLDER
+from backend.fast_serialization import list_response
+from backend.models import AIModel, ModelChunk, Rental, User, size_mb_to_bytes
+from backend.constants import CHUNK_STORE_FOLDER, UPLOAD_FOLDER
 from backend.utils.hash_utils import (
     canonical_state_dict_hash,
     file_sha256_stream,
     merkle_root_from_file,
 )
+from backend.utils.storage_backends import publish_file
+from backend.metrics import observe_chain_call, timed_phase
+from backend.principal_cache import current_principal
+from backend.storage_quota import check_quota
+from backend.upload_preflight import MAGIC_BYTES, MODEL_SIGNATURES, file_error, upload_preflight
+from backend.storage_gc import bulk_delete
+from backend.rental_analytics import LEADERBOARD_ORDER, leaderboard, model_stats, record_rental, uploader_stats
+from backend.model_conversion import (
+    CONVERTIBLE_EXT, SAFETENSORS_SUFFIX, SafetensorsError, convert_in_worker, iter_range, read_stored_header,
+)
+from backend.rate_limiter import rate_limited
+from backend import solana_client
+from backend.utils.chunk_store import (
+    CAS_SCHEME,
+    DEFAULT_AVG_SIZE,
+    DEFAULT_MAX_SIZE,
+    DEFAULT_MIN_SIZE,
+    ChunkStore,
+)
 
 models_ns = Namespace("models", description="A namespace for AI Models")
 
@@ -30,18 +53,27 @@ model_schema = models_ns.model(
         "model_hash": fields.String(),
         "merkle_root": fields.String(),
         "storage_uri": fields.String(),
+        "safetensors_uri": fields.String(),
         "price_lamports": fields.Integer(),
         "onchain_tx": fields.String(),
         "model_pda": fields.String(),
         "size_mb": fields.Float(),
+        "stored_size_mb": fields.Float(),
+        "parent_id": fields.Integer(),
         "status": fields.String(),
         "last_error": fields.String(),
+        "integrity_status": fields.String(),
+        "verified_at": fields.String(),
         "uploader_id": fields.Integer(required=True),
         "created_at": fields.String(),
     },
 )
 
+# single-model reads also carry the model card (kept out of the list to keep it small)
+model_detail_schema = models_ns.inherit("AIModelDetail", model_schema, {"model_card": fields.Raw()})
+
 ALLOWED_EXT = {"pt", "onnx", "bin", "tar", "zip", "pth", "ptm"}
+_BATCH_READ_SIZE = 1024 * 1024         # batch bodies are read from the request stream in 1 MiB chunks
 
 
 def _extract_last_json(text: str):
@@ -99,6 +131,9 @@ def _run_cli_and_parse_json(cmd, timeout=120):
     Raises RuntimeError on failure with stdout/stderr included.
     """
     proc = None
+    command = os.path.basename(cmd[1]) if len(cmd) > 1 else cmd[0]
+    start = time.perf_counter()
+    ok = False
     try:
         proc = subprocess.run(
             cmd,
@@ -112,6 +147,7 @@ def _run_cli_and_parse_json(cmd, timeout=120):
         out = proc.stdout or ""
         try:
             result = _extract_last_json(out)
+            ok = True
             return result
         except Exception as e:
             # include stdout/stderr for debugging
@@ -120,14 +156,18 @@ def _run_cli_and_parse_json(cmd, timeout=120):
         raise RuntimeError(f"CLI failed: stdout={e.stdout!r}, stderr={e.stderr!r}")
     except subprocess.TimeoutExpired as e:
         raise RuntimeError(f"CLI timed out: stdout={e.stdout!r}, stderr={e.stderr!r}")
+    finally:
+        observe_chain_call(command, time.perf_counter() - start, ok)
+
 
+def call_register_model(model_hash_hex, storage_uri, price_lamports, timeout=120, merkle_root_hex=None):
+    """Register on-chain (in-process client, or the Node.js CLI register_model.js) and return the JSON result."""
+    if current_app.config.get("CHAIN_CLIENT") == "python":
+        return solana_client.register_model(current_app.config, model_hash_hex, storage_uri, price_lamports,
+                                            merkle_root_hex)
 
-def call_register_model(model_hash_hex, storage_uri, price_lamports, uploader_wallet_path=None, timeout=120):
-    """Call Node.js CLI register_model.js and return JSON result."""
     cli_path = os.environ.get("REGISTER_MODEL_CLI", "blockchain/clients/register_model.js")
     cmd = ["node", cli_path, model_hash_hex, storage_uri, str(price_lamports)]
-    if uploader_wallet_path:
-        cmd.append(uploader_wallet_path)
 
     current_app.logger.debug("Calling register CLI: %s", " ".join(cmd))
     result = _run_cli_and_parse_json(cmd, timeout=timeout)
@@ -136,12 +176,39 @@ def call_register_model(model_hash_hex, storage_uri, price_lamports, uploader_wa
     return result
 
 
-def call_rent_model(model_hash_hex, renter_wallet_path=None, timeout=120):
-    """Call Node.js CLI rent_model.js and return txid."""
+def call_register_models(entries, timeout=120):
+    """
+    Register many (model_hash_hex, storage_uri, price_lamports, merkle_root_hex) at once.
+    Returns one result dict or exception per entry. The in-process client packs them into
+    shared transactions; the Node.js CLI gets one (concurrent) call per entry.
+    """
+    config = current_app.config
+    if config.get("CHAIN_CLIENT") == "python":
+        try:
+            return solana_client.register_models(config, entries)
+        except Exception as e:  # wallet / RPC setup failed: same error for every entry
+            return [e] * len(entries)
+
+    app = current_app._get_current_object()
+
+    def register(entry):
+        with app.app_context():
+            try:
+                return call_register_model(entry[0], entry[1], entry[2], timeout)
+            except Exception as e:
+                return e
+
+    with ThreadPoolExecutor(max_workers=config.get("CHAIN_CLI_CONCURRENCY", 4)) as pool:
+        return list(pool.map(register, entries))
+
+
+def call_rent_model(model_hash_hex, timeout=120, model_pda=None):
+    """Rent on-chain (in-process client, or the Node.js CLI rent_model.js) and return the txid."""
+    if current_app.config.get("CHAIN_CLIENT") == "python":
+        return solana_client.rent_model(current_app.config, model_hash_hex, model_pda)["txid"]
+
     cli_path = os.environ.get("RENT_MODEL_CLI", "blockchain/clients/rent_model.js")
     cmd = ["node", cli_path, model_hash_hex]
-    if renter_wallet_path:
-        cmd.append(renter_wallet_path)
 
     current_app.logger.debug("Calling rent CLI: %s", " ".join(cmd))
     result = _run_cli_and_parse_json(cmd, timeout=timeout)
@@ -150,24 +217,245 @@ def call_rent_model(model_hash_hex, renter_wallet_path=None, timeout=120):
     return result.get("txid")
 
 
+def _ingest_model_file(dest_path, config, logger):
+    """
+    Hash, merkle and store one staged model file (chunk store or storage backend).
+    Needs no app / request context, so batch uploads run it on a thread pool.
+    """
+    ext = dest_path.rsplit(".", 1)[-1].lower()
+
+    # torch checkpoints: safetensors copy + canonical hash + model card in one pass, in a bounded-memory worker process
+    model_hash, safetensors_path, model_card = None, None, None
+    if ext in CONVERTIBLE_EXT and config.get("MODEL_SAFETENSORS", True):
+        try:
+            with timed_phase("models", "convert"):
+                model_hash, safetensors_path, model_card = convert_in_worker(dest_path, config)
+        except Exception as e:
+            logger.warning("safetensors conversion failed: %s; keeping only the checkpoint", e)
+
+    if model_hash is None:
+        with timed_phase("models", "hash"):
+            try:
+                if ext in CONVERTIBLE_EXT:
+                    import torch
+                    obj = torch.load(dest_path, map_location="cpu")
+                    card = {}
+                    model_hash = canonical_state_dict_hash(obj, card_out=card)
+                    model_card = model_card or card
+                else:
+                    model_hash = file_sha256_stream(dest_path)
+            except Exception as e:
+                logger.warning(
+                    "canonical hash failed: %s; falling back to streaming sha256", e
+                )
+                model_hash = file_sha256_stream(dest_path)
+
+    # generate a unique hash for on-chain PDA (avoid duplicates)
+    salt = str(time.time_ns()).encode("utf-8") + os.urandom(8)
+    try:
+        hash_onchain = hashlib.sha256(bytes.fromhex(model_hash) + salt).hexdigest()
+    except Exception:
+        # fallback: hash of model_hash + salt string
+        hash_onchain = hashlib.sha256(model_hash.encode("utf-8") + salt).hexdigest()
+
+    leaves = []
+    with timed_phase("models", "merkle"):
+        try:
+            merkle = merkle_root_from_file(dest_path, leaves_out=leaves)
+        except Exception:
+            merkle = None
+
+    size_mb = os.path.getsize(dest_path) / (1024 * 1024)
+    storage_uri = None
+    stored_size_mb = size_mb
+    chunks = None
+    staged_path = None
+
+    if config.get("MODEL_DEDUP"):
+        # content-defined chunking: only chunks the store has not seen yet are written
+        try:
+            store = ChunkStore(CHUNK_STORE_FOLDER)
+            with timed_phase("models", "chunk"):
+                manifest_hash, chunks, new_bytes = store.ingest_file(
+                    dest_path,
+                    min_size=config.get("CDC_MIN_SIZE", DEFAULT_MIN_SIZE),
+                    avg_size=config.get("CDC_AVG_SIZE", DEFAULT_AVG_SIZE),
+                    max_size=config.get("CDC_MAX_SIZE", DEFAULT_MAX_SIZE),
+                )
+            # kept until the chunk references are committed (_settle_chunks)
+            staged_path = dest_path
+            storage_uri = f"{CAS_SCHEME}{manifest_hash}"
+            stored_size_mb = new_bytes / (1024 * 1024)
+        except Exception:
+            logger.exception("Chunking failed; keeping the whole file")
+            chunks = None
+
+    if storage_uri is None:
+        # whole file in the configured storage backend (file:// or s3://)
+        with timed_phase("models", "publish"):
+            storage_uri = publish_file(dest_path, os.path.relpath(dest_path, UPLOAD_FOLDER))
+
+    safetensors_uri = None
+    if safetensors_path:
+        # never chunked: renters / tensor reads need it as one plain, mmap-able blob. Keyed by the
+        # canonical hash plus this upload's on-chain hash, so no later upload can overwrite it and
+        # no two rows share it (the GC never races an upload for it).
+        key = f"safetensors/{model_hash}-{hash_onchain[:16]}{SAFETENSORS_SUFFIX}"
+        with timed_phase("models", "publish"):
+            safetensors_uri = publish_file(safetensors_path, key)
+
+    return {
+        "model_hash": model_hash,
+        "hash_onchain": hash_onchain,
+        "merkle": merkle,
+        "leaves": leaves,
+        "size_mb": size_mb,
+        "stored_size_mb": stored_size_mb,
+        "storage_uri": storage_uri,
+        "safetensors_uri": safetensors_uri,
+        "model_card": model_card,
+        "chunks": chunks,
+        "staged_path": staged_path,
+    }
+
+
+def _settle_chunks(ingested):
+    """
+    Once the chunk references of an ingested model are committed: write back the
+    chunks a concurrent GC removed after ingest_file found them stored, then drop
+    the staged file.
+    """
+    staged_path = ingested.pop("staged_path", None)
+    if staged_path is None:
+        return
+    try:
+        ChunkStore(CHUNK_STORE_FOLDER).restore_missing(staged_path, ingested["chunks"])
+    finally:
+        os.remove(staged_path)
+
+
+def _stream_batch_files(dest_dir, max_files):
+    """
+    Read the batch body once, writing each `files` part straight to `dest_dir`
+    (werkzeug's form parsing would spool it to a temp file first, file.save copy
+    it again). Returns (text fields as lists, one item per file part, in order);
+    a file refused by upload_preflight's extension / magic bytes check is never
+    written. What was written is removed when the body turns out bad.
+    """
+    boundary = request.mimetype_params.get("boundary", "").encode("latin-1")
+    decoder = MultipartDecoder(boundary, request.max_form_memory_size)
+    fields, items, seen = {}, [], set()
+    field, parts = None, []
+    item, filename, head, out = None, None, b"", None
+    finished = False
+    try:
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                if finished:
+                    raise ValueError("truncated multipart body")
+                chunk = request.stream.read(_BATCH_READ_SIZE)
+                finished = not chunk
+                decoder.receive_data(chunk or None)
+            elif isinstance(event, Field):
+                field, parts, item = event.name, [], None
+            elif isinstance(event, File):
+                field, item = None, None
+                if event.name != "files":
+                    continue  # some other file part: skip it
+                if len(items) == max_files:
+                    raise BadRequest(f"At most {max_files} files per batch")
+                filename, head = secure_filename(event.filename or ""), b""
+                item = {"filename": event.filename, "name": filename.rsplit(".", 1)[0]}
+                items.append(item)
+                if not filename:
+                    item["error"] = "Missing file name"
+                elif filename in seen:
+                    item["error"] = "Duplicate file name in batch"
+            elif isinstance(event, Data):
+                if field is not None:
+                    parts.append(event.data)
+                    if not event.more_data:
+                        fields.setdefault(field, []).append(b"".join(parts).decode("utf-8", "replace"))
+                        field = None
+                    continue
+                if item is None or "error" in item:
+                    continue
+                if out is not None:
+                    out.write(event.data)
+                else:
+                    head += event.data
+                    if len(head) >= MAGIC_BYTES or not event.more_data:
+                        error = file_error(filename, head, ALLOWED_EXT, MODEL_SIGNATURES)
+                        if error:
+                            item["error"] = error  # never written to disk
+                            continue
+                        seen.add(filename)
+                        item["path"] = os.path.join(dest_dir, filename)
+                        out = open(item["path"], "wb")
+                        out.write(head)
+                if out is not None and not event.more_data:
+                    out.close()
+                    out, item = None, None
+            elif isinstance(event, Epilogue):
+                break
+    except Exception as e:
+        if out is not None:
+            out.close()
+        for written in items:
+            if "path" in written:
+                os.remove(written["path"])
+        if isinstance(e, ValueError):
+            raise BadRequest("Malformed multipart body") from None
+        raise
+    return fields, items
+
+
+def _new_model(uploader_id, name, description, price_lamports, parent_id, ingested):
+    return AIModel(
+        uploader_id=uploader_id,
+        name=name,
+        description=description,
+        model_hash=ingested["model_hash"],
+        merkle_root=ingested["merkle"],
+        merkle_leaves=b"".join(ingested["leaves"]) if ingested["merkle"] else None,
+        storage_uri=ingested["storage_uri"],
+        safetensors_uri=ingested["safetensors_uri"],
+        model_card=ingested["model_card"],
+        price_lamports=price_lamports,
+        size_mb=ingested["size_mb"],
+        stored_size_mb=ingested["stored_size_mb"],
+        parent_id=parent_id,
+        status="pending",
+    )
+
+
 @models_ns.route("/models")
 class ModelListResource(Resource):
-    @models_ns.marshal_list_with(model_schema)
+    @models_ns.response(200, "Success", [model_schema])
     def get(self):
         """Return all models"""
-        return AIModel.query.all()
+        # column select + orjson instead of marshal_list_with (same JSON, documented schema unchanged)
+        return list_response(AIModel, model_schema)
 
 
 @models_ns.route("/models/upload")
 class ModelUploadResource(Resource):
     @models_ns.marshal_with(model_schema)
     @jwt_required()
+    @rate_limited("upload")
+    @upload_preflight(required=("name",), integers=("price_lamports", "parent_id"),
+                      extensions=ALLOWED_EXT, signatures=MODEL_SIGNATURES)
     def post(self):
-        identity = get_jwt_identity()
-        uploader = db.session.get(User, identity)
+        uploader = current_principal()
         if not uploader:
             return {"message": "User not found"}, 404
 
+        # reject before the multipart body is parsed / spooled to disk
+        over_quota = check_quota(uploader.id)
+        if over_quota:
+            return over_quota
+
         file = request.files.get("file")
         name = request.form.get("name")
         description = request.form.get("description")
@@ -176,61 +464,46 @@ class ModelUploadResource(Resource):
         if not file or not name:
             return {"message": "Missing file or name"}, 400
 
+        # optional: this upload is a new version (e.g. fine-tune) of an existing model
+        parent_id = request.form.get("parent_id")
+        if parent_id:
+            try:
+                parent_id = int(parent_id)
+            except ValueError:
+                return {"message": "parent_id must be an integer"}, 400
+            if not db.session.get(AIModel, parent_id):
+                return {"message": "Parent model not found"}, 404
+        else:
+            parent_id = None
+
         dest_dir = os.path.join(UPLOAD_FOLDER, "models")
         os.makedirs(dest_dir, exist_ok=True)
 
         filename = secure_filename(file.filename)
         dest_path = os.path.join(dest_dir, filename)
-        file.save(dest_path)
+        with timed_phase("models", "save"):
+            file.save(dest_path)
 
-        ext = filename.rsplit(".", 1)[-1].lower()
+        # Content-Length may be missing (chunked) or cover more than the file: check the real size
+        over_quota = check_quota(uploader.id, os.path.getsize(dest_path))
+        if over_quota:
+            os.remove(dest_path)
+            return over_quota
 
-        try:
-            if ext in {"pt", "pth", "ptm"}:
-                import torch
-                obj = torch.load(dest_path, map_location="cpu")
-                model_hash = canonical_state_dict_hash(obj)
-            else:
-                model_hash = file_sha256_stream(dest_path)
-        except Exception as e:
-            current_app.logger.warning(
-                "canonical hash failed: %s; falling back to streaming sha256", e
-            )
-            model_hash = file_sha256_stream(dest_path)
+        ingested = _ingest_model_file(dest_path, current_app.config, current_app.logger)
+        if ingested["chunks"] is not None:
+            ModelChunk.acquire(ingested["chunks"])
 
-        # generate a unique hash for on-chain PDA (avoid duplicates)
-        salt = str(time.time_ns()).encode("utf-8")
-        try:
-            hash_onchain = hashlib.sha256(bytes.fromhex(model_hash) + salt).hexdigest()
-        except Exception:
-            # fallback: hash of model_hash + salt string
-            hash_onchain = hashlib.sha256(model_hash.encode("utf-8") + salt).hexdigest()
-
-        try:
-            merkle = merkle_root_from_file(dest_path)
-        except Exception:
-            merkle = None
-
-        size_mb = os.path.getsize(dest_path) / (1024 * 1024)
-        storage_uri = f"file://{dest_path}"
-
-        model = AIModel(
-            uploader_id=uploader.id,
-            name=name,
-            description=description,
-            model_hash=model_hash,
-            merkle_root=merkle,
-            storage_uri=storage_uri,
-            price_lamports=price_lamports,
-            size_mb=size_mb,
-            status="pending",
-        )
-        model.save()
+        model = _new_model(uploader.id, name, description, price_lamports, parent_id, ingested)
+        with timed_phase("models", "db_commit"):
+            model.save()
+        _settle_chunks(ingested)
 
         # On-chain registration using hash_onchain
-        uploader_wallet_path = request.form.get("uploader_wallet_path")
         try:
-            result = call_register_model(hash_onchain, storage_uri, price_lamports, uploader_wallet_path)
+            with timed_phase("models", "register"):
+                result = call_register_model(ingested["hash_onchain"], model.storage_uri, price_lamports,
+                                             merkle_root_hex=model.merkle_root)
             model.onchain_tx = result.get("txid")
             model.model_pda = result.get("model_pda")
             model.status = "registered"
@@ -245,24 +518,132 @@ class ModelUploadResource(Resource):
         return model, 201
 
 
+@models_ns.route("/models/upload-batch")
+class ModelBatchUploadResource(Resource):
+    @jwt_required()
+    @rate_limited("upload")
+    @upload_preflight(file_fields=("files",), integers=("price_lamports",),
+                      extensions=ALLOWED_EXT, signatures=MODEL_SIGNATURES)
+    def post(self):
+        """Upload many model files (multipart field `files`, optional `names`) in one request"""
+        uploader = current_principal()
+        if not uploader:
+            return {"message": "User not found"}, 404
+
+        over_quota = check_quota(uploader.id)
+        if over_quota:
+            return over_quota
+
+        max_files = current_app.config.get("MODEL_BATCH_MAX_FILES", 64)
+        dest_dir = os.path.join(UPLOAD_FOLDER, "models")
+        os.makedirs(dest_dir, exist_ok=True)
+
+        # per-item results, in request order; staged items carry their path until ingested
+        with timed_phase("models", "save"):
+            fields, items = _stream_batch_files(dest_dir, max_files)
+        names = fields.get("names", [])
+        description = fields.get("description", [None])[0]
+        error = None
+        if not items:
+            error = "No files"
+        elif names and len(names) != len(items):
+            error = "names must have one entry per file"
+        else:
+            try:
+                price_lamports = int(fields.get("price_lamports", [""])[0] or 0)
+            except ValueError:
+                error = "price_lamports must be an integer"
+        if error:
+            for item in items:
+                if "path" in item:
+                    os.remove(item["path"])
+            return {"message": error}, 400
+
+        for item, name in zip(items, names):
+            item["name"] = name
+        for item in items:
+            if not item["name"] and "path" in item:
+                os.remove(item.pop("path"))
+                item["error"] = "Missing file name"
+        staged = [item for item in items if "path" in item]
+        over_quota = check_quota(uploader.id, sum(os.path.getsize(item["path"]) for item in staged))
+        if over_quota:
+            for item in staged:
+                os.remove(item["path"])
+            return over_quota
+
+        # hashing / chunking of every file at once (hashlib and file I/O release the GIL)
+        config, logger = current_app.config, current_app.logger
+        workers = current_app.config.get("MODEL_BATCH_WORKERS") or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_ingest_model_file, item["path"], config, logger) for item in staged]
+        models = []
+        for item, future in zip(staged, futures):
+            path = item.pop("path")
+            try:
+                ingested = future.result()
+            except Exception as e:
+                logger.exception("Ingesting %s failed", item["filename"])
+                item["error"] = str(e)[:1000]
+                if os.path.exists(path):
+                    os.remove(path)  # no model row will ever point at it
+                continue
+            if ingested["chunks"] is not None:
+                ModelChunk.acquire(ingested["chunks"])
+            model = _new_model(uploader.id, item["name"], description, price_lamports, None, ingested)
+            db.session.add(model)
+            models.append((item, model, ingested))
+
+        if not models:
+            return {"message": "No file could be ingested", "items": items}, 400
+
+        # every row in one transaction (save() would commit each)
+        User.add_storage_usage(uploader.id, sum(size_mb_to_bytes(m.size_mb) for _, m, _ in models))
+        with timed_phase("models", "db_commit"):
+            db.session.commit()
+        for _, _, ingested in models:
+            _settle_chunks(ingested)
+
+        with timed_phase("models", "register"):
+            results = call_register_models(
+                [(ingested["hash_onchain"], m.storage_uri, price_lamports, m.merkle_root)
+                 for _, m, ingested in models])
+        for (item, model, _), result in zip(models, results):
+            if isinstance(result, Exception):
+                model.status = "failed"
+                model.last_error = str(result)[:1000]
+            else:
+                model.onchain_tx = result.get("txid")
+                model.model_pda = result.get("model_pda")
+                model.status = "registered"
+                model.last_error = None
+        db.session.commit()
+
+        for item, model, _ in models:
+            item.update(id=model.id, status=model.status, model_hash=model.model_hash,
+                        storage_uri=model.storage_uri, model_pda=model.model_pda,
+                        onchain_tx=model.onchain_tx, error=model.last_error)
+        return {"items": items}, 201
+
+
 @models_ns.route("/models/<int:model_id>")
 class ModelResource(Resource):
-    @models_ns.marshal_with(model_schema)
+    @models_ns.marshal_with(model_detail_schema)
     def get(self, model_id):
         return AIModel.query.get_or_404(model_id)
 
-    @models_ns.marshal_with(model_schema)
+    @models_ns.marshal_with(model_detail_schema)
     @models_ns.expect(model_schema)
     @jwt_required()
     def put(self, model_id):
         model = AIModel.query.get_or_404(model_id)
-        identity = get_jwt_identity()
-        user = db.session.get(User, identity)
+        user = current_principal()
         if (not user) or (user.id != model.uploader_id and not user.is_admin):
             return {"message": "Forbidden"}, 403
 
         data = request.get_json()
-        immutable = {"model_hash", "merkle_root", "storage_uri", "uploader_id", "onchain_tx", "size_mb"}
+        immutable = {"model_hash", "merkle_root", "storage_uri", "safetensors_uri", "uploader_id", "onchain_tx", "size_mb", "stored_size_mb", "parent_id",
+                     "integrity_status", "verified_at", "model_card"}
         for k in immutable:
             data.pop(k, None)
         model.update(**data)
@@ -271,29 +652,159 @@ class ModelResource(Resource):
     @jwt_required()
     def delete(self, model_id):
         model = AIModel.query.get_or_404(model_id)
-        identity = get_jwt_identity()
-        user = db.session.get(User, identity)
+        user = current_principal()
         if (not user) or (user.id != model.uploader_id and not user.is_admin):
             return {"message": "Forbidden"}, 403
         model.delete()
         return {"message": "Model deleted."}, 200
 
 
+@models_ns.route("/models/bulk-delete")
+class ModelBulkDeleteResource(Resource):
+    @jwt_required()
+    def post(self):
+        """Delete models by {"ids": [...]} or {"filter": {...}} in one transaction; files are removed by the GC"""
+        user = current_principal()
+        if not user:
+            return {"message": "User not found"}, 404
+        return bulk_delete(AIModel, request.get_json(silent=True), user)
+
+
+@models_ns.route("/models/<int:model_id>/versions")
+class ModelVersionsResource(Resource):
+    @models_ns.marshal_list_with(model_schema)
+    def get(self, model_id):
+        """Return the versions derived from a model (children uploaded with parent_id)"""
+        model = AIModel.query.get_or_404(model_id)
+        return model.versions.order_by(AIModel.created_at).all()
+
+
+def _tensor_index(model):
+    """ (tensors, metadata, data start) of the safetensors copy, or an error response """
+    if not model.safetensors_uri:
+        return None, ({"message": "No safetensors copy for this model"}, 404)
+    try:
+        return read_stored_header(model.safetensors_uri), None
+    except (OSError, SafetensorsError) as e:
+        current_app.logger.warning("Unreadable safetensors copy of model %s: %s", model.id, e)
+        return None, ({"message": "Safetensors copy is not available"}, 404)
+
+
+def _can_read_weights(user, model):
+    """ Uploader, admins and users who rented the model (rentals table) """
+    if user.id == model.uploader_id or user.is_admin:
+        return True
+    return db.session.query(Rental.id).filter(Rental.model_id == model.id, Rental.renter_id == user.id).first() is not None
+
+
+@models_ns.route("/models/<int:model_id>/tensors")
+class ModelTensorsResource(Resource):
+    def get(self, model_id):
+        """List the tensors of the safetensors copy (name, dtype, shape, byte size)"""
+        model = AIModel.query.get_or_404(model_id)
+        index, error = _tensor_index(model)
+        if error:
+            return error
+        tensors, metadata, _ = index
+        return {
+            "id": model.id,
+            "metadata": metadata,
+            "tensors": [
+                {"name": name, "dtype": info["dtype"], "shape": info["shape"],
+                 "nbytes": info["data_offsets"][1] - info["data_offsets"][0]}
+                for name, info in sorted(tensors.items())
+            ],
+        }, 200
+
+
+@models_ns.route("/models/<int:model_id>/tensors/<path:name>")
+class ModelTensorResource(Resource):
+    @jwt_required()
+    def get(self, model_id, name):
+        """Raw little-endian bytes of one tensor (uploader, renters, admins); dtype / shape in X-Tensor-Dtype / X-Tensor-Shape"""
+        model = AIModel.query.get_or_404(model_id)
+        user = current_principal()
+        if (not user) or not _can_read_weights(user, model):
+            return {"message": "Forbidden"}, 403
+        index, error = _tensor_index(model)
+        if error:
+            return error
+        tensors, _, data_start = index
+        info = tensors.get(name)
+        if info is None:
+            return {"message": "Tensor not found"}, 404
+
+        begin, end = (data_start + offset for offset in info["data_offsets"])
+        return Response(
+            iter_range(model.safetensors_uri, begin, end),
+            mimetype="application/octet-stream",
+            headers={
+                "Content-Length": str(end - begin),
+                "X-Tensor-Dtype": info["dtype"],
+                "X-Tensor-Shape": ",".join(map(str, info["shape"])),
+            },
+            direct_passthrough=True,
+        )
+
+
 @models_ns.route("/models/<int:model_id>/rent")
 class ModelRentResource(Resource):
     @jwt_required()
+    @rate_limited("rent")
     def post(self, model_id):
         model = AIModel.query.get_or_404(model_id)
-        identity = get_jwt_identity()
-        renter = db.session.get(User, identity)
+        renter = current_principal()
         if not renter:
             return {"message": "Renter not found"}, 404
 
-        renter_wallet_path = request.form.get("renter_wallet_path")
         try:
-            txid = call_rent_model(model.model_hash, renter_wallet_path)
+            # the PDA was derived from the salted on-chain hash at registration, not from model_hash
+            txid = call_rent_model(model.model_hash, model_pda=model.model_pda)
         except Exception as e:
             current_app.logger.exception("On-chain rent failed")
             return {"message": "On-chain rent failed", "error": str(e)}, 500
 
+        # the rent went through on-chain: analytics failures must not turn it into an error
+        try:
+            record_rental(model.id, model.uploader_id, txid, model.price_lamports, renter_id=renter.id,
+                          model_pda=model.model_pda)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Recording rental of model %s failed", model.id)
+
         return {"message": "Rented", "txid": txid}, 200
+
+
+@models_ns.route("/models/<int:model_id>/stats")
+class ModelStatsResource(Resource):
+    def get(self, model_id):
+        """Rental count, lamports earned and last rental of a model (pre-aggregated)"""
+        AIModel.query.get_or_404(model_id)
+        return model_stats(model_id), 200
+
+
+@models_ns.route("/models/leaderboard")
+class ModelLeaderboardResource(Resource):
+    def get(self):
+        """Most rented models: ?by=rentals|lamports&limit=10"""
+        order = request.args.get("by", "rentals")
+        if order not in LEADERBOARD_ORDER:
+            return {"message": f"by must be one of: {', '.join(sorted(LEADERBOARD_ORDER))}"}, 400
+        try:
+            limit = int(request.args.get("limit", 10))
+        except ValueError:
+            return {"message": "limit must be an integer"}, 400
+        limit = max(1, min(limit, current_app.config.get("LEADERBOARD_MAX", 100)))
+        return {"by": order, "items": leaderboard(current_app.config, order, limit)}, 200
+
+
+@models_ns.route("/models/earnings")
+class ModelEarningsResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Rentals and lamports earned by the caller's models"""
+        user = current_principal()
+        if not user:
+            return {"message": "User not found"}, 404
+        return uploader_stats(user.id), 200
@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_compression.py
+# Space / throughput trade-offs of the compressed storage tier.
+# Run from the repo root: python -m backend.benchmarks.bench_compression [--size-mb 64]
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backend.utils.compressed_blob import compress_file, open_blob
+from backend.utils.hash_utils import file_sha256_stream
+
+
+def _write_csv(path, size):
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write("id,user,score,label,comment\n")
+        i = 0
+        while f.tell() < size:
+            f.write(f"{i},user{rng.randrange(10000)},{rng.random():.6f},"
+                    f"{rng.choice(['cat', 'dog', 'bird'])},sample comment number {i % 97}\n")
+            i += 1
+
+
+def _write_random(path, size):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+
+
+def _ranged_reads(path, size, count=200, length=4096):
+    rng = random.Random(1)
+    start = time.perf_counter()
+    with open_blob(path) as f:
+        for _ in range(count):
+            f.seek(rng.randrange(max(size - length, 1)))
+            f.read(length)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def _bench_one(raw_path, level, tmp_dir):
+    size = os.path.getsize(raw_path)
+    out = os.path.join(tmp_dir, f"blob-{level}.blob.zst")
+
+    t0 = time.perf_counter()
+    _, compressed_size = compress_file(raw_path, out, level=level)
+    t_compress = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with open_blob(out) as f:
+        while f.read(4 * 1024 * 1024):
+            pass
+    t_read = time.perf_counter() - t0
+
+    return {
+        "level": level,
+        "ratio": round(size / compressed_size, 3),
+        "saved_pct": round(100 * (1 - compressed_size / size), 1),
+        "compress_mb_s": round(size / 2**20 / t_compress, 1),
+        "full_read_mb_s": round(size / 2**20 / t_read, 1),
+        "ranged_read_4k_ms": round(_ranged_reads(out, size), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--levels", default="1,3,9")
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind, writer in (("csv", _write_csv), ("random", _write_random)):
+            raw_path = os.path.join(tmp_dir, f"data.{kind}")
+            writer(raw_path, size)
+            raw_size = os.path.getsize(raw_path)
+
+            t0 = time.perf_counter()
+            file_sha256_stream(raw_path)
+            t_raw = time.perf_counter() - t0
+            baseline = {
+                "level": None,
+                "ratio": 1.0,
+                "saved_pct": 0.0,
+                "full_read_mb_s": round(raw_size / 2**20 / t_raw, 1),
+                "ranged_read_4k_ms": round(_ranged_reads(raw_path, raw_size), 3),
+            }
+            rows = [baseline] + [_bench_one(raw_path, int(lvl), tmp_dir) for lvl in args.levels.split(",")]
+            results.append({"data": kind, "size_mb": round(raw_size / 2**20, 1), "results": rows})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# backend/benchmarks/bench_login.py
+# Logins per second (and per core) through POST /auth/login for each password
+# hasher / cost, with as many concurrent clients as CPUs.
+# Run from the repo root: python -m backend.benchmarks.bench_login [--logins 200]
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from backend.configuration_classes_for_flask import TestConfig
+from backend.externals import db
+from backend.main import create_app
+from backend.password_hashing import argon2
+
+SETTINGS = [
+    ("scrypt n=2^15 (werkzeug default)", {"PASSWORD_HASHER": "scrypt", "SCRYPT_N": 2 ** 15}),
+    ("scrypt n=2^14", {"PASSWORD_HASHER": "scrypt", "SCRYPT_N": 2 ** 14}),
+    ("pbkdf2-sha256 600k", {"PASSWORD_HASHER": "pbkdf2", "PBKDF2_ITERATIONS": 600_000}),
+    ("pbkdf2-sha256 210k", {"PASSWORD_HASHER": "pbkdf2", "PBKDF2_ITERATIONS": 210_000}),
+    ("argon2id t=3 m=64MiB", {"PASSWORD_HASHER": "argon2id", "ARGON2_TIME_COST": 3, "ARGON2_MEMORY_COST": 64 * 1024}),
+    ("argon2id t=2 m=19MiB", {"PASSWORD_HASHER": "argon2id", "ARGON2_TIME_COST": 2, "ARGON2_MEMORY_COST": 19 * 1024}),
+]
+
+
+def _bench(settings, logins, clients, tmp_dir):
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmp_dir, "login.db")
+        SQLALCHEMY_ECHO = False
+
+    app = create_app(BenchConfig)
+    app.config.update(settings)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    client = app.test_client()
+    client.post("/auth/signup", json={"username": "bench", "email": "bench@bench.io", "password": "benchpassword1"})
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count):
+        c = app.test_client()
+        for _ in range(count):
+            start = time.perf_counter()
+            r = c.post("/auth/login", json={"identifier": "bench", "password": "benchpassword1"})
+            assert r.status_code == 200, r.get_data(as_text=True)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(logins // clients,)) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    cores = os.cpu_count() or 1
+    return {
+        "logins_per_s": round(len(latencies) / elapsed, 1),
+        "logins_per_s_per_core": round(len(latencies) / elapsed / cores, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, settings in SETTINGS:
+            if settings["PASSWORD_HASHER"] == "argon2id" and argon2 is None:
+                results.append({"hasher": name, "skipped": "argon2-cffi is not installed"})
+                continue
+            results.append({"hasher": name, **_bench(settings, args.logins, args.clients, tmp_dir)})
+
+    print(json.dumps({"cores": os.cpu_count(), "clients": args.clients, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
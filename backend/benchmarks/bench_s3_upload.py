@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_s3_upload.py
+# Multipart upload throughput vs. part concurrency for the S3 storage backend.
+# Against minio:  python -m backend.benchmarks.bench_s3_upload --endpoint-url http://localhost:9000 --bucket bench
+# Without an endpoint it runs against moto in-process (only checks the code path, not the network).
+import argparse
+import io
+import json
+import os
+import time
+
+from backend.utils.storage_backends import S3Backend
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint-url")
+    parser.add_argument("--bucket", default="bench")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--part-mb", type=int, default=8)
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    args = parser.parse_args()
+
+    mock = None
+    if not args.endpoint_url:
+        from moto import mock_aws
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+        mock = mock_aws()
+        mock.start()
+
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    results = []
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            backend = S3Backend(args.bucket, endpoint_url=args.endpoint_url, region_name=args.region,
+                                part_size=args.part_mb * 1024 * 1024, max_concurrency=concurrency)
+            if not results:
+                try:
+                    backend.client.create_bucket(Bucket=args.bucket)
+                except Exception:
+                    pass  # already exists
+            start = time.perf_counter()
+            uri = backend.put_stream(f"bench/upload-{concurrency}.bin", io.BytesIO(data))
+            elapsed = time.perf_counter() - start
+            backend.delete(uri)
+            results.append({"concurrency": concurrency, "seconds": round(elapsed, 3),
+                            "mb_s": round(args.size_mb / elapsed, 1)})
+    finally:
+        if mock:
+            mock.stop()
+
+    print(json.dumps({"size_mb": args.size_mb, "part_mb": args.part_mb,
+                      "endpoint": args.endpoint_url or "moto", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
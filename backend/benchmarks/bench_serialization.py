@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_serialization.py
+# GET /models/models and /databases/databases at N rows (default 10k): the old
+# marshal_list_with path (ORM objects + flask-restx fields + stdlib json) against
+# the column-select + orjson path, uncompressed and per Content-Encoding.
+# Run from the repo root: python -m backend.benchmarks.bench_serialization [--rows 10000]
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from flask import Response
+from flask_restx import marshal
+from sqlalchemy import insert
+
+from backend.configuration_classes_for_flask import TestConfig
+from backend.externals import db
+from backend.fast_serialization import brotli, orjson
+from backend.main import create_app
+from backend.models import AIDatabase, AIModel, User
+
+
+def _app(tmp_dir, rows):
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmp_dir, "serialization.db")
+        SQLALCHEMY_ECHO = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username="bench", email="bench@bench.io", password="x")
+        db.session.add(user)
+        db.session.commit()
+        db.session.execute(insert(AIModel), [{
+            "uploader_id": user.id, "name": f"model-{i}", "description": "benchmark row",
+            "model_hash": f"{i:064x}", "merkle_root": f"{i:064x}", "storage_uri": f"file:///bench/{i}.bin",
+            "price_lamports": 1000, "size_mb": 1.5, "status": "registered", "scrub_cursor": 0,
+        } for i in range(rows)])
+        db.session.execute(insert(AIDatabase), [{
+            "user_id": user.id, "name": f"db-{i}", "purpose": "training", "storage_uri": f"file:///bench/{i}.csv",
+            "data_hash": f"{i:064x}", "size_mb": 1.5, "description": "benchmark row", "scrub_cursor": 0,
+        } for i in range(rows)])
+        db.session.commit()
+    return app
+
+
+def _timed(fn, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _case(app, url, model, schema, repeats):
+    client = app.test_client()
+
+    def marshalled():
+        # what marshal_list_with did: hydrate, marshal, json-encode
+        with app.test_request_context(url):
+            Response(json.dumps(marshal(model.query.all(), schema)), mimetype="application/json")
+
+    results = {"marshal_list_with": _timed(marshalled, repeats)}
+    sizes = {}
+    for encoding in ("identity", "gzip", "br"):
+        if encoding == "br" and brotli is None:
+            continue
+        headers = {"Accept-Encoding": encoding}
+        client.get(url, headers=headers)  # warm up
+        body = []
+        results[f"fast[{encoding}]"] = _timed(lambda: body.append(client.get(url, headers=headers).get_data()), repeats)
+        sizes[encoding] = len(body[-1])
+
+    return {
+        name: {
+            "p50_ms": round(statistics.median(durations) * 1000, 1),
+            "min_ms": round(min(durations) * 1000, 1),
+            **({"bytes": sizes[name[5:-1]]} if name.startswith("fast[") else {}),
+        }
+        for name, durations in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    from backend.ai_databse_api_endpoints import db_model
+    from backend.ai_model_api_endpoints import model_schema
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = _app(tmp_dir, args.rows)
+        results = {
+            "models": _case(app, "/models/models", AIModel, model_schema, args.repeats),
+            "databases": _case(app, "/databases/databases", AIDatabase, db_model, args.repeats),
+        }
+
+    print(json.dumps({
+        "rows": args.rows,
+        "encoder": "orjson" if orjson is not None else "json",
+        "brotli": brotli is not None,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
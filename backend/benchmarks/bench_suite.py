@@ -0,0 +1,361 @@
+# backend/benchmarks/bench_suite.py
+# Benchmark suite for the hashing, upload and catalog hot paths. Every case runs
+# in a fresh process (so peak RSS is per case) and reports throughput, p50/p99
+# latency and peak RSS as JSON; with a baseline file, regressions are listed and
+# the exit code is 1. A case that raises, crashes its process or runs past
+# --case-timeout is reported with an "error" and also fails the run.
+#
+#   python -m backend.benchmarks.bench_suite --quick                      # smaller sizes, a few minutes
+#   python -m backend.benchmarks.bench_suite --save-baseline              # record backend/benchmarks/baseline.json
+#   python -m backend.benchmarks.bench_suite --only hash --output out.json
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_CASE_TIMEOUT = 3600             # seconds
+_POLL_SECONDS = 1.0
+_WRITE_BLOCK = 4 * 1024 * 1024
+
+
+def _percentile(sorted_values, p):
+    """ Nearest-rank percentile of an already sorted list """
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def _summarize(durations, units, unit_name):
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        "runs": len(durations),
+        "throughput": round(units * len(durations) / total, 2) if total else None,
+        "throughput_unit": unit_name,
+        "p50_ms": round(_percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(_percentile(durations, 99) * 1000, 3),
+    }
+
+
+def _timed(fn, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _random_file(path, size):
+    with open(path, "wb") as f:
+        left = size
+        while left > 0:
+            n = min(_WRITE_BLOCK, left)
+            f.write(os.urandom(n))
+            left -= n
+    return path
+
+
+# ---------------------------------------------------------------- hashing
+
+def bench_sha256_stream(size_mb, repeats, tmp_dir):
+    from backend.utils.hash_utils import file_sha256_stream
+    path = _random_file(os.path.join(tmp_dir, "blob.bin"), size_mb * 1024 * 1024)
+    file_sha256_stream(path)  # warm the page cache: measure hashing, not the disk
+    return _summarize(_timed(lambda: file_sha256_stream(path), repeats), size_mb, "MB/s")
+
+
+def bench_merkle_hash_utils(size_mb, repeats, tmp_dir):
+    from backend.utils.hash_utils import merkle_root_from_file
+    path = _random_file(os.path.join(tmp_dir, "blob.bin"), size_mb * 1024 * 1024)
+    merkle_root_from_file(path)
+    return _summarize(_timed(lambda: merkle_root_from_file(path), repeats), size_mb, "MB/s")
+
+
+def bench_merkle_databases_endpoint(size_mb, repeats, tmp_dir):
+    # the copy in ai_databse_api_endpoints.py is what dataset uploads actually call
+    from backend.ai_databse_api_endpoints import merkle_root_from_file
+    path = _random_file(os.path.join(tmp_dir, "blob.bin"), size_mb * 1024 * 1024)
+    merkle_root_from_file(path)
+    return _summarize(_timed(lambda: merkle_root_from_file(path), repeats), size_mb, "MB/s")
+
+
+def bench_canonical_state_dict_hash(tensors, params, repeats, tmp_dir):
+    try:
+        import torch
+    except ImportError:
+        return {"skipped": "torch is not installed"}
+    from backend.utils.hash_utils import canonical_state_dict_hash
+
+    gen = torch.Generator().manual_seed(0)
+    per_tensor = max(1, params // tensors)
+    state_dict = {f"layers.{i}.weight": torch.randn(per_tensor, generator=gen) for i in range(tensors)}
+    size_mb = sum(t.numel() * t.element_size() for t in state_dict.values()) / 2**20
+    return _summarize(_timed(lambda: canonical_state_dict_hash(state_dict), repeats), size_mb, "MB/s")
+
+
+# ---------------------------------------------------------------- app level
+
+class _stub_chain:
+    """ Replace the blockchain CLI calls so uploads measure only the server side """
+
+    def __enter__(self):
+        result = {"txid": "bench-tx", "model_pda": "bench-pda"}
+        self._patches = [
+            patch("backend.ai_model_api_endpoints.call_register_model", return_value=result),
+            patch("backend.ai_model_api_endpoints.call_rent_model", return_value=result),
+        ]
+        for p in self._patches:
+            p.start()
+        return self
+
+    def __exit__(self, *exc):
+        for p in self._patches:
+            p.stop()
+
+
+def _bench_app(tmp_dir):
+    from backend.configuration_classes_for_flask import TestConfig
+    from backend.externals import db
+    from backend.main import create_app
+
+    class BenchConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmp_dir, "bench.db")
+        SQLALCHEMY_ECHO = False
+        TESTING = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _login(client):
+    client.post("/auth/signup", json={"username": "bench", "email": "bench@bench.io", "password": "benchpassword1"})
+    token = client.post("/auth/login", json={"identifier": "bench", "password": "benchpassword1"}).get_json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def bench_upload(kind, size_mb, repeats, tmp_dir):
+    app = _bench_app(tmp_dir)
+    client = app.test_client()
+    headers = _login(client)
+    size = size_mb * 1024 * 1024
+    created = []
+
+    def upload(data):
+        if kind == "models":
+            form = {"name": "bench-model", "price_lamports": "1",
+                    "file": (io.BytesIO(data), f"bench-{len(created)}.bin")}
+        else:
+            form = {"name": "bench-db", "purpose": "training",
+                    "file": (io.BytesIO(data), f"bench-{len(created)}.csv")}
+        response = client.post(f"/{kind}/{kind}/upload", headers=headers, data=form,
+                               content_type="multipart/form-data")
+        assert response.status_code == 201, response.get_data(as_text=True)
+        created.append(response.get_json()["id"])
+
+    with _stub_chain():
+        durations = []
+        for _ in range(repeats):
+            data = os.urandom(size)  # new content every run (no dedup shortcut), generated outside the timing
+            start = time.perf_counter()
+            upload(data)
+            durations.append(time.perf_counter() - start)
+        for entry_id in created:
+            client.delete(f"/{kind}/{kind}/{entry_id}", headers=headers)
+    return _summarize(durations, size_mb, "MB/s")
+
+
+def _seed_rows(app, kind, rows, batch=20000):
+    from sqlalchemy import insert
+    from backend.externals import db
+    from backend.models import AIDatabase, AIModel, User
+
+    with app.app_context():
+        user_id = User.query.filter_by(username="bench").first().id
+        for start in range(0, rows, batch):
+            n = min(batch, rows - start)
+            if kind == "models":
+                values = [{"uploader_id": user_id, "name": f"model-{start + i}", "description": "benchmark row",
+                           "model_hash": f"{start + i:064x}", "storage_uri": f"file:///bench/{start + i}.bin",
+                           "price_lamports": 1000, "size_mb": 1.0, "status": "registered",
+                           "scrub_cursor": 0} for i in range(n)]
+                db.session.execute(insert(AIModel), values)
+            else:
+                values = [{"user_id": user_id, "name": f"db-{start + i}", "purpose": "training",
+                           "storage_uri": f"file:///bench/{start + i}.csv", "data_hash": f"{start + i:064x}",
+                           "size_mb": 1.0, "description": "benchmark row", "scrub_cursor": 0} for i in range(n)]
+                db.session.execute(insert(AIDatabase), values)
+            db.session.commit()
+
+
+def bench_list(kind, rows, repeats, tmp_dir):
+    app = _bench_app(tmp_dir)
+    client = app.test_client()
+    _login(client)
+    _seed_rows(app, kind, rows)
+    client.get(f"/{kind}/{kind}")  # warm up (sqlite page cache, marshalling code paths)
+
+    sizes = []
+
+    def list_all():
+        response = client.get(f"/{kind}/{kind}")
+        assert response.status_code == 200
+        sizes.append(len(response.get_data()))
+
+    result = _summarize(_timed(list_all, repeats), rows, "rows/s")
+    result["response_mb"] = round(sizes[-1] / 2**20, 2)
+    return result
+
+
+# ---------------------------------------------------------------- runner
+
+def _plan(quick, list_rows):
+    hash_mb = 32 if quick else 256
+    upload_mb = 8 if quick else 64
+    state_dicts = [(16, 1_000_000), (128, 8_000_000)] if quick else \
+        [(16, 1_000_000), (128, 8_000_000), (1024, 64_000_000)]
+    if list_rows is None:
+        list_rows = [1_000, 10_000] if quick else [1_000, 100_000, 1_000_000]
+
+    cases = [
+        (f"sha256_stream[{hash_mb}MB]", bench_sha256_stream, {"size_mb": hash_mb, "repeats": 5}),
+        (f"merkle_hash_utils[{hash_mb}MB]", bench_merkle_hash_utils, {"size_mb": hash_mb, "repeats": 5}),
+        (f"merkle_databases_endpoint[{hash_mb}MB]", bench_merkle_databases_endpoint,
+         {"size_mb": hash_mb, "repeats": 5}),
+    ]
+    for tensors, params in state_dicts:
+        cases.append((f"canonical_state_dict_hash[{tensors}x{params // tensors}]", bench_canonical_state_dict_hash,
+                      {"tensors": tensors, "params": params, "repeats": 5}))
+    for kind in ("models", "databases"):
+        cases.append((f"upload_{kind}[{upload_mb}MB]", bench_upload,
+                      {"kind": kind, "size_mb": upload_mb, "repeats": 5}))
+    for kind in ("models", "databases"):
+        for rows in list_rows:
+            repeats = 20 if rows <= 10_000 else (3 if rows <= 100_000 else 1)
+            cases.append((f"list_{kind}[{rows}]", bench_list, {"kind": kind, "rows": rows, "repeats": repeats}))
+    return cases
+
+
+def _run_case(fn, kwargs, queue):
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = fn(tmp_dir=tmp_dir, **kwargs)
+        # ru_maxrss is in KiB on Linux (bytes on macOS)
+        scale = 1 if sys.platform == "darwin" else 1024
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(fn, kwargs, timeout=DEFAULT_CASE_TIMEOUT):
+    """
+    Run one case in a fresh interpreter (clean peak RSS, no state shared with
+    other cases). A child that dies without reporting (segfault, OOM kill) or
+    overruns `timeout` seconds gives {"error": ...} instead of hanging the suite.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(fn, kwargs, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = queue.get(timeout=_POLL_SECONDS)
+            break
+        except queue_module.Empty:
+            pass
+        if proc.exitcode is not None:
+            try:
+                result = queue.get(timeout=_POLL_SECONDS)  # put just before exiting
+            except queue_module.Empty:
+                result = {"error": f"case process exited with code {proc.exitcode} without a result"}
+            break
+        if time.monotonic() > deadline:
+            proc.kill()
+            result = {"error": f"timed out after {timeout}s"}
+            break
+    proc.join()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """ Regressions vs. `baseline`: lower throughput, higher p99 or higher peak RSS beyond `tolerance` """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or "error" in current or "skipped" in current or "error" in before or "skipped" in before:
+            continue
+        checks = (("throughput", -1), ("p99_ms", 1), ("peak_rss_mb", 1))
+        for metric, direction in checks:
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction > tolerance:
+                regressions.append({"case": name, "metric": metric, "baseline": old, "current": new,
+                                    "change_pct": round(change * 100, 1)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller inputs (CI / laptops)")
+    parser.add_argument("--only", help="comma separated substrings of case names to run")
+    parser.add_argument("--list-rows", help="row counts for the list endpoints, e.g. 1000,100000")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative change tolerated before flagging")
+    parser.add_argument("--case-timeout", type=float, default=DEFAULT_CASE_TIMEOUT,
+                        help="seconds before a case is killed and reported as failed")
+    args = parser.parse_args()
+
+    list_rows = [int(r) for r in args.list_rows.split(",")] if args.list_rows else None
+    only = args.only.split(",") if args.only else None
+
+    results = {}
+    for name, fn, kwargs in _plan(args.quick, list_rows):
+        if only and not any(o in name for o in only):
+            continue
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = run_case(fn, kwargs, args.case_timeout)
+        if "error" in results[name]:
+            print(f"{name} failed: {results[name]['error']}", file=sys.stderr)
+
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "results": results,
+        "failed": [name for name, result in results.items() if "error" in result],
+    }
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f)["results"], args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+    if report.get("regressions") or report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# backend/benchmarks/loadtest.py
+# Load generator for the whole stack: starts the app in its own process (same
+# single-process threaded server as run.py, or gunicorn), points the chain CLI
+# at blockchain/clients/local_chain_standin.js and replays a weighted mix of
+# signups/logins, Models.jsx-style list polling, uploads and rents at rising
+# concurrency. Prints throughput and p50/p95/p99 per endpoint and level as JSON.
+#
+#   python -m backend.benchmarks.loadtest --concurrency 1,4,16,64 --duration 20
+#   python -m backend.benchmarks.loadtest --server gunicorn --workers 4 --mix list_models=10,rent=5
+import argparse
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STANDIN_CLI = os.path.join(REPO_ROOT, "blockchain", "clients", "local_chain_standin.js")
+
+DEFAULT_MIX = "signup=1,login=4,list_models=40,list_databases=10,get_model=10,upload_model=1,upload_database=2,rent=4"
+PASSWORD = "loadtest-password1"
+
+
+def create_loadtest_app():
+    """ App factory used by the server process (werkzeug or gunicorn) """
+    from backend.configuration_classes_for_flask import Config
+    from backend.externals import db
+    from backend.main import create_app
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.environ["LOADTEST_DB"]
+        SQLALCHEMY_ECHO = False
+        JWT_ACCESS_TOKEN_EXPIRES = False
+        RATE_LIMIT_ENABLED = os.environ.get("LOADTEST_RATE_LIMITS") == "1"
+
+    app = create_app(LoadTestConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _serve(port):
+    app = create_loadtest_app()
+    app.run(host="127.0.0.1", port=port, threaded=True, use_reloader=False)
+
+
+def _start_server(args, db_path):
+    env = dict(os.environ, LOADTEST_DB=db_path,
+               CHAIN_CLIENT="node", REGISTER_MODEL_CLI=STANDIN_CLI, RENT_MODEL_CLI=STANDIN_CLI,
+               CHAIN_STANDIN_LATENCY_MS=str(args.chain_latency_ms),
+               LOADTEST_RATE_LIMITS="1" if args.rate_limits else "0")
+    if args.server == "gunicorn":
+        cmd = ["gunicorn", "-w", str(args.workers), "--threads", str(args.threads), "-b", f"127.0.0.1:{args.port}",
+               "--timeout", "300", "backend.benchmarks.loadtest:create_loadtest_app()"]
+    else:
+        cmd = [sys.executable, "-m", "backend.benchmarks.loadtest", "--serve", "--port", str(args.port)]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base + "/", timeout=1)
+            return proc, base
+        except requests.ConnectionError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start within 60s")
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # endpoint -> [seconds]
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Actions:
+    """ One method per traffic type; each returns (endpoint label, ok) """
+
+    def __init__(self, base, upload_bytes, state):
+        self.base = base
+        self.upload_bytes = upload_bytes
+        self.state = state  # shared: users [(username, headers)], model ids, created [(headers, kind, id)]
+
+    def _user(self, rng):
+        return rng.choice(self.state["users"])
+
+    def signup(self, session, rng):
+        name = f"lt-{rng.getrandbits(48):x}"
+        r = session.post(self.base + "/auth/signup",
+                         json={"username": name, "email": f"{name}@load.test", "password": PASSWORD})
+        return "POST /auth/signup", r.status_code == 201
+
+    def login(self, session, rng):
+        username, _ = self._user(rng)
+        r = session.post(self.base + "/auth/login", json={"identifier": username, "password": PASSWORD})
+        return "POST /auth/login", r.status_code == 200
+
+    def list_models(self, session, rng):
+        _, headers = self._user(rng)
+        r = session.get(self.base + "/models/models", headers=headers)
+        return "GET /models/models", r.status_code == 200
+
+    def list_databases(self, session, rng):
+        _, headers = self._user(rng)
+        r = session.get(self.base + "/databases/databases", headers=headers)
+        return "GET /databases/databases", r.status_code == 200
+
+    def get_model(self, session, rng):
+        r = session.get(f"{self.base}/models/models/{rng.choice(self.state['model_ids'])}")
+        return "GET /models/models/<id>", r.status_code == 200
+
+    def upload_model(self, session, rng):
+        _, headers = self._user(rng)
+        r = session.post(self.base + "/models/models/upload", headers=headers,
+                         data={"name": "loadtest-model", "price_lamports": "1000"},
+                         files={"file": ("loadtest.bin", io.BytesIO(rng.randbytes(self.upload_bytes)))})
+        if r.status_code == 201:
+            self.state["model_ids"].append(r.json()["id"])
+            self.state["created"].append((headers, "models", r.json()["id"]))
+        return "POST /models/models/upload", r.status_code == 201
+
+    def upload_database(self, session, rng):
+        _, headers = self._user(rng)
+        lines = b"".join(b"%d,%d,sample\n" % (i, rng.getrandbits(32)) for i in range(self.upload_bytes // 20))
+        r = session.post(self.base + "/databases/databases/upload", headers=headers,
+                         data={"name": "loadtest-db", "purpose": "training"},
+                         files={"file": ("loadtest.csv", io.BytesIO(lines))})
+        if r.status_code == 201:
+            self.state["created"].append((headers, "databases", r.json()["id"]))
+        return "POST /databases/databases/upload", r.status_code == 201
+
+    def rent(self, session, rng):
+        _, headers = self._user(rng)
+        r = session.post(f"{self.base}/models/models/{rng.choice(self.state['model_ids'])}/rent", headers=headers)
+        return "POST /models/models/<id>/rent", r.status_code == 200
+
+
+def _setup(base, users, seed_models, upload_bytes):
+    """ Users to log in as and a few models to read / rent before the clock starts """
+    session = requests.Session()
+    state = {"users": [], "model_ids": [], "created": []}
+    for i in range(users):
+        name = f"lt-seed-{i}"
+        session.post(base + "/auth/signup", json={"username": name, "email": f"{name}@load.test", "password": PASSWORD})
+        token = session.post(base + "/auth/login", json={"identifier": name, "password": PASSWORD}).json()["access_token"]
+        state["users"].append((name, {"Authorization": f"Bearer {token}"}))
+    actions = Actions(base, upload_bytes, state)
+    rng = random.Random(0)
+    for _ in range(seed_models):
+        actions.upload_model(session, rng)
+    if not state["model_ids"]:
+        raise RuntimeError("could not seed any model (is the server healthy?)")
+    return state
+
+
+def run_level(actions, mix, concurrency, duration):
+    names, weights = zip(*mix.items())
+    recorder = Recorder()
+    stop = time.monotonic() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.monotonic() < stop:
+            action = getattr(actions, rng.choices(names, weights)[0])
+            start = time.perf_counter()
+            try:
+                endpoint, ok = action(session, rng)
+            except requests.RequestException:
+                endpoint, ok = action.__name__, False
+            recorder.record(endpoint, time.perf_counter() - start, ok)
+
+    threads = [threading.Thread(target=worker, args=(concurrency * 1000 + i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": recorder.errors[endpoint],
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 1),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 1),
+            "p99_ms": round(_percentile(samples, 99) * 1000, 1),
+        }
+    total = sum(len(s) for s in recorder.samples.values())
+    return {"concurrency": concurrency, "seconds": round(elapsed, 1), "total_rps": round(total / elapsed, 2),
+            "error_rate": round(sum(recorder.errors.values()) / total, 4) if total else None,
+            "endpoints": endpoints}
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Actions, name.strip()):
+            raise SystemExit(f"unknown traffic type: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)  # server subprocess
+    parser.add_argument("--server", choices=("werkzeug", "gunicorn"), default="werkzeug")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="traffic weights, e.g. list_models=40,rent=4")
+    parser.add_argument("--upload-kb", type=int, default=2048)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed-models", type=int, default=10)
+    parser.add_argument("--chain-latency-ms", type=int, default=400)
+    parser.add_argument("--rate-limits", action="store_true", help="keep RATE_LIMITS on (off by default)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.port)
+        return
+
+    mix = _parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        proc, base = _start_server(args, os.path.join(tmp_dir, "loadtest.db"))
+        try:
+            upload_bytes = args.upload_kb * 1024
+            state = _setup(base, args.users, args.seed_models, upload_bytes)
+            actions = Actions(base, upload_bytes, state)
+            levels = []
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                print(f"concurrency {concurrency} ...", file=sys.stderr)
+                levels.append(run_level(actions, mix, concurrency, args.duration))
+
+            # remove what the run uploaded (blobs live in the shared UPLOAD_FOLDER)
+            session = requests.Session()
+            for headers, kind, entry_id in state["created"]:
+                session.delete(f"{base}/{kind}/{kind}/{entry_id}", headers=headers)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = {"server": args.server, "workers": args.workers if args.server == "gunicorn" else 1,
+              "mix": mix, "upload_kb": args.upload_kb, "chain_latency_ms": args.chain_latency_ms,
+              "levels": levels}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
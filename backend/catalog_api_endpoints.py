@@ -0,0 +1,31 @@
+# backend/catalog_api_endpoints.py
+# Admin-only catalog endpoints over catalog_transfer.py: GET /admin/export streams
+# the whole catalog as NDJSON. Bulk import is CLI only (`flask import-artifacts`).
+from flask import Response, current_app, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from flask_restx import Namespace, Resource
+
+from backend.catalog_transfer import EXPORT_KINDS, iter_catalog_ndjson
+from backend.principal_cache import require_admin
+
+catalog_ns = Namespace("catalog", path="/admin", description="Admin-only catalog export")
+
+
+@catalog_ns.route("/export")
+class CatalogExportResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Catalog as NDJSON (?kind=user,model,database), streamed with constant memory"""
+        denied = require_admin()
+        if denied:
+            return denied
+        kinds = [k for k in request.args.get("kind", "").split(",") if k] or list(EXPORT_KINDS)
+        unknown = set(kinds) - set(EXPORT_KINDS)
+        if unknown:
+            return {"message": f"Unknown kind(s): {', '.join(sorted(unknown))}"}, 400
+        batch_size = current_app.config.get("EXPORT_BATCH_SIZE", 1000)
+        return Response(
+            stream_with_context(iter_catalog_ndjson(kinds, batch_size)),
+            mimetype="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=catalog.ndjson"},
+        )
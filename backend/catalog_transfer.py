@@ -0,0 +1,229 @@
+# backend/catalog_transfer.py
+# Catalog export / bulk import.
+#  - export: users, models and datasets as NDJSON (one {"kind": ..., ...} object
+#    per line), read with yield_per over plain column selects so memory stays
+#    constant no matter how big the catalog is (no ORM identity map, no .all()).
+#  - import: hash thousands of artifact files on every core (one read per file
+#    for copy + sha256 + merkle leaves), then insert the rows in bulk.
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import click
+from sqlalchemy import insert, select
+from werkzeug.utils import secure_filename
+
+from backend.constants import UPLOAD_FOLDER
+from backend.externals import db
+from backend.models import AIDatabase, AIModel, User, size_mb_to_bytes
+from backend.utils.hash_cache import get_cache
+from backend.utils.hash_utils import merkle_root_from_leaves
+from backend.utils.storage_backends import publish_file
+
+EXPORT_KINDS = {"user": User, "model": AIModel, "database": AIDatabase}
+SECRET_COLUMNS = {"password"}
+SKIPPED_COLUMNS = {"merkle_leaves"}     # derived from the blob, recomputed by the scrubber / on import
+
+_CHUNK = 4 * 1024 * 1024                # same leaf size as merkle_root_from_file
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    return value
+
+
+def iter_catalog_ndjson(kinds=None, batch_size=1000, include_secrets=False):
+    """ Yield the catalog as NDJSON lines, `batch_size` rows fetched per round trip """
+    for kind in kinds or EXPORT_KINDS:
+        model = EXPORT_KINDS[kind]
+        columns = [c for c in model.__table__.columns
+                   if c.name not in SKIPPED_COLUMNS and (include_secrets or c.name not in SECRET_COLUMNS)]
+        names = [c.name for c in columns]
+        result = db.session.execute(
+            select(*columns).order_by(model.__table__.c.id).execution_options(yield_per=batch_size)
+        )
+        for row in result:
+            record = {"kind": kind}
+            record.update(zip(names, map(_jsonable, row)))
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _ingest(source, dest_dir, known=None):
+    """
+    Worker (separate process): copy `source` under `dest_dir` while hashing it.
+    Returns sha256, merkle root / leaves and size of the copy. `known` = (sha256,
+    leaves) from the hash cache: the file is only copied (in the kernel where possible).
+    """
+    name = secure_filename(os.path.basename(source)) or "artifact"
+    stem, ext = os.path.splitext(name)
+    n = 0
+    while True:
+        dest = os.path.join(dest_dir, name if n == 0 else f"{stem}-{n}{ext}")
+        try:
+            fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            break
+        except FileExistsError:
+            n += 1
+
+    if known is not None:
+        os.close(fd)
+        shutil.copyfile(source, dest)  # sendfile / copy_file_range: no pass through Python
+        sha256, leaves = known
+        return {
+            "source": source,
+            "path": dest,
+            "hash": sha256,
+            "merkle_root": merkle_root_from_leaves(leaves),
+            "merkle_leaves": b"".join(leaves),
+            "size": os.path.getsize(dest),
+        }
+
+    sha = hashlib.sha256()
+    leaves = []
+    size = 0
+    with open(source, "rb") as src, os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = src.read(_CHUNK)
+            if not chunk:
+                break
+            sha.update(chunk)
+            leaves.append(hashlib.sha256(chunk).digest())
+            out.write(chunk)
+            size += len(chunk)
+    return {
+        "source": source,
+        "path": dest,
+        "hash": sha.hexdigest(),
+        "merkle_root": merkle_root_from_leaves(leaves),
+        "merkle_leaves": b"".join(leaves),
+        "size": size,
+    }
+
+
+def _iter_files(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def _model_row(owner_id, item, name):
+    return {
+        "uploader_id": owner_id,
+        "name": name,
+        "model_hash": item["hash"],
+        "merkle_root": item["merkle_root"],
+        "merkle_leaves": item["merkle_leaves"],
+        "storage_uri": item["storage_uri"],
+        "price_lamports": 0,
+        "size_mb": item["size"] / (1024 * 1024),
+        "stored_size_mb": item["size"] / (1024 * 1024),
+        "status": "pending",
+        "integrity_status": "unverified",
+        "scrub_cursor": 0,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _database_row(owner_id, item, name, purpose):
+    return {
+        "user_id": owner_id,
+        "name": name,
+        "purpose": purpose,
+        "data_hash": item["hash"],
+        "merkle_root": item["merkle_root"],
+        "merkle_leaves": item["merkle_leaves"],
+        "storage_uri": item["storage_uri"],
+        "size_mb": item["size"] / (1024 * 1024),
+        "integrity_status": "unverified",
+        "scrub_cursor": 0,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def bulk_import(directory, kind, owner, purpose="training", workers=None, batch_size=500):
+    """
+    Import every file under `directory` as AIModel ("model") or AIDatabase ("database")
+    rows owned by `owner`. Returns the number of rows inserted.
+    Models are hashed with streaming sha256 (no canonical torch hash) and are not
+    registered on-chain; their status stays "pending".
+    """
+    model = AIModel if kind == "model" else AIDatabase
+    dest_dir = os.path.join(UPLOAD_FOLDER, "models" if kind == "model" else "databases")
+    os.makedirs(dest_dir, exist_ok=True)
+
+    inserted = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        db.session.execute(insert(model), batch)
+        User.add_storage_usage(owner.id, sum(size_mb_to_bytes(row["size_mb"]) for row in batch))
+        db.session.commit()
+        inserted += len(batch)
+        batch.clear()
+
+    cache = get_cache()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        sources = list(_iter_files(directory))
+        # files imported (or hashed) before are only copied
+        known = [cache.lookup(source) if cache is not None else None for source in sources]
+        for item in pool.map(_ingest, sources, [dest_dir] * len(sources), known, chunksize=8):
+            if cache is not None:
+                leaves = [item["merkle_leaves"][i:i + 32] for i in range(0, len(item["merkle_leaves"]), 32)]
+                cache.remember(item["source"], item["hash"], leaves)
+                cache.remember(item["path"], item["hash"], leaves)
+            item["storage_uri"] = publish_file(item["path"], os.path.relpath(item["path"], UPLOAD_FOLDER))
+            name = os.path.splitext(os.path.basename(item["source"]))[0]
+            if kind == "model":
+                batch.append(_model_row(owner.id, item, name))
+            else:
+                batch.append(_database_row(owner.id, item, name, purpose))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    return inserted
+
+
+def register_catalog_commands(app):
+    @app.cli.command("export-catalog")
+    @click.option("--output", "-o", type=click.Path(dir_okay=False), help="Output file (default: stdout).")
+    @click.option("--kind", "kinds", multiple=True, type=click.Choice(sorted(EXPORT_KINDS)),
+                  help="Only export these kinds (repeatable).")
+    @click.option("--batch-size", default=1000, help="Rows fetched per round trip.")
+    @click.option("--include-secrets", is_flag=True, help="Include password hashes (for migrations).")
+    def export_catalog(output, kinds, batch_size, include_secrets):
+        """Stream users, models and datasets as NDJSON."""
+        out = open(output, "w", encoding="utf-8") if output else sys.stdout
+        try:
+            for line in iter_catalog_ndjson(kinds, batch_size, include_secrets):
+                out.write(line)
+        finally:
+            if output:
+                out.close()
+
+    @app.cli.command("import-artifacts")
+    @click.argument("directory", type=click.Path(exists=True, file_okay=False))
+    @click.option("--kind", type=click.Choice(["model", "database"]), required=True)
+    @click.option("--owner", required=True, help="Username that will own the imported rows.")
+    @click.option("--purpose", default="training", help="Purpose of imported datasets.")
+    @click.option("--workers", type=int, default=None, help="Hashing processes (default: one per CPU).")
+    @click.option("--batch-size", default=500, help="Rows per bulk insert.")
+    def import_artifacts(directory, kind, owner, purpose, workers, batch_size):
+        """Hash every file under DIRECTORY on all cores and bulk-insert the catalog rows."""
+        user = User.query.filter_by(username=owner).first()
+        if user is None:
+            raise click.ClickException(f"No user named {owner!r}")
+        count = bulk_import(directory, kind, user, purpose, workers, batch_size)
+        click.echo(f"imported {count} {kind}(s)")
@@ -16,6 +16,96 @@ class Config:
     SECRET_KEY = fetch_keys().get('DEV_FALLBACK_SECRET_KEY') if fetch_keys() else secrets.token_hex(32)
     SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS')
     SQLALCHEMY_ECHO = False
+    SQLALCHEMY_REPLICA_URIS = [u for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u]  # GET reads go here
+    REPLICA_MAX_LAG_SECONDS = 5.0         # further behind (or behind the caller's last write): read from the primary
+    REPLICA_LAG_CHECK_INTERVAL = 2.0      # seconds a measured replica lag is reused
+    METRICS_ENABLED = True                # Prometheus metrics at /metrics
+    DATASET_INDEX_STRIDE = 256      # rows between two entries of the dataset row-offset index
+    STORAGE_COMPRESSION = os.getenv('STORAGE_COMPRESSION', 'none')   # none | zstd
+    STORAGE_COMPRESSION_LEVEL = 3
+    STORAGE_COMPRESSION_MIN_RATIO = 0.9   # keep the raw file unless compressed < 90% of it
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')         # local | s3
+    S3_BUCKET = os.getenv('S3_BUCKET')
+    S3_PREFIX = os.getenv('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')                  # e.g. http://localhost:9000 for minio
+    S3_REGION = os.getenv('S3_REGION')
+    S3_PART_SIZE = 8 * 1024 * 1024
+    S3_MAX_CONCURRENCY = 8                # multipart parts uploaded in parallel
+    # store models as content-defined chunks shared across versions; their storage_uri (also the one
+    # registered on-chain) is then cas://<manifest>, which only this server can resolve
+    MODEL_DEDUP = os.getenv('MODEL_DEDUP') == '1'
+    CDC_MIN_SIZE = 256 * 1024
+    CDC_AVG_SIZE = 1024 * 1024            # must be a power of two
+    CDC_MAX_SIZE = 4 * 1024 * 1024
+    MODEL_SAFETENSORS = os.getenv('MODEL_SAFETENSORS', '1') == '1'   # also store torch checkpoints as safetensors
+    MODEL_CONVERT_WORKERS = 1             # conversion processes (each maps the checkpoint; ~largest tensor resident)
+    MODEL_CONVERT_TIMEOUT = 600           # seconds; slower conversions keep only the original checkpoint
+    SCRUB_ENABLED = os.getenv('SCRUB_ENABLED') == '1'              # background merkle re-verification
+    SCRUB_INTERVAL_SECONDS = 60
+    SCRUB_IO_BYTES_PER_SEC = 8 * 1024 * 1024
+    SCRUB_ARTIFACTS_PER_PASS = 20
+    SCRUB_LEAVES_PER_ARTIFACT = 4         # merkle leaves (4 MiB each) re-read per artifact per pass
+    GC_ENABLED = os.getenv('GC_ENABLED', '1') == '1'               # background removal of deleted blobs (storage_tombstones)
+    GC_INTERVAL_SECONDS = 30
+    GC_BATCH = 200                        # tombstones processed per GC pass
+    GC_MAX_ATTEMPTS = 5                   # failing tombstones are kept (last_error) but no longer retried
+    GC_SWEEP_INTERVAL_SECONDS = 3600      # orphan sweep of UPLOAD_FOLDER (blobs no row references)
+    GC_SWEEP_GRACE_SECONDS = 3600         # files younger than this may belong to an upload still in flight
+    BULK_DELETE_MAX_ROWS = 10_000         # rows per POST .../bulk-delete
+    HASH_CACHE_ENABLED = True             # memoize file sha256 / merkle leaves by (dev, inode, size, mtime_ns)
+    HASH_CACHE_FILE = os.getenv('HASH_CACHE_FILE')                  # SQLite file shared by the workers; default uploads/.hashcache
+    HASH_CACHE_MAX_ENTRIES = 100_000      # least recently used entries are evicted past this
+    PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')       # argon2id | scrypt | pbkdf2 (old hashes upgraded at login)
+    SCRYPT_N = 2 ** 15
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+    PBKDF2_ITERATIONS = 600_000
+    ARGON2_TIME_COST = 3
+    ARGON2_MEMORY_COST = 64 * 1024        # KiB
+    ARGON2_PARALLELISM = 1
+    PASSWORD_HASH_WORKERS = None          # hashing threads per process (None = one per CPU)
+    PASSWORD_HASH_MAX_PENDING = 64        # queued + running hashes before /auth answers 503
+    BREACHED_PASSWORDS_FILTER = os.getenv('BREACHED_PASSWORDS_FILTER', os.path.join(BASE_DIR, 'breached_passwords.bloom'))  # flask build-password-filter
+    PASSWORD_SIMILARITY_CHECK = True      # reject passwords too close to the username / email
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMITS = {                       # token buckets per JWT user (or client IP): capacity / refill period
+        "login": "10/minute",
+        "signup": "5/minute",
+        "upload": "20/hour",
+        "rent": "30/minute",
+    }
+    RATE_LIMIT_STATE_FILE = os.getenv('RATE_LIMIT_STATE_FILE')      # shared by the workers; default uploads/.ratelimit
+    RATE_LIMIT_TRUST_PROXY = False        # key anonymous clients by X-Forwarded-For (behind a reverse proxy)
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_MB', 16 * 1024)) * 1024 * 1024  # larger request bodies get a 413 up front
+    UPLOAD_PREFLIGHT_BYTES = 256 * 1024   # head of an upload body read to check metadata / extension / magic bytes
+    USER_STORAGE_QUOTA_MB = float(os.getenv('USER_STORAGE_QUOTA_MB', 10 * 1024))  # default per-user quota (admins unlimited)
+    RESPONSE_COMPRESSION_MIN_BYTES = 1024  # list endpoints: smaller bodies are sent uncompressed
+    RESPONSE_GZIP_LEVEL = 5
+    RESPONSE_BROTLI_QUALITY = 4           # used when the brotli package is installed and the client accepts br
+    EXPORT_BATCH_SIZE = 1000              # rows per round trip for GET /admin/export (yield_per)
+    CHAIN_CLIENT = os.getenv('CHAIN_CLIENT', 'python')   # "python": in-process JSON-RPC client, "node": blockchain/clients/*.js
+    SOLANA_RPC_URL = os.getenv('RPC_URL', 'http://127.0.0.1:8899')
+    SOLANA_PROGRAM_ID = os.getenv('PROGRAM_ID')            # default: IDL address, else the program's declare_id!
+    SOLANA_IDL_PATH = os.getenv('IDL_PATH', os.path.join(BASE_DIR, '..', 'blockchain', 'target', 'idl', 'model_registry.json'))
+    SOLANA_WALLET_PATH = os.getenv('WALLET_PATH', '~/.config/solana/id.json')
+    SOLANA_COMMITMENT = 'confirmed'
+    SOLANA_CONFIRM_TIMEOUT = 60           # seconds to wait for confirmation (0 = return after sendTransaction)
+    SOLANA_BLOCKHASH_TTL = 20             # seconds a recent blockhash is reused (valid for ~60s on-chain)
+    RENTAL_SYNC_ENABLED = os.getenv('RENTAL_SYNC_ENABLED', '0') == '1'   # record ModelRented events of rentals made outside the API
+    RENTAL_SYNC_INTERVAL_SECONDS = 30
+    RENTAL_SYNC_BATCH = 1000              # signatures per getSignaturesForAddress page
+    LEADERBOARD_CACHE_SECONDS = 10        # per-process cache of GET /models/models/leaderboard
+    LEADERBOARD_MAX = 100                 # largest ?limit=
+    CHAIN_CLI_CONCURRENCY = 4             # concurrent node CLI calls for batch uploads (CHAIN_CLIENT = "node")
+    MODEL_BATCH_MAX_FILES = 64            # files per POST /models/models/upload-batch
+    MODEL_BATCH_WORKERS = None            # ingest threads per batch (None = min(8, CPUs))
+    SOLANA_RPC_POOL_SIZE = 8              # keep-alive connections to the RPC node per worker
+    PRINCIPAL_CACHE_TTL = 60              # seconds a cached user principal (id, is_admin) stays valid
+    PROFILER_MAX_SECONDS = 120            # upper bound for on-demand profiles (POST /admin/profile)
+    PROFILER_MIN_INTERVAL_MS = 1
+    SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '0')) or None  # unset = capture off
+    SLOW_REQUEST_SAMPLE_INTERVAL_MS = 10
+    SLOW_REQUEST_KEEP = 50                # slow requests kept per worker
 
 class DevConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(BASE_DIR, 'dev.db')
@@ -25,6 +115,10 @@ class DevConfig(Config):
 class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(BASE_DIR, 'test.db')
     TESTING = True
+    RATE_LIMIT_ENABLED = False
+    GC_ENABLED = False
+    HASH_CACHE_FILE = ":memory:"
+    RENTAL_SYNC_ENABLED = False
 
 # class ProdConfig():
 #     SECRET_KEY = fetch_keys().get('PRODUCTION_KEY') if fetch_keys() else None
@@ -1,3 +1,6 @@
 import os
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
\ No newline at end of file
+UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+CHUNK_STORE_FOLDER = os.path.join(UPLOAD_FOLDER, 'chunks')   # shared content-defined chunks (model versions)
+# merkle leaf size; compressed blobs use the same frame size (utils/compressed_blob.py)
+MERKLE_CHUNK_SIZE = 4 * 1024 * 1024
@@ -0,0 +1,172 @@
+# backend/db_routing.py
+# Read-replica routing. SELECTs issued while serving GET/HEAD requests go to a
+# replica engine (SQLALCHEMY_REPLICA_URIS); writes, flushes, SELECT ... FOR
+# UPDATE, every later statement of a request that wrote, and everything outside
+# a request (CLI, storage GC, scrubber) stay on the primary.
+# A replica is only used while its measured lag is under REPLICA_MAX_LAG_SECONDS
+# and shorter than the time since the caller's last write (read-your-writes);
+# otherwise the read falls back to the primary. Lag is probed at most every
+# REPLICA_LAG_CHECK_INTERVAL seconds per replica (PostgreSQL streaming
+# replication; other dialects, e.g. SQLite snapshots, cannot report it and are
+# assumed to be REPLICA_MAX_LAG_SECONDS behind). Recent writers are tracked per
+# process, like principal_cache.
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+
+from backend.metrics import observe_db_route, observe_replica_lag
+
+READ_METHODS = {"GET", "HEAD"}
+
+# seconds behind the primary; NULL when nothing was replayed yet
+_LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lag = None                    # seconds; None = the dialect cannot tell
+        self.checked_at = float("-inf")
+        self.lock = threading.Lock()
+
+    def measure_lag(self):
+        """ Current lag in seconds, None when the dialect has no way to report it """
+        query = _LAG_QUERIES.get(self.engine.dialect.name)
+        if query is None:
+            return None
+        with self.engine.connect() as conn:
+            value = conn.execute(sa.text(query)).scalar()
+        return float("inf") if value is None else float(value)
+
+
+class ReplicaRouter:
+    def __init__(self, engines, max_lag=5.0, check_interval=2.0, max_clients=10_000):
+        self.replicas = [Replica(f"replica{i}", engine) for i, engine in enumerate(engines)]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.max_clients = max_clients
+        self._writes = OrderedDict()       # client key -> time.monotonic() of its last write
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+
+    @property
+    def engines(self):
+        return [replica.engine for replica in self.replicas]
+
+    def lag_bound(self, replica, now):
+        """ Upper bound of how far behind `replica` is right now (probing it when the last value is stale) """
+        if now - replica.checked_at >= self.check_interval and replica.lock.acquire(blocking=False):
+            # one prober per replica; concurrent requests keep using the previous value
+            try:
+                try:
+                    replica.lag = replica.measure_lag()
+                except Exception:
+                    current_app.logger.warning("Replica %s unreachable; reading from the primary", replica.name)
+                    replica.lag = float("inf")
+                replica.checked_at = time.monotonic()
+                observe_replica_lag(replica.name, replica.lag)
+            finally:
+                replica.lock.release()
+        if replica.lag is None:
+            return self.max_lag
+        return replica.lag + max(0.0, now - replica.checked_at)  # it may have fallen further behind since
+
+    def pick(self, client_keys):
+        """ Engine of a replica fresh enough for this client, None to read from the primary """
+        now = time.monotonic()
+        with self._lock:
+            last_write = max((self._writes.get(key, float("-inf")) for key in client_keys), default=float("-inf"))
+        fresh = []
+        for replica in self.replicas:
+            bound = self.lag_bound(replica, now)
+            if bound <= self.max_lag and bound < now - last_write:
+                fresh.append(replica)
+        if not fresh:
+            return None
+        return fresh[next(self._next) % len(fresh)].engine
+
+    def note_write(self, client_key):
+        now = time.monotonic()
+        horizon = now - self.max_lag - self.check_interval  # older writes are visible on any replica we'd use
+        with self._lock:
+            self._writes[client_key] = now
+            self._writes.move_to_end(client_key)
+            while self._writes and (len(self._writes) > self.max_clients
+                                    or next(iter(self._writes.values())) < horizon):
+                self._writes.popitem(last=False)
+
+
+def _client_keys():
+    """ Keys a recent write may have been recorded under: JWT user (when present) and client address """
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if current_app.config.get("RATE_LIMIT_TRUST_PROXY") and request.access_route:
+        ip_key = f"ip:{request.access_route[0]}"
+    else:
+        ip_key = f"ip:{request.remote_addr}"
+    return (f"user:{identity}", ip_key) if identity is not None else (ip_key,)
+
+
+def _is_read(clause):
+    return bool(getattr(clause, "is_select", False)) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RoutingSession(Session):
+    """ Flask-SQLAlchemy session that sends the reads of GET/HEAD requests to a replica when one is fresh enough """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        if self._flushing or not _is_read(clause):
+            self.info["wrote"] = True  # the rest of this request reads its own writes from the primary
+            return engine
+        if not has_request_context() or request.method not in READ_METHODS or self.info.get("wrote"):
+            return engine
+        router = current_app.extensions.get("db_replicas")
+        if router is None or engine is not self._db.engine:
+            return engine  # no replicas, or a model on another bind
+        if "db_replica" not in g:
+            # one decision per request, so all its reads see the same snapshot
+            g.db_replica = router.pick(_client_keys())
+            observe_db_route("primary" if g.db_replica is None else "replica")
+        return g.db_replica or engine
+
+
+def init_replicas(app):
+    """ Create the replica engines of SQLALCHEMY_REPLICA_URIS; None when no replica is configured """
+    uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+    if not uris:
+        return None
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    router = ReplicaRouter(
+        [sa.create_engine(uri, **options) for uri in uris],
+        max_lag=app.config.get("REPLICA_MAX_LAG_SECONDS", 5.0),
+        check_interval=app.config.get("REPLICA_LAG_CHECK_INTERVAL", 2.0),
+    )
+    app.extensions["db_replicas"] = router
+
+    from backend.externals import db
+
+    @app.after_request
+    def _remember_writer(response):
+        if db.session.registry.has() and db.session.info.get("wrote"):
+            router.note_write(_client_keys()[0])
+        return response
+
+    return router
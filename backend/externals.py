@@ -1,3 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from backend.db_routing import RoutingSession
+
+# reads of GET requests may be served by replicas (SQLALCHEMY_REPLICA_URIS, backend/db_routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,212 @@
+# backend/integrity_scrubber.py
+# Background integrity scrubber: re-verifies stored artifacts against the merkle
+# leaves saved at upload. Every pass checks a few artifacts and, for each one,
+# a rotating window of leaves, so all bytes get covered over time while the
+# I/O stays under SCRUB_IO_BYTES_PER_SEC.
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import click
+
+from backend.constants import MERKLE_CHUNK_SIZE, UPLOAD_FOLDER
+from backend.externals import db
+from backend.models import AIDatabase, AIModel, ScrubCheckpoint
+from backend.utils.hash_utils import merkle_root_from_leaves
+from backend.utils.storage_backends import READ_ERRORS, open_uri
+
+CHECKPOINT_NAME = "default"
+_KINDS = (("databases", AIDatabase), ("models", AIModel))
+
+
+class IOBudget:
+    """ Token bucket over bytes read; consume() sleeps when the scrubber runs ahead of its budget """
+
+    def __init__(self, bytes_per_sec, burst=None):
+        self.rate = bytes_per_sec
+        self.capacity = burst or MERKLE_CHUNK_SIZE
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, n):
+        self.consumed += n
+        if not self.rate or self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= n
+        if self.tokens < 0:
+            time.sleep(-self.tokens / self.rate)
+
+
+def _read_leaf(f, index, budget):
+    f.seek(index * MERKLE_CHUNK_SIZE)
+    data = f.read(MERKLE_CHUNK_SIZE)
+    budget.consume(len(data))
+    return hashlib.sha256(data).digest()
+
+
+def verify_entry(entry, leaves_per_pass, budget):
+    """
+    Verify the next `leaves_per_pass` merkle leaves of one artifact.
+    Returns "ok", "corrupted" or "skipped" (no merkle root / storage this server cannot read).
+    """
+    if not entry.merkle_root or not entry.storage_uri:
+        return "skipped"
+
+    try:
+        f = open_uri(entry.storage_uri)
+    except ValueError:
+        return "skipped"    # storage scheme this server cannot read (ipfs://, ...)
+    except READ_ERRORS:
+        return "corrupted"  # the blob is gone
+
+    # chunks (cas://) and remote ranges are opened lazily: a missing one fails in the read
+    try:
+        with f:
+            return _verify_leaves(f, entry, leaves_per_pass, budget)
+    except READ_ERRORS:
+        return "corrupted"
+
+
+def _verify_leaves(f, entry, leaves_per_pass, budget):
+    """ verify_entry on the opened blob `f` """
+    stored = entry.merkle_leaves
+    if stored is None:
+        # rows uploaded before leaves were stored: rebuild them once, they must reproduce the root
+        leaves = []
+        while True:
+            data = f.read(MERKLE_CHUNK_SIZE)
+            if not data:
+                break
+            budget.consume(len(data))
+            leaves.append(hashlib.sha256(data).digest())
+        if merkle_root_from_leaves(leaves) != entry.merkle_root:
+            return "corrupted"
+        entry.merkle_leaves = b"".join(leaves)
+        return "ok"
+
+    leaves = [stored[i:i + 32] for i in range(0, len(stored), 32)]
+    if merkle_root_from_leaves(leaves) != entry.merkle_root:
+        return "corrupted"  # the stored leaves themselves were tampered with
+    if not leaves:
+        return "ok"
+
+    start = (entry.scrub_cursor or 0) % len(leaves)
+    count = min(leaves_per_pass, len(leaves))
+    for j in range(count):
+        i = (start + j) % len(leaves)
+        if _read_leaf(f, i, budget) != leaves[i]:
+            return "corrupted"
+    entry.scrub_cursor = (start + count) % len(leaves)
+    return "ok"
+
+
+def _checkpoint():
+    cp = db.session.get(ScrubCheckpoint, CHECKPOINT_NAME)
+    if cp is None:
+        cp = ScrubCheckpoint(name=CHECKPOINT_NAME, kind=_KINDS[0][0], last_id=0, passes=0)
+        db.session.add(cp)
+    return cp
+
+
+def _next_entry(cp):
+    """ Next artifact after the checkpoint, wrapping databases -> models -> databases """
+    kinds = [k for k, _ in _KINDS]
+    start = kinds.index(cp.kind) if cp.kind in kinds else 0
+    for step in range(len(_KINDS) + 1):
+        kind, model = _KINDS[(start + step) % len(_KINDS)]
+        last_id = cp.last_id if step == 0 else 0
+        entry = model.query.filter(model.id > last_id).order_by(model.id).first()
+        if entry is not None:
+            if start + step >= len(_KINDS):
+                cp.passes += 1  # wrapped around: every artifact was visited once more
+            return kind, entry
+    return None, None
+
+
+def run_pass(config):
+    """
+    Verify up to SCRUB_ARTIFACTS_PER_PASS artifacts, committing progress after each one.
+    Returns {"checked": n, "corrupted": [(kind, id), ...], "bytes": bytes_read}.
+    """
+    budget = IOBudget(config.get("SCRUB_IO_BYTES_PER_SEC", 8 * 1024 * 1024))
+    leaves_per_pass = config.get("SCRUB_LEAVES_PER_ARTIFACT", 4)
+    corrupted = []
+    checked = 0
+    seen = set()
+
+    for _ in range(config.get("SCRUB_ARTIFACTS_PER_PASS", 20)):
+        cp = _checkpoint()
+        kind, entry = _next_entry(cp)
+        if entry is None or (kind, entry.id) in seen:
+            db.session.commit()
+            break
+        seen.add((kind, entry.id))
+
+        result = verify_entry(entry, leaves_per_pass, budget)
+        if result != "skipped":
+            entry.integrity_status = result
+            entry.verified_at = datetime.utcnow()
+        if result == "corrupted":
+            corrupted.append((kind, entry.id))
+        cp.kind, cp.last_id = kind, entry.id
+        db.session.commit()
+        checked += 1
+
+    return {"checked": checked, "corrupted": corrupted, "bytes": budget.consumed}
+
+
+def _acquire_worker_lock():
+    """ Only one scrubber per host, even with several app workers (None if another one holds it) """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    lock_file = open(os.path.join(UPLOAD_FOLDER, ".scrubber.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_background_scrubber(app):
+    """ Start the scrubber thread when SCRUB_ENABLED is set """
+    if not app.config.get("SCRUB_ENABLED"):
+        return None
+    lock = _acquire_worker_lock()
+    if lock is None:
+        return None
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    result = run_pass(app.config)
+                    for kind, entry_id in result["corrupted"]:
+                        app.logger.error("Integrity scrubber: %s #%s does not match its merkle root", kind, entry_id)
+            except Exception:
+                app.logger.exception("Integrity scrubber pass failed")
+            time.sleep(app.config.get("SCRUB_INTERVAL_SECONDS", 60))
+
+    thread = threading.Thread(target=loop, name="integrity-scrubber", daemon=True)
+    thread._lock_file = lock  # keep the flock for the lifetime of the thread
+    thread.start()
+    return thread
+
+
+def register_scrub_command(app):
+    @app.cli.command("scrub")
+    @click.option("--passes", default=1, help="Number of scrub passes to run.")
+    def scrub(passes):
+        """Run integrity scrubber passes in the foreground."""
+        for _ in range(passes):
+            result = run_pass(app.config)
+            click.echo(f"checked={result['checked']} bytes={result['bytes']} corrupted={result['corrupted']}")
@@ -41,14 +41,42 @@ def create_app(config=None):
     CORS(app)
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # Read replicas for GET traffic (SQLALCHEMY_REPLICA_URIS); before metrics so their engines get instrumented
+    try:
+        from backend.db_routing import init_replicas
+        init_replicas(app)
+    except Exception as e:
+        print("Warning: could not set up read replicas:", e)
     JWTManager(app)
 
+    # Prometheus metrics (/metrics, request latency, SQL timings); no-op without prometheus_client
+    try:
+        from backend.metrics import init_metrics
+        init_metrics(app)
+    except Exception as e:
+        print("Warning: could not set up metrics:", e)
+
+    # Slow-request capture (stacks + SQL of requests over SLOW_REQUEST_THRESHOLD_MS); nothing is hooked when unset
+    try:
+        from backend.profiling import init_slow_request_capture
+        init_slow_request_capture(app)
+    except Exception as e:
+        print("Warning: could not set up slow-request capture:", e)
+
     # Ensure upload folder exists
     try:
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     except Exception as e:
         print("Warning: could not create upload folder:", e)
 
+    # Persistent sha256 / merkle leaf memo (HASH_CACHE_*): rehashing an unchanged file costs a stat()
+    try:
+        from backend.utils.hash_cache import configure as configure_hash_cache
+        configure_hash_cache(app.config)
+    except Exception as e:
+        print("Warning: could not set up the hash cache:", e)
+
     # Register routes / namespaces inside try/except to avoid import-time issues during migrations
     try:
         api = Api(app, doc="/docs")
@@ -68,11 +96,69 @@ def create_app(config=None):
         except Exception as e:
             print("Warning: could not import databases_ns (AI database endpoints):", e)
 
+        try:
+            from backend.profiling_api_endpoints import admin_ns
+            api.add_namespace(admin_ns)
+        except Exception as e:
+            print("Warning: could not import admin_ns (profiling endpoints):", e)
+
+        try:
+            from backend.catalog_api_endpoints import catalog_ns
+            api.add_namespace(catalog_ns)
+        except Exception as e:
+            print("Warning: could not import catalog_ns (catalog export endpoint):", e)
+
         api.add_namespace(auth_ns)
     except Exception as e:
         # non-fatal: allow app to be created for CLI/migrations even if API registration failed
         print("Warning: failed to register API namespaces:", e)
 
+    # Integrity scrubber: `flask scrub` for one-off passes, background thread when SCRUB_ENABLED
+    try:
+        from backend.integrity_scrubber import register_scrub_command, start_background_scrubber
+        register_scrub_command(app)
+        start_background_scrubber(app)
+    except Exception as e:
+        print("Warning: could not set up the integrity scrubber:", e)
+
+    # Storage GC: deleted blobs are removed in the background (`flask gc [--sweep]` runs it in the foreground)
+    try:
+        from backend.storage_gc import register_gc_command, start_background_gc
+        register_gc_command(app)
+        start_background_gc(app)
+    except Exception as e:
+        print("Warning: could not set up the storage GC:", e)
+
+    # `flask build-password-filter <wordlist>`: breached-password Bloom filter used at signup
+    try:
+        from backend.password_screening import register_password_filter_command
+        register_password_filter_command(app)
+    except Exception as e:
+        print("Warning: could not register build-password-filter:", e)
+
+    # `flask reconcile-usage`: recompute per-user storage counters from the catalog
+    try:
+        from backend.storage_quota import register_usage_command
+        register_usage_command(app)
+    except Exception as e:
+        print("Warning: could not register reconcile-usage:", e)
+
+    # Rental analytics: on-chain ModelRented events are synced in the background when RENTAL_SYNC_ENABLED
+    # (`flask sync-rentals` once, `flask rebuild-rental-stats` recomputes the aggregates)
+    try:
+        from backend.rental_analytics import register_rental_commands, start_background_rental_sync
+        register_rental_commands(app)
+        start_background_rental_sync(app)
+    except Exception as e:
+        print("Warning: could not set up rental analytics:", e)
+
+    # `flask export-catalog` / `flask import-artifacts <dir>`: NDJSON backup and parallel bulk import
+    try:
+        from backend.catalog_transfer import register_catalog_commands
+        register_catalog_commands(app)
+    except Exception as e:
+        print("Warning: could not register catalog commands:", e)
+
     # Shell context (useful for `flask shell`)
     @app.shell_context_processor
     def make_shell_context():
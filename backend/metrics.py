@@ -0,0 +1,169 @@
+# backend/metrics.py
+# Prometheus metrics: per-endpoint latency, upload pipeline phases, chain CLI
+# latency, DB query counts/durations (SQLAlchemy events), hash cache hits and queue depths,
+# exposed at /metrics. Everything is a no-op when prometheus_client is missing
+# or METRICS_ENABLED is off.
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+except ImportError:
+    prometheus_client = None
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "Request latency per endpoint",
+        ["method", "endpoint", "status"], buckets=_LATENCY_BUCKETS,
+    )
+    REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", multiprocess_mode="livesum")
+    REQUEST_DB_QUERIES = Histogram(
+        "http_request_db_queries", "DB queries issued per request",
+        ["endpoint"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+    )
+    UPLOAD_PHASE = Histogram(
+        "upload_phase_seconds", "Time spent in each upload pipeline phase",
+        ["kind", "phase"], buckets=_LATENCY_BUCKETS,
+    )
+    CHAIN_LATENCY = Histogram(
+        "chain_client_duration_seconds", "Latency of blockchain client calls",
+        ["command", "outcome"], buckets=_LATENCY_BUCKETS,
+    )
+    DB_QUERY_LATENCY = Histogram(
+        "db_query_duration_seconds", "SQL statement latency", ["statement"], buckets=_DB_BUCKETS,
+    )
+    DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["statement"])
+    QUEUE_DEPTH = Gauge("queue_depth", "Items waiting in background queues", ["queue"], multiprocess_mode="livesum")
+    RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected with 429", ["limit"])
+    DB_READ_ROUTE = Counter("db_read_requests_total", "Read-only requests per database target", ["target"])
+    REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured replication lag", ["replica"], multiprocess_mode="livemax")
+    HASH_CACHE = Counter("hash_cache_lookups_total", "File digest lookups (hit, fingerprint_hit, miss)", ["result"])
+
+
+@contextmanager
+def timed_phase(kind, phase):
+    """ with timed_phase("models", "hash"): ... -> upload_phase_seconds{kind, phase} """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if prometheus_client is not None:
+            UPLOAD_PHASE.labels(kind, phase).observe(time.perf_counter() - start)
+
+
+def observe_chain_call(command, seconds, ok):
+    if prometheus_client is not None:
+        CHAIN_LATENCY.labels(command, "ok" if ok else "error").observe(seconds)
+
+
+def observe_rate_limited(limit):
+    if prometheus_client is not None:
+        RATE_LIMITED.labels(limit).inc()
+
+
+def observe_db_route(target):
+    if prometheus_client is not None:
+        DB_READ_ROUTE.labels(target).inc()
+
+
+def observe_replica_lag(replica, seconds):
+    """ seconds=None: the replica cannot report its lag (not exported) """
+    if prometheus_client is not None and seconds is not None:
+        REPLICA_LAG.labels(replica).set(seconds)
+
+
+def observe_hash_cache(result):
+    if prometheus_client is not None:
+        HASH_CACHE.labels(result).inc()
+
+
+def register_queue_depth(name, depth_fn):
+    """ Report `depth_fn()` as queue_depth{queue=name} at scrape time """
+    if prometheus_client is not None:
+        QUEUE_DEPTH.labels(name).set_function(depth_fn)
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _statement_type(statement):
+    return (statement.lstrip().split(None, 1) or ["?"])[0].upper()[:16]
+
+
+# the start time lives on the statement's execution context, not on the (pooled)
+# connection: after_cursor_execute never runs for a statement that fails
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_query_start
+    kind = _statement_type(statement)
+    DB_QUERY_LATENCY.labels(kind).observe(elapsed)
+    DB_QUERIES.labels(kind).inc()
+    try:
+        g.db_queries = g.get("db_queries", 0) + 1
+    except RuntimeError:
+        pass  # outside of a request / app context
+
+
+def _instrument_engine(engine):
+    from sqlalchemy import event
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_metrics(app):
+    """ Hook request timing + SQL events into `app` and expose /metrics """
+    if prometheus_client is None or not app.config.get("METRICS_ENABLED", True):
+        return
+
+    from backend.externals import db
+    with app.app_context():
+        _instrument_engine(db.engine)
+    replicas = app.extensions.get("db_replicas")
+    for engine in (replicas.engines if replicas is not None else ()):
+        _instrument_engine(engine)
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+        g.db_queries = 0
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        start = g.pop("request_start", None)
+        if start is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        endpoint = _endpoint()
+        status = g.pop("response_status", 500 if exc is not None else 200)
+        REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(time.perf_counter() - start)
+        REQUEST_DB_QUERIES.labels(endpoint).observe(g.pop("db_queries", 0))
+
+    @app.after_request
+    def _record_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            # several gunicorn workers: aggregate the per-process files
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,35 @@
+"""per-user storage usage counter and quota
+
+Revision ID: e4b1a9c3d702
+Revises: c7d2f48e1b93
+Create Date: 2026-10-19 15:42:08.310274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b1a9c3d702'
+down_revision = 'c7d2f48e1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('storage_used_bytes', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('storage_quota_bytes', sa.BigInteger(), nullable=True))
+
+    # backfill from the existing uploads (same rounding as size_mb_to_bytes)
+    op.execute("""
+        UPDATE users SET storage_used_bytes =
+            COALESCE((SELECT SUM(ROUND(size_mb * 1048576)) FROM ai_models WHERE ai_models.uploader_id = users.id), 0)
+          + COALESCE((SELECT SUM(ROUND(size_mb * 1048576)) FROM ai_databases WHERE ai_databases.user_id = users.id), 0)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('storage_quota_bytes')
+        batch_op.drop_column('storage_used_bytes')
@@ -0,0 +1,248 @@
+# backend/model_conversion.py
+# Ingest-time conversion of pickled torch checkpoints (.pt/.pth/.ptm) into
+# safetensors: an 8-byte header length, a JSON header with the name / dtype /
+# shape / byte range of every tensor, then the raw little-endian tensor bytes.
+# Any single tensor is one ranged read (or an mmap slice) instead of unpickling
+# the whole checkpoint.
+# The conversion runs in a separate process (MODEL_CONVERT_WORKERS at a time,
+# one checkpoint per process lifetime) that memory-maps the checkpoint
+# (torch.load(mmap=True, weights_only=True)) and streams it tensor by tensor,
+# so resident memory stays around the largest tensor. The canonical state dict
+# hash is computed in the same pass, over the bytes that were written. A
+# conversion past MODEL_CONVERT_TIMEOUT is killed and its partial output removed.
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import threading
+from collections.abc import Mapping
+
+from backend.utils.model_card import ModelCard
+from backend.utils.storage_backends import backend_for_uri, local_path, open_uri
+
+SAFETENSORS_SUFFIX = ".safetensors"
+CONVERTIBLE_EXT = {"pt", "pth", "ptm"}
+MAX_HEADER_SIZE = 100 * 1024 * 1024  # same limit as the reference implementation
+_COPY_BUFFER = 1024 * 1024
+
+# torch dtype name -> safetensors dtype
+DTYPES = {
+    "float64": "F64", "float32": "F32", "float16": "F16", "bfloat16": "BF16",
+    "int64": "I64", "int32": "I32", "int16": "I16", "int8": "I8", "uint8": "U8", "bool": "BOOL",
+    "float8_e4m3fn": "F8_E4M3", "float8_e5m2": "F8_E5M2",
+}
+# dtypes numpy has no equivalent for: canonical_state_dict_hash cannot hash them
+_NO_NUMPY = {"bfloat16", "float8_e4m3fn", "float8_e5m2"}
+
+_lock = threading.Lock()
+_slots = {}
+
+
+class SafetensorsError(ValueError):
+    pass
+
+
+def _state_dict(obj):
+    """ Flat {name: tensor} mapping of a loaded checkpoint, None for anything else (optimizer state, nesting, ...) """
+    import torch
+    if isinstance(obj, Mapping) and obj and all(
+        isinstance(k, str) and isinstance(v, torch.Tensor) for k, v in obj.items()
+    ):
+        return obj
+    return None
+
+
+def write_safetensors(state_dict, dst_path, metadata=None, card_out=None):
+    """
+    Write `state_dict` tensor by tensor (sorted by name). Returns the canonical
+    state dict hash of what was written (hash_utils.canonical_state_dict_hash),
+    or None when a dtype is one that hash cannot handle. Pass a dict as
+    `card_out` to also get the model card.
+    """
+    import torch
+    names = sorted(state_dict)
+    header, offset = {}, 0
+    card = ModelCard()
+    for name in names:
+        tensor = state_dict[name]
+        dtype = str(tensor.dtype).replace("torch.", "")
+        if dtype not in DTYPES:
+            raise SafetensorsError(f"{name}: dtype {tensor.dtype} has no safetensors equivalent")
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {"dtype": DTYPES[dtype], "shape": list(tensor.shape), "data_offsets": [offset, offset + nbytes]}
+        offset += nbytes
+        card.add(name, tensor.shape, dtype, nbytes)
+    if metadata:
+        header["__metadata__"] = {k: str(v) for k, v in metadata.items()}
+    body = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    body += b" " * (-len(body) % 8)  # tensor data starts 8-byte aligned
+
+    canonical = hashlib.sha256()
+    hashable = True
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(struct.pack("<Q", len(body)))
+            out.write(body)
+            for name in names:
+                tensor = state_dict[name]
+                # one contiguous copy at most (of this tensor only); mmap'd storages are paged in on demand
+                raw = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+                out.write(memoryview(raw))
+                dtype = str(tensor.dtype)
+                hashable = hashable and dtype.replace("torch.", "") not in _NO_NUMPY
+                canonical.update(name.encode("utf-8") + b"\0")
+                canonical.update(",".join(map(str, tensor.shape)).encode("utf-8") + b"\0")
+                canonical.update(dtype.encode("utf-8") + b"\0")
+                canonical.update(memoryview(raw))
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if card_out is not None:
+        card_out.update(card.as_dict())
+    return canonical.hexdigest() if hashable else None
+
+
+def convert_checkpoint(src_path, dst_path):
+    """
+    Worker entry point: (canonical hash, dst_path, model card) for a flat state
+    dict checkpoint, (None, None, None) when it is not one (nothing is written then).
+    """
+    import torch
+    try:
+        obj = torch.load(src_path, map_location="cpu", mmap=True, weights_only=True)
+    except RuntimeError:
+        # legacy (non-zip) serialization cannot be mapped
+        obj = torch.load(src_path, map_location="cpu", weights_only=True)
+    state_dict = _state_dict(obj)
+    if state_dict is None:
+        return None, None, None
+    card = {}
+    canonical = write_safetensors(state_dict, dst_path, metadata={"format": "pt"}, card_out=card)
+    return canonical, dst_path, card
+
+
+def _worker_slots(workers):
+    with _lock:
+        slots = _slots.get(workers)
+        if slots is None:
+            slots = _slots[workers] = threading.BoundedSemaphore(workers)
+    return slots
+
+
+def _convert_child(src_path, dst_path, conn):
+    try:
+        conn.send((True, convert_checkpoint(src_path, dst_path)))
+    except Exception as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def staging_path(src_path):
+    """ Where the copy of `src_path` is written before it is published (unique per conversion; .part until then) """
+    directory, name = os.path.split(src_path)
+    return os.path.join(directory, f".{name}.{os.urandom(8).hex()}{SAFETENSORS_SUFFIX}.part")
+
+
+def convert_in_worker(src_path, config):
+    """
+    Run convert_checkpoint in a child process, at most MODEL_CONVERT_WORKERS at a
+    time. The copy goes to a staging_path(); past MODEL_CONVERT_TIMEOUT seconds
+    the child is killed and its partial output removed (TimeoutError).
+    """
+    dst_path = staging_path(src_path)
+    timeout = config.get("MODEL_CONVERT_TIMEOUT", 600)
+    # spawn: no copy of the app's memory; a fresh process per checkpoint gives the memory back
+    ctx = multiprocessing.get_context("spawn")
+    with _worker_slots(config.get("MODEL_CONVERT_WORKERS", 1)):
+        receiver, sender = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_convert_child, args=(src_path, dst_path, sender), daemon=True)
+        proc.start()
+        sender.close()
+        ok, result = False, "conversion process exited without a result"
+        try:
+            if not receiver.poll(timeout):
+                raise TimeoutError(f"conversion took longer than {timeout}s")
+            ok, result = receiver.recv()
+        except EOFError:
+            pass  # crashed / killed (e.g. OOM) before sending anything
+        finally:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            receiver.close()
+            if not ok and os.path.exists(dst_path):
+                os.remove(dst_path)
+    if not ok:
+        raise RuntimeError(f"{result} (exit code {proc.exitcode})")
+    return result
+
+
+def read_header(reader):
+    """ (tensors {name: {dtype, shape, data_offsets}}, metadata, data start) from a binary reader """
+    prefix = reader.read(8)
+    if len(prefix) != 8:
+        raise SafetensorsError("truncated safetensors file")
+    (size,) = struct.unpack("<Q", prefix)
+    if size > MAX_HEADER_SIZE:
+        raise SafetensorsError("safetensors header too large")
+    try:
+        header = json.loads(reader.read(size))
+    except ValueError as e:
+        raise SafetensorsError(f"invalid safetensors header: {e}") from None
+    metadata = header.pop("__metadata__", {})
+    return header, metadata, 8 + size
+
+
+def safetensors_canonical_hash(path):
+    """ Canonical state dict hash recomputed from a safetensors file (what the checkpoint hashed to) """
+    torch_dtypes = {code: f"torch.{name}" for name, code in DTYPES.items()}
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        tensors, _, start = read_header(f)
+        for name in sorted(tensors):
+            info = tensors[name]
+            begin, end = info["data_offsets"]
+            h.update(name.encode("utf-8") + b"\0")
+            h.update(",".join(map(str, info["shape"])).encode("utf-8") + b"\0")
+            h.update(torch_dtypes[info["dtype"]].encode("utf-8") + b"\0")
+            f.seek(start + begin)
+            remaining = end - begin
+            while remaining:
+                chunk = f.read(min(remaining, _COPY_BUFFER))
+                if not chunk:
+                    raise SafetensorsError("truncated safetensors file")
+                h.update(chunk)
+                remaining -= len(chunk)
+    return h.hexdigest()
+
+
+def read_stored_header(uri):
+    """ read_header for a stored safetensors blob (a ranged read on remote storage) """
+    with open_uri(uri) as f:
+        return read_header(f)
+
+
+def iter_range(uri, begin, end, chunk_size=_COPY_BUFFER):
+    """
+    Bytes [begin, end) of a stored blob. Local files are served as memoryview
+    slices of a read-only mmap (no copy into Python objects; pages come straight
+    from the page cache); remote blobs as ranged GETs.
+    """
+    path = local_path(uri)
+    if path is not None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # the slices keep the mapping alive; it is unmapped once the last one is dropped
+        view = memoryview(mm)
+        for pos in range(begin, end, chunk_size):
+            yield view[pos:min(pos + chunk_size, end)]
+        return
+    backend = backend_for_uri(uri)
+    for pos in range(begin, end, chunk_size):
+        yield backend.get_range(uri, pos, min(chunk_size, end - pos))
@@ -1,4 +1,3 @@
-import hashlib
 import os
 from datetime import datetime
 from backend.externals import db
@@ -11,6 +10,8 @@ class User(db.Model):
     email = db.Column(db.String(80), nullable=False, unique=True)
     password = db.Column(db.String(), nullable=False)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
+    storage_used_bytes = db.Column(db.BigInteger, default=0, nullable=False)   # suma size_mb a modelelor + bazelor de date
+    storage_quota_bytes = db.Column(db.BigInteger, nullable=True)              # None = USER_STORAGE_QUOTA_MB din config
 
     # relatii: un user poate avea multiple baze de date si multiple modele
     databases = db.relationship('AIDatabase', backref='uploader', lazy='dynamic', cascade="all, delete-orphan")
@@ -23,6 +24,18 @@ class User(db.Model):
         db.session.add(self)
         db.session.commit()
 
+    @staticmethod
+    def add_storage_usage(user_id, delta_bytes):
+        """ Atomic counter update in the current transaction (no commit) """
+        if delta_bytes:
+            User.query.filter(User.id == user_id).update(
+                {User.storage_used_bytes: User.storage_used_bytes + delta_bytes}, synchronize_session=False
+            )
+
+
+def size_mb_to_bytes(size_mb):
+    return int(round((size_mb or 0) * 1024 * 1024))
+
 
 class AIDatabase(db.Model):
     __tablename__ = 'ai_databases'
@@ -34,6 +47,10 @@ class AIDatabase(db.Model):
     storage_uri = db.Column(db.String(1024), nullable=False)    # uri: file://, ipfs://, s3:// etc.
     data_hash = db.Column(db.String(64), nullable=False, index=True)  # hex sha256
     merkle_root = db.Column(db.String(64), nullable=True)       # optional hex merkle root
+    merkle_leaves = db.deferred(db.Column(db.LargeBinary, nullable=True))  # frunzele merkle (32 bytes fiecare)
+    integrity_status = db.Column(db.String(20), default="unverified")      # unverified|ok|corrupted
+    verified_at = db.Column(db.DateTime, nullable=True)
+    scrub_cursor = db.Column(db.Integer, default=0, nullable=False)     # urmatoarea frunza verificata de scrubber
     size_mb = db.Column(db.Float, nullable=False)               # dimensiunea fisierului în MB
     description = db.Column(db.String())                        # descriere (optional)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -45,20 +62,15 @@ class AIDatabase(db.Model):
         return f"<AIDatabase {self.name}>"
 
     def save(self):
+        if self.id is None:
+            User.add_storage_usage(self.user_id, size_mb_to_bytes(self.size_mb))
         db.session.add(self)
         db.session.commit()
 
     def delete(self):
-        # sterge fisierul local doar daca storage_uri indica local file path
-        try:
-            if self.storage_uri and self.storage_uri.startswith("file://"):
-                path = self.storage_uri[len("file://"):]
-                if os.path.exists(path):
-                    os.remove(path)
-        except Exception:
-            # nu vrem sa aruncam exceptii din delete DB; loghează în aplicatie
-            pass
-        db.session.delete(self)
+        # randul dispare imediat; blob-ul + indexul de randuri le sterge GC-ul in fundal (backend/storage_gc.py)
+        from backend.storage_gc import tombstone_rows
+        tombstone_rows(AIDatabase, [self.id])
         db.session.commit()
 
     def update(self, **kwargs):
@@ -68,12 +80,9 @@ class AIDatabase(db.Model):
 
     @staticmethod
     def calculate_hash(file_path, chunk_size=4*1024*1024):
-        """ Generate SHA-256 hash for a file (streaming, memory-safe) """
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        """ Generate SHA-256 hash for a file (streaming, memory-safe; memoized by the hash cache) """
+        from backend.utils.hash_utils import file_sha256_stream
+        return file_sha256_stream(file_path, chunk_size)
 
 
 class AIModel(db.Model):
@@ -85,32 +94,38 @@ class AIModel(db.Model):
     description = db.Column(db.Text, nullable=True)
     model_hash = db.Column(db.String(64), nullable=False, index=True)    # hex sha256 (canonical)
     merkle_root = db.Column(db.String(64), nullable=True)               # optional hex merkle root
+    merkle_leaves = db.deferred(db.Column(db.LargeBinary, nullable=True))  # frunzele merkle (32 bytes fiecare)
+    integrity_status = db.Column(db.String(20), default="unverified")  # unverified|ok|corrupted
+    verified_at = db.Column(db.DateTime, nullable=True)
+    scrub_cursor = db.Column(db.Integer, default=0, nullable=False)
     storage_uri = db.Column(db.String(1024), nullable=False)            # ipfs://, s3://, file://...
+    safetensors_uri = db.Column(db.String(1024), nullable=True)         # copie safetensors a checkpoint-urilor torch
+    model_card = db.deferred(db.Column(db.JSON, nullable=True))          # rezumat arhitectura (tensori, parametri, dtypes, module)
     price_lamports = db.Column(db.BigInteger, nullable=True)            # pret (dacă folosești monetizare)
     onchain_tx = db.Column(db.String(128), nullable=True)               # txid on-chain daca s-a facut notarizarea
-    model_pda = db.Column(db.String(64), nullable=True)                 # PDA on-chain              
+    model_pda = db.Column(db.String(64), nullable=True, index=True)     # PDA on-chain (evenimentele de chiriere il refera)
     size_mb = db.Column(db.Float, nullable=False, default=0.0)
+    stored_size_mb = db.Column(db.Float, nullable=True)                 # bytes noi scrise in chunk store (dedup)
+    parent_id = db.Column(db.Integer, db.ForeignKey('ai_models.id'), nullable=True)  # versiunea de baza (fine-tune)
     status = db.Column(db.String(30), default="pending")                # pending|registered|failed
     last_error = db.Column(db.String())                                 # optional error string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    parent = db.relationship('AIModel', remote_side=[id], backref=db.backref('versions', lazy='dynamic'))
+
     def __repr__(self):
         return f"<AIModel {self.name}>"
 
     def save(self):
+        if self.id is None:
+            User.add_storage_usage(self.uploader_id, size_mb_to_bytes(self.size_mb))
         db.session.add(self)
         db.session.commit()
 
     def delete(self):
-        # similar delete behavior ca la AIDatabase
-        try:
-            if self.storage_uri and self.storage_uri.startswith("file://"):
-                path = self.storage_uri[len("file://"):]
-                if os.path.exists(path):
-                    os.remove(path)
-        except Exception:
-            pass
-        db.session.delete(self)
+        # similar delete behavior ca la AIDatabase: referintele la chunk-uri si fisierele le elibereaza GC-ul
+        from backend.storage_gc import tombstone_rows
+        tombstone_rows(AIModel, [self.id])
         db.session.commit()
 
     def update(self, **kwargs):
@@ -120,9 +135,149 @@ class AIModel(db.Model):
 
     @staticmethod
     def calculate_file_hash(file_path, chunk_size=4*1024*1024):
-        """ streaming sha256 for large model files """
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        """ streaming sha256 for large model files (memoized by the hash cache) """
+        from backend.utils.hash_utils import file_sha256_stream
+        return file_sha256_stream(file_path, chunk_size)
+
+
+class ModelChunk(db.Model):
+    """ Reference count of a chunk in the shared chunk store (one ref per model row using it) """
+    __tablename__ = 'model_chunks'
+
+    hash = db.Column(db.String(64), primary_key=True)                   # hex sha256 of the chunk
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ModelChunk {self.hash[:12]} refs={self.refcount}>"
+
+    @staticmethod
+    def acquire(chunks):
+        """ Add one reference for every distinct chunk in `chunks` ([(hash, size), ...]); no commit """
+        sizes = dict(chunks)
+        keys = list(sizes)
+        existing = set()
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            existing.update(h for (h,) in db.session.query(ModelChunk.hash).filter(ModelChunk.hash.in_(batch)))
+        if existing:
+            ModelChunk.query.filter(ModelChunk.hash.in_(existing)).update(
+                {ModelChunk.refcount: ModelChunk.refcount + 1}, synchronize_session=False
+            )
+        for h, size in sizes.items():
+            if h not in existing:
+                db.session.add(ModelChunk(hash=h, size=size, refcount=1))
+
+    @staticmethod
+    def release(hashes):
+        """ Drop one reference from every chunk in `hashes`; returns the hashes nobody uses anymore (no commit) """
+        hashes = list(hashes)
+        orphaned = []
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i:i + 500]
+            ModelChunk.query.filter(ModelChunk.hash.in_(batch)).update(
+                {ModelChunk.refcount: ModelChunk.refcount - 1}, synchronize_session=False
+            )
+            dead = ModelChunk.query.filter(ModelChunk.hash.in_(batch), ModelChunk.refcount <= 0)
+            orphaned.extend(c.hash for c in dead)
+            dead.delete(synchronize_session=False)
+        return orphaned
+
+
+class StorageTombstone(db.Model):
+    """ Blob of a deleted row waiting for the storage GC (queued in the same transaction as the delete) """
+    __tablename__ = 'storage_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)                    # model|database
+    uri = db.Column(db.String(1024), nullable=False)                   # storage_uri al randului sters
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<StorageTombstone {self.kind} {self.uri}>"
+
+
+class ScrubCheckpoint(db.Model):
+    """ Progress of the background integrity scrubber (resumes after restarts) """
+    __tablename__ = 'scrub_checkpoints'
+
+    name = db.Column(db.String(50), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default="databases")   # databases|models
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    passes = db.Column(db.Integer, nullable=False, default=0)              # full walks completed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScrubCheckpoint {self.name} {self.kind}:{self.last_id}>"
+
+
+class Rental(db.Model):
+    """ One rent_model transaction (fact table), from POST .../rent or the chain event sync """
+    __tablename__ = 'rentals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    txid = db.Column(db.String(128), nullable=False, unique=True)      # semnatura tranzactiei (dedup api / chain)
+    model_id = db.Column(db.Integer, nullable=True, index=True)        # fara FK: istoricul ramane dupa stergerea modelului
+    uploader_id = db.Column(db.Integer, nullable=False, index=True)    # cine a incasat
+    renter_id = db.Column(db.Integer, nullable=True)                   # None pentru chirieri facute direct on-chain
+    renter_wallet = db.Column(db.String(64), nullable=True)
+    model_pda = db.Column(db.String(64), nullable=True)
+    amount_lamports = db.Column(db.BigInteger, nullable=False, default=0)
+    source = db.Column(db.String(10), nullable=False, default="api")   # api|chain
+    rented_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<Rental {self.model_id} {self.txid[:12]}>"
+
+
+class ModelRentalStats(db.Model):
+    """ Per-model rental aggregates, maintained with every Rental insert """
+    __tablename__ = 'model_rental_stats'
+
+    model_id = db.Column(db.Integer, primary_key=True)
+    uploader_id = db.Column(db.Integer, nullable=False, index=True)
+    rentals = db.Column(db.BigInteger, nullable=False, default=0)
+    lamports = db.Column(db.BigInteger, nullable=False, default=0)
+    last_rented_at = db.Column(db.DateTime, nullable=True)
+
+    # leaderboard: top-N is an index range scan, never a sort of the whole table
+    __table_args__ = (
+        db.Index('ix_model_rental_stats_rentals', 'rentals', 'model_id'),
+        db.Index('ix_model_rental_stats_lamports', 'lamports', 'model_id'),
+    )
+
+    def __repr__(self):
+        return f"<ModelRentalStats {self.model_id} x{self.rentals}>"
+
+
+class UploaderRentalStats(db.Model):
+    """ Per-uploader rental aggregates (earnings), maintained with every Rental insert """
+    __tablename__ = 'uploader_rental_stats'
+
+    uploader_id = db.Column(db.Integer, primary_key=True)
+    rentals = db.Column(db.BigInteger, nullable=False, default=0)
+    lamports = db.Column(db.BigInteger, nullable=False, default=0)
+    last_rented_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_uploader_rental_stats_rentals', 'rentals', 'uploader_id'),
+        db.Index('ix_uploader_rental_stats_lamports', 'lamports', 'uploader_id'),
+    )
+
+    def __repr__(self):
+        return f"<UploaderRentalStats {self.uploader_id} x{self.rentals}>"
+
+
+class ChainCursor(db.Model):
+    """ Last program transaction signature processed by a chain sync (resumes after restarts) """
+    __tablename__ = 'chain_cursors'
+
+    name = db.Column(db.String(50), primary_key=True)
+    signature = db.Column(db.String(128), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ChainCursor {self.name} {self.signature}>"
+
@@ -0,0 +1,165 @@
+# backend/password_hashing.py
+# Password hashers (argon2id / scrypt / pbkdf2) selected by PASSWORD_HASHER with
+# per-scheme cost settings. Hashes are checked whatever scheme produced them;
+# check_password() also returns a new hash when the stored one was made with
+# other parameters, so logins migrate users transparently. The hashing itself
+# runs in a bounded thread pool, so a login burst cannot take every CPU.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:
+    argon2 = None
+
+
+class HashingBusy(Exception):
+    """ Too many password hashes pending: the caller should answer 503 """
+
+
+class ScryptHasher:
+    scheme = "scrypt"
+
+    def __init__(self, n=2 ** 15, r=8, p=1):
+        self.method = f"scrypt:{n}:{r}:{p}"
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, stored):
+        return stored.split("$", 1)[0] != self.method
+
+
+class Pbkdf2Hasher:
+    scheme = "pbkdf2"
+
+    def __init__(self, iterations=600_000):
+        self.method = f"pbkdf2:sha256:{iterations}"
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, stored):
+        return stored.split("$", 1)[0] != self.method
+
+
+class Argon2idHasher:
+    scheme = "argon2id"
+
+    def __init__(self, time_cost=3, memory_cost=64 * 1024, parallelism=1):
+        if argon2 is None:
+            raise RuntimeError("PASSWORD_HASHER=argon2id needs the argon2-cffi package")
+        self._hasher = argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost,
+                                             parallelism=parallelism, type=argon2.Type.ID)
+
+    def hash(self, password):
+        return self._hasher.hash(password)
+
+    def needs_rehash(self, stored):
+        if not stored.startswith("$argon2id$"):
+            return True
+        return self._hasher.check_needs_rehash(stored)
+
+
+def _verify(stored, password):
+    """ Check `password` against a hash made by any of the supported schemes """
+    if stored.startswith("$argon2"):
+        if argon2 is None:
+            raise RuntimeError("argon2 password hash found but argon2-cffi is not installed")
+        try:
+            return argon2.PasswordHasher().verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    try:
+        return check_password_hash(stored, password)
+    except ValueError:
+        return False  # unknown / corrupted hash format
+
+
+def hasher_from_config(config):
+    scheme = config.get("PASSWORD_HASHER", "scrypt")
+    if scheme == "argon2id":
+        return Argon2idHasher(config.get("ARGON2_TIME_COST", 3), config.get("ARGON2_MEMORY_COST", 64 * 1024),
+                              config.get("ARGON2_PARALLELISM", 1))
+    if scheme == "pbkdf2":
+        return Pbkdf2Hasher(config.get("PBKDF2_ITERATIONS", 600_000))
+    if scheme == "scrypt":
+        return ScryptHasher(config.get("SCRYPT_N", 2 ** 15), config.get("SCRYPT_R", 8), config.get("SCRYPT_P", 1))
+    raise ValueError(f"Unknown PASSWORD_HASHER: {scheme}")
+
+
+_hashers = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+def _config():
+    try:
+        from flask import current_app
+        return current_app.config
+    except RuntimeError:
+        return {}  # outside an app context (scripts / benchmarks)
+
+
+def _hasher(config):
+    key = tuple(config.get(k) for k in ("PASSWORD_HASHER", "SCRYPT_N", "SCRYPT_R", "SCRYPT_P", "PBKDF2_ITERATIONS",
+                                        "ARGON2_TIME_COST", "ARGON2_MEMORY_COST", "ARGON2_PARALLELISM"))
+    with _lock:
+        hasher = _hashers.get(key)
+        if hasher is None:
+            hasher = _hashers[key] = hasher_from_config(config)
+    return hasher
+
+
+def _pool(config):
+    """ (executor, pending-slots semaphore) shared by the whole process """
+    workers = config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1
+    max_pending = config.get("PASSWORD_HASH_MAX_PENDING", 64)
+    with _lock:
+        pool = _pools.get((workers, max_pending))
+        if pool is None:
+            pool = _pools[(workers, max_pending)] = (
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash"),
+                threading.BoundedSemaphore(max_pending),
+            )
+    return pool
+
+
+def _run(config, fn, *args):
+    executor, slots = _pool(config)
+    if not slots.acquire(timeout=config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 5)):
+        raise HashingBusy()
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password, config=None):
+    config = config if config is not None else _config()
+    return _run(config, _hasher(config).hash, password)
+
+
+def check_password(stored, password, config=None):
+    """
+    Returns (ok, new_hash). new_hash is set when the password matched but the
+    stored hash uses another scheme / cost than the configured hasher.
+    """
+    config = config if config is not None else _config()
+    hasher = _hasher(config)
+
+    def verify_and_upgrade():
+        if not _verify(stored, password):
+            return False, None
+        if hasher.needs_rehash(stored):
+            return True, hasher.hash(password)
+        return True, None
+
+    return _run(config, verify_and_upgrade)
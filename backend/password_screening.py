@@ -0,0 +1,74 @@
+# backend/password_screening.py
+# Signup-time password screening: minimum strength, breached / common password
+# list (memory-mapped Bloom filter built with `flask build-password-filter`)
+# and similarity to the username / email (similarity_of_a_password.py).
+import os
+import threading
+
+import click
+
+from backend.strenght_of_a_password import validate_password
+from backend.utils.bloom_filter import BloomFilter, build_bloom_filter
+
+try:
+    from backend.similarity_of_a_password import password_similarity
+except ImportError:
+    # python-Levenshtein missing: the similarity check is skipped
+    password_similarity = None
+
+_filters = {}
+_lock = threading.Lock()
+
+
+def _breached_filter(path):
+    """ Opened once per process; None when the filter file was not built """
+    if not path:
+        return None
+    with _lock:
+        if path not in _filters:
+            _filters[path] = BloomFilter(path) if os.path.exists(path) else None
+        return _filters[path]
+
+
+def is_breached(password, path):
+    bloom = _breached_filter(path)
+    if bloom is None:
+        return False
+    candidate = password.encode("utf-8")
+    return candidate in bloom or candidate.lower() in bloom
+
+
+def screen_password(password, username, email, config):
+    """ None when the password is acceptable, otherwise the reason it was rejected """
+    if not validate_password(password):
+        return "Password does not meet the required criteria."
+
+    if is_breached(password, config.get("BREACHED_PASSWORDS_FILTER")):
+        return "Password appears in a list of breached or common passwords."
+
+    if password_similarity is not None and config.get("PASSWORD_SIMILARITY_CHECK", True):
+        for identity in (username, (email or "").split("@", 1)[0]):
+            if identity and password_similarity(password, identity):
+                return "Password is too similar to the username or email."
+    return None
+
+
+def _read_wordlist(path):
+    with open(path, "rb") as f:
+        for line in f:
+            word = line.rstrip(b"\r\n")
+            if word:
+                yield word
+
+
+def register_password_filter_command(app):
+    @app.cli.command("build-password-filter")
+    @click.argument("wordlist", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--output", default=None, help="Filter file (default: BREACHED_PASSWORDS_FILTER).")
+    @click.option("--fp-rate", default=0.001, help="Target false positive rate.")
+    def build_password_filter(wordlist, output, fp_rate):
+        """Build the breached-password Bloom filter from a newline separated word list."""
+        output = output or app.config["BREACHED_PASSWORDS_FILTER"]
+        n = sum(1 for _ in _read_wordlist(wordlist))
+        count = build_bloom_filter(_read_wordlist(wordlist), output, n, fp_rate)
+        click.echo(f"{count} passwords -> {output} ({os.path.getsize(output) / 2**20:.1f} MiB)")
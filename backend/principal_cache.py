@@ -0,0 +1,127 @@
+# backend/principal_cache.py
+# Who is calling, without a users query per request. Access tokens carry the
+# user id and is_admin as claims; tokens without the claims (issued before they
+# existed) or issued before the user last changed fall back to a small TTL/LRU
+# cache, which only queries the DB on a miss. User inserts/updates/deletes
+# invalidate the cache entry (per process; other workers pick changes up when
+# their entry expires or the token is refreshed).
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+
+from backend.externals import db
+from backend.models import User
+
+Principal = namedtuple("Principal", ["id", "is_admin"])
+
+_MISSING = object()
+
+
+def _config():
+    try:
+        from flask import current_app
+        return current_app.config
+    except RuntimeError:
+        return {}
+
+
+class PrincipalCache:
+    def __init__(self, max_size=10_000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # user id -> (expires_at, Principal or None)
+        self._changed = OrderedDict()   # user id -> time.time() of the last change
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, principal):
+        ttl = _config().get("PRINCIPAL_CACHE_TTL", self.ttl)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._changed[user_id] = time.time()
+            self._changed.move_to_end(user_id)
+            while len(self._changed) > self.max_size:
+                self._changed.popitem(last=False)
+
+    def changed_since(self, user_id, timestamp):
+        """ True when the user changed at or after `timestamp` (claims issued then may be stale) """
+        with self._lock:
+            changed = self._changed.get(user_id)
+        return changed is not None and changed >= timestamp
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._changed.clear()
+
+
+principals = PrincipalCache()
+
+
+def principal_claims(user):
+    """ Extra access-token claims for `user` """
+    return {"uid": user.id, "is_admin": bool(user.is_admin)}
+
+
+def load_principal(user_id):
+    """ Principal for `user_id` (None if the user does not exist); DB only on a cache miss """
+    principal = principals.get(user_id)
+    if principal is _MISSING:
+        user = db.session.get(User, user_id)
+        principal = Principal(user.id, bool(user.is_admin)) if user else None
+        principals.put(user_id, principal)
+    return principal
+
+
+def current_principal():
+    """ Principal of the JWT in the current request (call inside @jwt_required) """
+    try:
+        user_id = int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return None
+    claims = get_jwt()
+    if "is_admin" in claims and claims.get("uid") == user_id and not principals.changed_since(user_id, claims.get("iat", 0)):
+        return Principal(user_id, bool(claims["is_admin"]))
+    return load_principal(user_id)
+
+
+def require_admin():
+    """ None when the JWT user is an admin, otherwise the error response """
+    user = current_principal()
+    if not user or not user.is_admin:
+        return {"message": "Admin privileges required"}, 403
+    return None
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    principals.invalidate(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_role_change(mapper, connection, target):
+    # password rehashes etc. do not touch what a Principal holds
+    if db.inspect(target).attrs.is_admin.history.has_changes():
+        principals.invalidate(target.id)
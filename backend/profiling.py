@@ -0,0 +1,182 @@
+# backend/profiling.py
+# On-demand sampling profiler and slow-request capture (admin only, see
+# profiling_api_endpoints.py). Both sample thread stacks with
+# sys._current_frames() from a separate thread, so the profiled code is not
+# instrumented. Nothing is installed unless it is turned on.
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import g, request
+
+MAX_SQL_PER_REQUEST = 200
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_stack(frame, thread_name=None):
+    """ Stack of `frame` in collapsed format: root;caller;...;leaf """
+    parts = []
+    while frame is not None:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    if thread_name:
+        parts.append(thread_name)
+    return ";".join(reversed(parts))
+
+
+def format_collapsed(counts):
+    """ Counter of collapsed stacks -> text accepted by flamegraph.pl / speedscope """
+    return "\n".join(f"{stack} {n}" for stack, n in counts.most_common())
+
+
+class SamplingProfiler:
+    """ Samples every thread of this worker for a fixed duration """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.result = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds, interval):
+        with self._lock:
+            if self.running:
+                raise RuntimeError("a profile is already running in this worker")
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self, seconds, interval):
+        me = threading.get_ident()
+        counts = Counter()
+        samples = 0
+        started = datetime.utcnow()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid != me:
+                    counts[collapse_stack(frame, names.get(tid, str(tid)))] += 1
+            samples += 1
+            time.sleep(interval)
+        self.result = {
+            "pid": os.getpid(),
+            "started_at": started.isoformat(),
+            "seconds": seconds,
+            "interval_ms": interval * 1000,
+            "samples": samples,
+            "stacks": counts,
+        }
+
+
+class SlowRequestCapture:
+    """
+    Requests running longer than `threshold` seconds get their thread sampled
+    every `interval` seconds; when they finish, the stacks and the SQL they ran
+    are kept in a ring buffer of the last `keep` slow requests.
+    """
+
+    def __init__(self, threshold, interval=0.01, keep=50):
+        self.threshold = threshold
+        self.interval = interval
+        self.captured = deque(maxlen=keep)
+        self._active = {}  # thread id -> in-flight request entry
+        self._lock = threading.Lock()  # guards _active and the entries' stack counters
+        self._watcher = None
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="slow-request-sampler", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                slow = [(tid, e) for tid, e in self._active.items() if now - e["start"] >= self.threshold]
+            if not slow:
+                continue
+            frames = sys._current_frames()
+            samples = [(tid, entry, collapse_stack(frames[tid])) for tid, entry in slow if tid in frames]
+            with self._lock:
+                for tid, entry, stack in samples:
+                    if self._active.get(tid) is entry:  # not finished meanwhile
+                        entry["stacks"][stack] += 1
+
+    def begin(self):
+        entry = {"start": time.perf_counter(), "method": request.method, "path": request.full_path.rstrip("?"),
+                 "stacks": Counter(), "sql": []}
+        with self._lock:
+            self._active[threading.get_ident()] = entry
+        g.slow_request_entry = entry
+        self._ensure_watcher()
+
+    def end(self):
+        entry = g.pop("slow_request_entry", None)
+        if entry is None:
+            return
+        with self._lock:
+            # once popped, the watcher no longer touches entry["stacks"]
+            self._active.pop(threading.get_ident(), None)
+        duration = time.perf_counter() - entry["start"]
+        if duration >= self.threshold:
+            self.captured.append({
+                "method": entry["method"],
+                "path": entry["path"],
+                "duration_ms": round(duration * 1000, 1),
+                "finished_at": datetime.utcnow().isoformat(),
+                "sql": entry["sql"],
+                "collapsed_stacks": format_collapsed(entry["stacks"]),
+            })
+
+    def record_sql(self, statement, duration):
+        entry = self._active.get(threading.get_ident())
+        if entry is not None and len(entry["sql"]) < MAX_SQL_PER_REQUEST:
+            entry["sql"].append({"statement": statement[:2000], "duration_ms": round(duration * 1000, 3)})
+
+
+profiler = SamplingProfiler()
+
+
+def init_slow_request_capture(app):
+    """ Enable slow-request capture when SLOW_REQUEST_THRESHOLD_MS is set (no hooks otherwise) """
+    threshold_ms = app.config.get("SLOW_REQUEST_THRESHOLD_MS")
+    if not threshold_ms:
+        return None
+
+    from sqlalchemy import event
+    from backend.externals import db
+
+    capture = SlowRequestCapture(
+        threshold_ms / 1000.0,
+        interval=app.config.get("SLOW_REQUEST_SAMPLE_INTERVAL_MS", 10) / 1000.0,
+        keep=app.config.get("SLOW_REQUEST_KEEP", 50),
+    )
+    app.extensions["slow_request_capture"] = capture
+
+    app.before_request(capture.begin)
+    app.teardown_request(lambda exc: capture.end())
+
+    # on the execution context: a failed statement never reaches after_cursor_execute
+    def before_cursor(conn, cursor, statement, parameters, context, executemany):
+        context._slow_capture_start = time.perf_counter()
+
+    def after_cursor(conn, cursor, statement, parameters, context, executemany):
+        capture.record_sql(statement, time.perf_counter() - context._slow_capture_start)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", before_cursor)
+        event.listen(db.engine, "after_cursor_execute", after_cursor)
+    return capture
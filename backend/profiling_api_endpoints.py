@@ -0,0 +1,87 @@
+# backend/profiling_api_endpoints.py
+# Admin-only profiling endpoints. Profiles are per worker process: with several
+# gunicorn workers, each POST lands on one of them (the pid is returned).
+import os
+
+from flask import Response, current_app, request
+from flask_jwt_extended import jwt_required
+from flask_restx import Namespace, Resource, fields
+
+from backend.principal_cache import require_admin
+from backend.profiling import format_collapsed, profiler
+
+admin_ns = Namespace("admin", description="Admin-only diagnostics (profiling, slow requests)")
+
+profile_request = admin_ns.model(
+    "ProfileRequest",
+    {
+        "seconds": fields.Float(description="How long to sample (default 10)"),
+        "interval_ms": fields.Float(description="Time between two samples (default 5)"),
+    },
+)
+
+
+@admin_ns.route("/profile")
+class ProfileResource(Resource):
+    @admin_ns.expect(profile_request)
+    @jwt_required()
+    def post(self):
+        """Start sampling every thread of this worker for `seconds`"""
+        denied = require_admin()
+        if denied:
+            return denied
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get("seconds", 10))
+            interval_ms = float(data.get("interval_ms", 5))
+        except (TypeError, ValueError):
+            return {"message": "seconds and interval_ms must be numbers"}, 400
+        max_seconds = current_app.config.get("PROFILER_MAX_SECONDS", 120)
+        if not 0 < seconds <= max_seconds:
+            return {"message": f"seconds must be in (0, {max_seconds}]"}, 400
+        interval_ms = max(interval_ms, current_app.config.get("PROFILER_MIN_INTERVAL_MS", 1))
+
+        try:
+            profiler.start(seconds, interval_ms / 1000.0)
+        except RuntimeError as e:
+            return {"message": str(e)}, 409
+        return {"message": "Profiling started", "pid": os.getpid(), "seconds": seconds, "interval_ms": interval_ms}, 202
+
+    @jwt_required()
+    def get(self):
+        """Last profile of this worker; ?format=collapsed (default, flamegraph.pl input) or json"""
+        denied = require_admin()
+        if denied:
+            return denied
+        if profiler.running:
+            return {"message": "Profile still running"}, 409
+        result = profiler.result
+        if result is None:
+            return {"message": "No profile recorded in this worker"}, 404
+
+        if request.args.get("format", "collapsed") == "json":
+            n = request.args.get("top", default=200, type=int)
+            if n is None or n < 1:
+                return {"message": "top must be a positive integer"}, 400
+            top = result["stacks"].most_common(n)
+            return {**{k: v for k, v in result.items() if k != "stacks"},
+                    "stacks": [{"stack": s, "count": n} for s, n in top]}, 200
+        return Response(format_collapsed(result["stacks"]) + "\n", mimetype="text/plain")
+
+
+@admin_ns.route("/slow-requests")
+class SlowRequestsResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Requests slower than SLOW_REQUEST_THRESHOLD_MS (stacks + SQL), newest first"""
+        denied = require_admin()
+        if denied:
+            return denied
+        capture = current_app.extensions.get("slow_request_capture")
+        if capture is None:
+            return {"enabled": False, "requests": []}, 200
+        return {
+            "enabled": True,
+            "threshold_ms": capture.threshold * 1000,
+            "requests": list(reversed(capture.captured)),
+        }, 200
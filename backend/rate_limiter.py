@@ -0,0 +1,143 @@
+# backend/rate_limiter.py
+# Token-bucket rate limiting for expensive endpoints (login, signup, uploads,
+# rent). Buckets are keyed by limit name + JWT user id (or client IP) and live
+# in a small memory-mapped table shared by every worker on the host; a check is
+# one hash, a byte-range lock and a few arithmetic ops. Over the limit the
+# request gets a 429 with Retry-After before any real work starts.
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from werkzeug.exceptions import TooManyRequests
+
+from backend.constants import UPLOAD_FOLDER
+from backend.metrics import observe_rate_limited
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no cross-process locking (Windows): buckets stay correct per process only
+
+_SLOT = struct.Struct("<Qdd")       # key hash, tokens, last refill (unix time)
+_PROBES = 4                         # slots looked at per key (open addressing)
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@lru_cache(maxsize=64)
+def parse_limit(text):
+    """ "10/minute" -> (capacity, refill per second) """
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", text)
+    if not m:
+        raise ValueError(f"Invalid rate limit: {text!r} (expected e.g. '10/minute')")
+    count = int(m.group(1))
+    return count, count / _UNITS[m.group(2)]
+
+
+class BucketTable:
+    """ Fixed-size table of token buckets in a shared file; the oldest bucket is evicted on overflow """
+
+    def __init__(self, path, slots=65536):
+        self.slots = max(slots, _PROBES)
+        size = self.slots * _SLOT.size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, first):
+        """ Lock the probe window of one key (threads of this process + other workers) """
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.lockf(self._file, fcntl.LOCK_EX, _PROBES * _SLOT.size, first * _SLOT.size)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN, _PROBES * _SLOT.size, first * _SLOT.size)
+
+    def take(self, key, capacity, rate, now=None):
+        """ Take one token from `key`'s bucket. Returns 0 when allowed, else seconds until a token is available """
+        now = time.time() if now is None else now
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        first = key_hash % (self.slots - _PROBES + 1)
+
+        with self._locked(first):
+            target, oldest, oldest_time = None, first, math.inf
+            for slot in range(first, first + _PROBES):
+                stored_hash, tokens, last = _SLOT.unpack_from(self._map, slot * _SLOT.size)
+                if stored_hash == key_hash:
+                    target = slot
+                    break
+                if stored_hash == 0 or last < oldest_time:
+                    oldest, oldest_time = slot, (-1 if stored_hash == 0 else last)
+            if target is None:
+                target, tokens, last = oldest, float(capacity), now
+
+            tokens = min(float(capacity), tokens + max(0.0, now - last) * rate)
+            if tokens >= 1:
+                _SLOT.pack_into(self._map, target * _SLOT.size, key_hash, tokens - 1, now)
+                return 0.0
+            _SLOT.pack_into(self._map, target * _SLOT.size, key_hash, tokens, now)
+            return (1 - tokens) / rate if rate > 0 else math.inf
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _table(config):
+    path = config.get("RATE_LIMIT_STATE_FILE") or os.path.join(UPLOAD_FOLDER, ".ratelimit")
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = BucketTable(path, config.get("RATE_LIMIT_SLOTS", 65536))
+    return table
+
+
+def _client_key():
+    """ JWT user id when the request carries a valid token, otherwise the client address """
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None  # expired / invalid token: the endpoint itself answers 401
+    if identity is not None:
+        return f"user:{identity}"
+    if current_app.config.get("RATE_LIMIT_TRUST_PROXY") and request.access_route:
+        return f"ip:{request.access_route[0]}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limited(name):
+    """ Decorator: apply the RATE_LIMITS[name] bucket (e.g. "10/minute") to a resource method """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            limit = config.get("RATE_LIMITS", {}).get(name)
+            if limit and config.get("RATE_LIMIT_ENABLED", True):
+                capacity, rate = parse_limit(limit)
+                retry_after = _table(config).take(f"{name}:{_client_key()}", capacity, rate)
+                if retry_after:
+                    observe_rate_limited(name)
+                    raise TooManyRequests(f"Rate limit exceeded for {name} ({limit}).",
+                                          retry_after=max(1, math.ceil(retry_after)))
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
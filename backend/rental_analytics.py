@@ -0,0 +1,282 @@
+# backend/rental_analytics.py
+# Rental analytics. Every rent_model transaction becomes one `rentals` row (fact
+# table), written by POST /models/models/<id>/rent and by the chain sync, which
+# reads the program's ModelRented events from its transaction logs (so rentals
+# made without the API are counted too; the txid dedups the two sources). The
+# same transaction bumps the per-model and per-uploader aggregates (count,
+# lamports, last rented), so the stats endpoints read one row and the
+# leaderboard reads the top N rows of an index; no dashboard scans the facts.
+# Leaderboards are additionally cached per process for LEADERBOARD_CACHE_SECONDS.
+# `flask rebuild-rental-stats` recomputes the aggregates from the facts.
+import base64
+import hashlib
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from backend.constants import UPLOAD_FOLDER
+from backend.externals import db
+from backend.models import AIModel, ChainCursor, ModelRentalStats, Rental, UploaderRentalStats
+
+LEADERBOARD_ORDER = {"rentals", "lamports"}
+CURSOR_NAME = "rentals"
+
+# Anchor event: "Program data: " + base64(sha256("event:ModelRented")[:8] + borsh fields)
+MODEL_RENTED_DISCRIMINATOR = hashlib.sha256(b"event:ModelRented").digest()[:8]
+_MODEL_RENTED = struct.Struct("<32s32sQq")   # model, renter, amount, timestamp
+_DATA_PREFIX = "Program data: "
+_COMMIT_EVERY = 100                          # signatures per commit while syncing
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _bump(stats, key_column, key, amount, rented_at, **columns):
+    """ Add one rental to the aggregate row `key` (created on first use); no commit """
+    values = {
+        stats.rentals: stats.rentals + 1,
+        stats.lamports: stats.lamports + amount,
+        # chain events can arrive after later API rentals: keep the newest timestamp
+        stats.last_rented_at: case(
+            (or_(stats.last_rented_at.is_(None), stats.last_rented_at < rented_at), rented_at),
+            else_=stats.last_rented_at,
+        ),
+    }
+    if stats.query.filter(key_column == key).update(values, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(stats(**{key_column.key: key}, rentals=1, lamports=amount,
+                                 last_rented_at=rented_at, **columns))
+    except IntegrityError:
+        # created concurrently by another worker
+        stats.query.filter(key_column == key).update(values, synchronize_session=False)
+
+
+def record_rental(model_id, uploader_id, txid, amount_lamports, renter_id=None, renter_wallet=None,
+                  model_pda=None, source="api", rented_at=None):
+    """
+    Insert the fact row and update the aggregates, in the caller's transaction (no
+    commit). Returns False when `txid` was already recorded.
+    """
+    if db.session.query(Rental.id).filter(Rental.txid == txid).first() is not None:
+        return False
+    rented_at = rented_at or datetime.utcnow()
+    amount_lamports = int(amount_lamports or 0)
+    try:
+        with db.session.begin_nested():
+            db.session.add(Rental(
+                txid=txid, model_id=model_id, uploader_id=uploader_id, renter_id=renter_id,
+                renter_wallet=renter_wallet, model_pda=model_pda, amount_lamports=amount_lamports,
+                source=source, rented_at=rented_at,
+            ))
+    except IntegrityError:
+        return False  # the other source recorded it first
+    _bump(ModelRentalStats, ModelRentalStats.model_id, model_id, amount_lamports, rented_at, uploader_id=uploader_id)
+    _bump(UploaderRentalStats, UploaderRentalStats.uploader_id, uploader_id, amount_lamports, rented_at)
+    return True
+
+
+def _stats_dict(row, **extra):
+    return {
+        **extra,
+        "rentals": row.rentals if row else 0,
+        "lamports_earned": row.lamports if row else 0,
+        "last_rented_at": row.last_rented_at.isoformat() if row and row.last_rented_at else None,
+    }
+
+
+def model_stats(model_id):
+    return _stats_dict(db.session.get(ModelRentalStats, model_id), model_id=model_id)
+
+
+def uploader_stats(uploader_id):
+    return _stats_dict(db.session.get(UploaderRentalStats, uploader_id), uploader_id=uploader_id)
+
+
+def leaderboard(config, order="rentals", limit=10):
+    """ Top `limit` models by rentals or lamports earned (index scan + name lookups, cached briefly) """
+    ttl = config.get("LEADERBOARD_CACHE_SECONDS", 10)
+    key = (order, limit)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    column = ModelRentalStats.rentals if order == "rentals" else ModelRentalStats.lamports
+    rows = ModelRentalStats.query.order_by(column.desc(), ModelRentalStats.model_id.desc()).limit(limit).all()
+    names = dict(db.session.query(AIModel.id, AIModel.name).filter(AIModel.id.in_([r.model_id for r in rows])))
+    board = [
+        _stats_dict(row, rank=i, model_id=row.model_id, name=names.get(row.model_id), uploader_id=row.uploader_id)
+        for i, row in enumerate(rows, 1)
+    ]
+    with _cache_lock:
+        _cache[key] = (now + ttl, board)
+    return board
+
+
+def clear_leaderboard_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def parse_rented_events(log_messages):
+    """ ModelRented events in a transaction's log messages: [{model_pda, renter, amount, timestamp}] """
+    from backend.solana_client import b58encode
+    events = []
+    for line in log_messages or ():
+        if not line.startswith(_DATA_PREFIX):
+            continue
+        try:
+            data = base64.b64decode(line[len(_DATA_PREFIX):])
+        except ValueError:
+            continue
+        if data[:8] != MODEL_RENTED_DISCRIMINATOR or len(data) < 8 + _MODEL_RENTED.size:
+            continue
+        model, renter, amount, timestamp = _MODEL_RENTED.unpack_from(data, 8)
+        events.append({"model_pda": b58encode(model), "renter": b58encode(renter),
+                       "amount": amount, "timestamp": timestamp})
+    return events
+
+
+def sync_chain_rentals(config, rpc=None, program_id=None):
+    """
+    Record the ModelRented events of every program transaction since the stored
+    cursor (oldest first). Returns the number of new rentals.
+    """
+    from backend.solana_client import b58encode, client_from_config
+    if rpc is None:
+        client = client_from_config(config)
+        rpc, program_id = client.rpc, client.program_id
+    program = b58encode(program_id)
+    commitment = config.get("SOLANA_COMMITMENT", "confirmed")
+    batch = config.get("RENTAL_SYNC_BATCH", 1000)
+
+    cursor = db.session.get(ChainCursor, CURSOR_NAME)
+    if cursor is None:
+        cursor = ChainCursor(name=CURSOR_NAME)
+        db.session.add(cursor)
+
+    # getSignaturesForAddress pages newest -> oldest, stopping at the cursor
+    signatures, before = [], None
+    while True:
+        options = {"limit": batch, "commitment": commitment}
+        if cursor.signature:
+            options["until"] = cursor.signature
+        if before:
+            options["before"] = before
+        page = rpc.call("getSignaturesForAddress", program, options) or []
+        signatures.extend(page)
+        if len(page) < batch:
+            break
+        before = page[-1]["signature"]
+
+    recorded = 0
+    for n, entry in enumerate(reversed(signatures), 1):
+        signature = entry["signature"]
+        if entry.get("err") is None:
+            tx = rpc.call("getTransaction", signature,
+                          {"encoding": "json", "maxSupportedTransactionVersion": 0, "commitment": commitment})
+            if tx is None:
+                break  # not available at this commitment yet: resume from here next pass
+            for i, event in enumerate(parse_rented_events((tx.get("meta") or {}).get("logMessages"))):
+                model = db.session.query(AIModel.id, AIModel.uploader_id) \
+                    .filter(AIModel.model_pda == event["model_pda"]).first()
+                if model is None:
+                    continue  # registered outside this backend, or deleted
+                recorded += record_rental(
+                    model.id, model.uploader_id, signature if i == 0 else f"{signature}:{i}", event["amount"],
+                    renter_wallet=event["renter"], model_pda=event["model_pda"], source="chain",
+                    rented_at=datetime.utcfromtimestamp(event["timestamp"]),
+                )
+        cursor.signature = signature
+        if n % _COMMIT_EVERY == 0:
+            db.session.commit()
+    db.session.commit()
+    return recorded
+
+
+def rebuild_rental_stats():
+    """ Recompute both aggregate tables from the facts (models deleted since are left out); returns row counts """
+    ModelRentalStats.query.delete(synchronize_session=False)
+    UploaderRentalStats.query.delete(synchronize_session=False)
+    per_model = db.session.query(
+        Rental.model_id, AIModel.uploader_id, func.count(Rental.id),
+        func.coalesce(func.sum(Rental.amount_lamports), 0), func.max(Rental.rented_at),
+    ).join(AIModel, AIModel.id == Rental.model_id).group_by(Rental.model_id, AIModel.uploader_id).all()
+    per_uploader = db.session.query(
+        Rental.uploader_id, func.count(Rental.id),
+        func.coalesce(func.sum(Rental.amount_lamports), 0), func.max(Rental.rented_at),
+    ).group_by(Rental.uploader_id).all()
+    db.session.add_all(
+        ModelRentalStats(model_id=m, uploader_id=u, rentals=c, lamports=s, last_rented_at=t)
+        for m, u, c, s, t in per_model
+    )
+    db.session.add_all(
+        UploaderRentalStats(uploader_id=u, rentals=c, lamports=s, last_rented_at=t)
+        for u, c, s, t in per_uploader
+    )
+    db.session.commit()
+    clear_leaderboard_cache()
+    return len(per_model), len(per_uploader)
+
+
+def _acquire_worker_lock():
+    """ Only one chain sync per host, even with several app workers (None if another one holds it) """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    lock_file = open(os.path.join(UPLOAD_FOLDER, ".rentals.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_background_rental_sync(app):
+    """ Start the chain sync thread when RENTAL_SYNC_ENABLED is set """
+    if not app.config.get("RENTAL_SYNC_ENABLED"):
+        return None
+    lock = _acquire_worker_lock()
+    if lock is None:
+        return None
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    recorded = sync_chain_rentals(app.config)
+                    if recorded:
+                        app.logger.info("Rental sync: %d on-chain rentals recorded", recorded)
+            except Exception:
+                app.logger.exception("Rental sync pass failed")
+            time.sleep(app.config.get("RENTAL_SYNC_INTERVAL_SECONDS", 30))
+
+    thread = threading.Thread(target=loop, name="rental-sync", daemon=True)
+    thread._lock_file = lock  # keep the flock for the lifetime of the thread
+    thread.start()
+    return thread
+
+
+def register_rental_commands(app):
+    @app.cli.command("sync-rentals")
+    def sync_rentals_command():
+        """Record the on-chain ModelRented events since the last sync."""
+        click.echo(f"{sync_chain_rentals(app.config)} rental(s) recorded")
+
+    @app.cli.command("rebuild-rental-stats")
+    def rebuild_rental_stats_command():
+        """Recompute the per-model / per-uploader rental aggregates from the rentals table."""
+        models, uploaders = rebuild_rental_stats()
+        click.echo(f"{models} model(s), {uploaders} uploader(s) aggregated")
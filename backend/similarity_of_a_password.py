@@ -10,14 +10,17 @@ def normalize(s):
     return s
 
 LEET_MAP = str.maketrans({'4':'a','@':'a','0':'o','1':'l','3':'e','$':'s','5':'s','7':'t'})
+# '1' / '!' stand for 'i' as often as for 'l'
+LEET_MAP_I = str.maketrans({'4':'a','@':'a','0':'o','1':'i','!':'i','3':'e','$':'s','5':'s','7':'t'})
 
-def leet_to_plain(s):
-    return s.translate(LEET_MAP)
+def leet_to_plain(s, leet_map=LEET_MAP):
+    return s.translate(leet_map)
 
 def password_similarity(password, username, min_token_len=3, threshold=0.7):
     normalized_username = normalize(username)
     normalized_password = normalize(password)
     leet_password = normalize(leet_to_plain(password))
+    candidates = {normalized_password, leet_password, normalize(leet_to_plain(password, LEET_MAP_I))}
 
     if not normalized_username or not normalized_password:
         return False
@@ -25,16 +28,16 @@ def password_similarity(password, username, min_token_len=3, threshold=0.7):
     if normalized_username == normalized_password:
         return True
     
-    if len(normalized_username) >= min_token_len and normalized_username in normalized_password:
+    if len(normalized_username) >= min_token_len and any(normalized_username in c for c in candidates):
         return True
     if len(normalized_password) >= min_token_len and normalized_password in normalized_username:
         return True
-    if len(normalized_username) >= min_token_len and normalized_username[::-1] in normalized_password:
+    if len(normalized_username) >= min_token_len and any(normalized_username[::-1] in c for c in candidates):
         return True
 
     tokens = [normalize(t) for t in re.split(r'[@._\- ]+', username) if t]
     for t in tokens:
-        if len(t) >= min_token_len and (t in normalized_password or t in leet_password):
+        if len(t) >= min_token_len and any(t in c for c in candidates):
             return True
 
     if len(normalized_password) <= 5:
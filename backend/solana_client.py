@@ -0,0 +1,473 @@
+# backend/solana_client.py
+# In-process client for the model_registry Anchor program (blockchain/programs):
+# builds, signs and sends create_model / rent_model transactions over JSON-RPC,
+# replacing the `node blockchain/clients/*.js` subprocess per call.
+#  - instruction data: Anchor discriminator (from the IDL when present, else
+#    sha256("global:<name>")[:8]) + borsh-encoded args
+#  - PDA: seeds ["model", model_hash], same as the program's #[account(seeds)]
+#  - keypairs are loaded once per process, the HTTP session is pooled and the
+#    recent blockhash is reused for SOLANA_BLOCKHASH_TTL seconds
+import base64
+import hashlib
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.metrics import observe_chain_call
+
+try:
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+except ImportError:
+    Ed25519PrivateKey = None  # signing unavailable: use CHAIN_CLIENT = "node"
+
+DEFAULT_PROGRAM_ID = "ZSoUNwHGAwkCzCKkLEnkY1m3Ud7WUjQMWRh5p4LZfpT"  # declare_id! in programs/blockchain/src/lib.rs
+SYSTEM_PROGRAM_ID = bytes(32)
+MODEL_SEED = b"model"
+ACCOUNT_NAME = "ModelAccount"
+MAX_TRANSACTION_SIZE = 1232  # bytes, serialized with signatures (IPv6 MTU minus headers)
+
+
+class ChainError(RuntimeError):
+    pass
+
+
+# ---------------------------------------------------------------- encoding
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {c: i for i, c in enumerate(_B58_ALPHABET)}
+
+
+def b58encode(data):
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = _B58_ALPHABET[r] + out
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + out
+
+
+def b58decode(text):
+    n = 0
+    for c in text:
+        n = n * 58 + _B58_INDEX[c]
+    body = n.to_bytes((n.bit_length() + 7) // 8, "big") if n else b""
+    return b"\0" * (len(text) - len(text.lstrip("1"))) + body
+
+
+def compact_u16(n):
+    """ Solana short_vec length prefix """
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def borsh_string(value):
+    data = value.encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+# ---------------------------------------------------------------- PDA
+
+_P = 2 ** 255 - 19
+_D = -121665 * pow(121666, _P - 2, _P) % _P
+
+
+def is_on_curve(point):
+    """ True when the 32 bytes decompress to an ed25519 point (PDAs must not) """
+    y = (int.from_bytes(point, "little") & ((1 << 255) - 1)) % _P
+    y2 = y * y % _P
+    x2 = (y2 - 1) * pow(_D * y2 + 1, _P - 2, _P) % _P
+    return x2 == 0 or pow(x2, (_P - 1) // 2, _P) == 1
+
+
+def create_program_address(seeds, program_id):
+    if len(seeds) > 16 or any(len(s) > 32 for s in seeds):
+        raise ValueError("At most 16 seeds of at most 32 bytes each")
+    address = hashlib.sha256(b"".join(seeds) + program_id + b"ProgramDerivedAddress").digest()
+    if is_on_curve(address):
+        raise ValueError("Seeds give an address on the ed25519 curve")
+    return address
+
+
+def find_program_address(seeds, program_id):
+    """ (address, bump) with the highest bump that lands off-curve, like PublicKey.findProgramAddress """
+    for bump in range(255, -1, -1):
+        try:
+            return create_program_address(list(seeds) + [bytes([bump])], program_id), bump
+        except ValueError:
+            continue
+    raise ChainError("No viable bump seed for program address")
+
+
+def model_pda(model_hash, program_id):
+    return find_program_address([MODEL_SEED, model_hash], program_id)[0]
+
+
+# ---------------------------------------------------------------- keys
+
+class Keypair:
+    def __init__(self, secret):
+        if Ed25519PrivateKey is None:
+            raise ChainError("The cryptography package is required to sign transactions")
+        if len(secret) != 64:
+            raise ChainError("Keypair must be 64 bytes (seed + public key)")
+        self._key = Ed25519PrivateKey.from_private_bytes(bytes(secret[:32]))
+        self.public_key = bytes(secret[32:])
+
+    def sign(self, message):
+        return self._key.sign(message)
+
+
+@lru_cache(maxsize=16)
+def load_keypair(path):
+    """ solana-keygen JSON file (array of 64 ints), parsed once per process """
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        raise ChainError(f"Wallet file not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return Keypair(bytes(json.load(f)))
+
+
+# ---------------------------------------------------------------- anchor / IDL
+
+@lru_cache(maxsize=8)
+def load_idl(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def instruction_discriminator(name, idl=None):
+    """ 8-byte Anchor discriminator of instruction `name` (snake_case) """
+    for ix in (idl or {}).get("instructions", []):
+        if ix.get("name") in (name, _camel(name)) and ix.get("discriminator"):
+            return bytes(ix["discriminator"])
+    return hashlib.sha256(f"global:{name}".encode("utf-8")).digest()[:8]
+
+
+def account_discriminator(name, idl=None):
+    for account in (idl or {}).get("accounts", []):
+        if account.get("name") == name and account.get("discriminator"):
+            return bytes(account["discriminator"])
+    return hashlib.sha256(f"account:{name}".encode("utf-8")).digest()[:8]
+
+
+def _camel(name):
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+# ---------------------------------------------------------------- transactions
+
+AccountMeta = namedtuple("AccountMeta", "pubkey is_signer is_writable")
+Instruction = namedtuple("Instruction", "program_id accounts data")
+
+
+def compile_message(payer, instructions, recent_blockhash):
+    """ Legacy message: header, account keys (signers/writable first), blockhash, instructions """
+    metas = {payer: [True, True]}
+    for ix in instructions:
+        for meta in ix.accounts:
+            flags = metas.setdefault(meta.pubkey, [False, False])
+            flags[0] |= meta.is_signer
+            flags[1] |= meta.is_writable
+        metas.setdefault(ix.program_id, [False, False])
+
+    def rank(key):
+        signer, writable = metas[key]
+        return (key != payer, not signer, not writable)
+
+    keys = sorted(metas, key=rank)  # stable: keeps first-seen order inside each group
+    signers = [k for k in keys if metas[k][0]]
+    header = bytes([
+        len(signers),
+        sum(1 for k in signers if not metas[k][1]),
+        sum(1 for k in keys if not metas[k][0] and not metas[k][1]),
+    ])
+    index = {k: i for i, k in enumerate(keys)}
+
+    out = bytearray(header)
+    out += compact_u16(len(keys)) + b"".join(keys)
+    out += recent_blockhash
+    out += compact_u16(len(instructions))
+    for ix in instructions:
+        out.append(index[ix.program_id])
+        out += compact_u16(len(ix.accounts)) + bytes(index[m.pubkey] for m in ix.accounts)
+        out += compact_u16(len(ix.data)) + ix.data
+    return bytes(out), signers
+
+
+def sign_transaction(message, signer_keys, keypairs):
+    by_key = {kp.public_key: kp for kp in keypairs}
+    try:
+        signatures = [by_key[key].sign(message) for key in signer_keys]
+    except KeyError as e:
+        raise ChainError(f"Missing signer {b58encode(e.args[0])}")
+    return compact_u16(len(signatures)) + b"".join(signatures) + message
+
+
+# ---------------------------------------------------------------- JSON-RPC
+
+class SolanaRpc:
+    """ JSON-RPC over one pooled keep-alive session, with a short-lived recent-blockhash cache """
+
+    def __init__(self, url, timeout=30, pool_size=8, blockhash_ttl=20, commitment="confirmed"):
+        self.url = url
+        self.timeout = timeout
+        self.blockhash_ttl = blockhash_ttl
+        self.commitment = commitment
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._ids = itertools.count(1)
+        self._blockhash = None  # (bytes, fetched at)
+        self._lock = threading.Lock()
+
+    def call(self, method, *params):
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params)}
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ChainError(f"RPC {method} failed: {e}")
+        if body.get("error"):
+            raise ChainError(f"RPC {method} error: {body['error'].get('message', body['error'])}")
+        return body.get("result")
+
+    def latest_blockhash(self):
+        with self._lock:
+            cached = self._blockhash
+            if cached and time.monotonic() - cached[1] < self.blockhash_ttl:
+                return cached[0]
+        result = self.call("getLatestBlockhash", {"commitment": self.commitment})
+        blockhash = b58decode(result["value"]["blockhash"])
+        with self._lock:
+            self._blockhash = (blockhash, time.monotonic())
+        return blockhash
+
+    def forget_blockhash(self):
+        with self._lock:
+            self._blockhash = None
+
+    def account_data(self, pubkey):
+        result = self.call("getAccountInfo", b58encode(pubkey), {"encoding": "base64", "commitment": self.commitment})
+        value = result and result.get("value")
+        if not value:
+            return None
+        return base64.b64decode(value["data"][0])
+
+    def send_transaction(self, raw):
+        return self.call("sendTransaction", base64.b64encode(raw).decode("ascii"),
+                         {"encoding": "base64", "preflightCommitment": self.commitment})
+
+    def confirm(self, signature, timeout):
+        deadline = time.monotonic() + timeout
+        wanted = ("confirmed", "finalized") if self.commitment != "finalized" else ("finalized",)
+        while True:
+            status = self.call("getSignatureStatuses", [signature])["value"][0]
+            if status:
+                if status.get("err"):
+                    raise ChainError(f"Transaction {signature} failed: {status['err']}")
+                if status.get("confirmationStatus") in wanted:
+                    return
+            if time.monotonic() > deadline:
+                raise ChainError(f"Transaction {signature} not confirmed after {timeout}s")
+            time.sleep(0.4)
+
+
+# ---------------------------------------------------------------- program client
+
+class ModelRegistryClient:
+    def __init__(self, rpc, program_id, idl=None, confirm_timeout=60):
+        self.rpc = rpc
+        self.program_id = program_id
+        self.idl = idl
+        self.confirm_timeout = confirm_timeout
+        self._create_disc = instruction_discriminator("create_model", idl)
+        self._rent_disc = instruction_discriminator("rent_model", idl)
+        self._account_disc = account_discriminator(ACCOUNT_NAME, idl)
+
+    def _submit(self, payer, instructions):
+        """ Sign with a (cached) recent blockhash and send; one retry with a fresh blockhash if it expired """
+        for attempt in range(2):
+            message, signers = compile_message(payer.public_key, instructions, self.rpc.latest_blockhash())
+            raw = sign_transaction(message, signers, [payer])
+            try:
+                return self.rpc.send_transaction(raw)
+            except ChainError as e:
+                if attempt or "blockhash" not in str(e).lower():
+                    raise
+                self.rpc.forget_blockhash()
+
+    def _send(self, payer, instruction):
+        txid = self._submit(payer, [instruction])
+        if self.confirm_timeout:
+            self.rpc.confirm(txid, self.confirm_timeout)
+        return txid
+
+    def _create_instruction(self, payer, model_hash, storage_uri, price_lamports, merkle_root=None):
+        pda = model_pda(model_hash, self.program_id)
+        data = (self._create_disc + model_hash + (merkle_root or bytes(32))
+                + borsh_string(storage_uri) + struct.pack("<Q", price_lamports))
+        return pda, Instruction(self.program_id, [
+            AccountMeta(pda, False, True),
+            AccountMeta(payer.public_key, True, True),
+            AccountMeta(SYSTEM_PROGRAM_ID, False, False),
+        ], data)
+
+    def _registered(self, payer, pda, txid):
+        return {
+            "success": True,
+            "txid": txid,
+            "model_pda": b58encode(pda),
+            "program_id": b58encode(self.program_id),
+            "wallet": b58encode(payer.public_key),
+        }
+
+    def register_model(self, payer, model_hash, storage_uri, price_lamports, merkle_root=None):
+        pda, instruction = self._create_instruction(payer, model_hash, storage_uri, price_lamports, merkle_root)
+        return self._registered(payer, pda, self._send(payer, instruction))
+
+    def register_models(self, payer, entries):
+        """
+        Register many models: create_model instructions are packed into as few
+        transactions as fit in a packet, all sent before any is confirmed.
+        `entries` are (model_hash, storage_uri, price_lamports, merkle_root);
+        returns one result dict or ChainError per entry, in order.
+        """
+        blockhash = bytes(32)  # size estimate only
+        groups, current = [], []
+        for i, entry in enumerate(entries):
+            pda, instruction = self._create_instruction(payer, *entry)
+            candidate = current + [(i, pda, instruction)]
+            message, _ = compile_message(payer.public_key, [ix for _, _, ix in candidate], blockhash)
+            if current and 1 + 64 + len(message) > MAX_TRANSACTION_SIZE:
+                groups.append(current)
+                candidate = [(i, pda, instruction)]
+            current = candidate
+        if current:
+            groups.append(current)
+
+        results = [None] * len(entries)
+        sent = []
+        for group in groups:
+            try:
+                sent.append((group, self._submit(payer, [ix for _, _, ix in group])))
+            except ChainError as e:
+                for i, _, _ in group:
+                    results[i] = e
+        for group, txid in sent:
+            try:
+                if self.confirm_timeout:
+                    self.rpc.confirm(txid, self.confirm_timeout)
+                outcome = None
+            except ChainError as e:
+                outcome = e
+            for i, pda, _ in group:
+                results[i] = outcome or self._registered(payer, pda, txid)
+        return results
+
+    def rent_model(self, payer, model_hash=None, pda=None):
+        pda = pda or model_pda(model_hash, self.program_id)
+        account = self.rpc.account_data(pda)
+        if not account or account[:8] != self._account_disc:
+            raise ChainError("Model account not found on-chain for given hash")
+        uploader = account[8:40]
+        # RentModel's #[instruction(model_hash)] reads the PDA seed after the discriminator:
+        # take it from the account (the registered, salted hash)
+        data = self._rent_disc + account[40:72]
+        instruction = Instruction(self.program_id, [
+            AccountMeta(pda, False, True),
+            AccountMeta(payer.public_key, True, True),
+            AccountMeta(uploader, False, True),
+            AccountMeta(SYSTEM_PROGRAM_ID, False, False),
+        ], data)
+        txid = self._send(payer, instruction)
+        return {
+            "success": True,
+            "txid": txid,
+            "model_pda": b58encode(pda),
+            "renter": b58encode(payer.public_key),
+            "uploader": b58encode(uploader),
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_from_config(config):
+    """ One client (and so one pooled RPC session) per process and settings """
+    idl = load_idl(config.get("SOLANA_IDL_PATH"))
+    program_id = config.get("SOLANA_PROGRAM_ID") or (idl or {}).get("address") or DEFAULT_PROGRAM_ID
+    key = (config.get("SOLANA_RPC_URL"), program_id, config.get("SOLANA_IDL_PATH"))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            rpc = SolanaRpc(
+                config.get("SOLANA_RPC_URL", "http://127.0.0.1:8899"),
+                timeout=config.get("SOLANA_RPC_TIMEOUT", 30),
+                pool_size=config.get("SOLANA_RPC_POOL_SIZE", 8),
+                blockhash_ttl=config.get("SOLANA_BLOCKHASH_TTL", 20),
+                commitment=config.get("SOLANA_COMMITMENT", "confirmed"),
+            )
+            client = _clients[key] = ModelRegistryClient(
+                rpc, b58decode(program_id), idl, config.get("SOLANA_CONFIRM_TIMEOUT", 60))
+    return client
+
+
+def _observed(command, fn, *args, **kwargs):
+    start = time.perf_counter()
+    ok = False
+    try:
+        result = fn(*args, **kwargs)
+        ok = True
+        return result
+    finally:
+        observe_chain_call(command, time.perf_counter() - start, ok)
+
+
+def _server_keypair(config):
+    """ The server's own wallet (SOLANA_WALLET_PATH): the only keypair it signs with """
+    return load_keypair(config.get("SOLANA_WALLET_PATH", "~/.config/solana/id.json"))
+
+
+def register_model(config, model_hash_hex, storage_uri, price_lamports, merkle_root_hex=None):
+    """ Same result dict as register_model.js ({"success", "txid", "model_pda", ...}) """
+    payer = _server_keypair(config)
+    merkle_root = bytes.fromhex(merkle_root_hex) if merkle_root_hex else None
+    return _observed("create_model", client_from_config(config).register_model,
+                     payer, bytes.fromhex(model_hash_hex), storage_uri, int(price_lamports), merkle_root)
+
+
+def register_models(config, entries):
+    """ register_model() for many (model_hash_hex, storage_uri, price_lamports, merkle_root_hex) in grouped transactions """
+    payer = _server_keypair(config)
+    decoded = [(bytes.fromhex(h), uri, int(price), bytes.fromhex(merkle) if merkle else None)
+               for h, uri, price, merkle in entries]
+    return _observed("create_model_batch", client_from_config(config).register_models, payer, decoded)
+
+
+def rent_model(config, model_hash_hex=None, model_pda_b58=None):
+    """ Same result dict as rent_model.js; the stored PDA wins over re-deriving it from the hash """
+    payer = _server_keypair(config)
+    return _observed("rent_model", client_from_config(config).rent_model, payer,
+                     bytes.fromhex(model_hash_hex) if model_hash_hex else None,
+                     b58decode(model_pda_b58) if model_pda_b58 else None)
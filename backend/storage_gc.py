@@ -0,0 +1,423 @@
+# backend/storage_gc.py
+# Storage garbage collection. Deleting a model / dataset only removes its row and
+# queues the blob in storage_tombstones, in the same transaction, so the request
+# never waits on multi-GB unlinks and a failed removal is retried instead of
+# leaking. A background thread drains the queue and, less often, sweeps
+# UPLOAD_FOLDER for files no row references (crashes between blob and row,
+# deletes from before the queue existed, ...).
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import insert
+
+from backend.constants import CHUNK_STORE_FOLDER, UPLOAD_FOLDER
+from backend.externals import db
+from backend.models import AIDatabase, AIModel, ModelChunk, ModelRentalStats, StorageTombstone, User, size_mb_to_bytes
+from backend.utils.chunk_store import CAS_SCHEME, ChunkStore
+from backend.utils.compressed_blob import COMPRESSED_SUFFIX
+from backend.utils.dataset_index import INDEX_SUFFIX, delete_row_index
+from backend.utils.storage_backends import LocalBackend, delete_uri
+
+_BATCH = 500  # ids per IN (...) clause
+_STALE_SUFFIXES = (".part", ".tmp")  # staging files of interrupted uploads / chunk writes
+
+
+def _kind(model):
+    return "model" if model is AIModel else "database"
+
+
+def _owner_column(model):
+    return AIModel.uploader_id if model is AIModel else AIDatabase.user_id
+
+
+def _blob_columns(model):
+    """ Columns holding storage uris owned by a row (models also keep a safetensors copy) """
+    if model is AIModel:
+        return (AIModel.storage_uri, AIModel.safetensors_uri)
+    return (AIDatabase.storage_uri,)
+
+
+def tombstone_rows(model, ids):
+    """
+    Delete the `model` rows with these ids and queue their blobs for the GC, in the
+    caller's transaction (no commit). Returns the ids that were actually deleted.
+    """
+    ids = list(ids)
+    owner_column = _owner_column(model)
+    kind = _kind(model)
+    deleted = []
+    for i in range(0, len(ids), _BATCH):
+        rows = db.session.query(model.id, owner_column, model.size_mb, *_blob_columns(model)) \
+            .filter(model.id.in_(ids[i:i + _BATCH])).all()
+        if not rows:
+            continue
+        row_ids = [row[0] for row in rows]
+
+        freed = {}
+        for _, owner_id, size_mb, *_ in rows:
+            freed[owner_id] = freed.get(owner_id, 0) + size_mb_to_bytes(size_mb)
+        for owner_id, n in freed.items():
+            User.add_storage_usage(owner_id, -n)
+
+        now = datetime.utcnow()
+        db.session.execute(insert(StorageTombstone), [
+            {"kind": kind, "uri": uri, "attempts": 0, "created_at": now}
+            for _, _, _, *uris in rows for uri in uris if uri
+        ])
+        if model is AIModel:
+            # versiunile derivate raman, doar pierd legatura cu parintele
+            AIModel.query.filter(AIModel.parent_id.in_(row_ids)).update(
+                {AIModel.parent_id: None}, synchronize_session=False
+            )
+            # off the leaderboard; the rentals (and the uploader's earnings) stay
+            ModelRentalStats.query.filter(ModelRentalStats.model_id.in_(row_ids)).delete(synchronize_session=False)
+        model.query.filter(model.id.in_(row_ids)).delete(synchronize_session=False)
+        deleted.extend(row_ids)
+    return deleted
+
+
+def _referenced(uri):
+    """ True when a catalog row still points at `uri` (re-upload of the same content / path) """
+    return any(
+        db.session.query(column).filter(column == uri).first() is not None
+        for model in (AIModel, AIDatabase) for column in _blob_columns(model)
+    )
+
+
+def _collect(tombstone):
+    """ Release one tombstone; refcounts and the queue row are committed before any file is removed """
+    if tombstone.uri.startswith(CAS_SCHEME):
+        store = ChunkStore(CHUNK_STORE_FOLDER)
+        manifest_hash = tombstone.uri[len(CAS_SCHEME):]
+        try:
+            chunk_hashes = {h for h, _ in store.read_manifest(manifest_hash)["chunks"]}
+        except FileNotFoundError:
+            chunk_hashes = set()
+        orphaned = ModelChunk.release(chunk_hashes)
+        db.session.delete(tombstone)
+        db.session.commit()
+
+        # un upload concurent poate sa fi re-folosit chunk-ul / manifestul intre timp
+        _remove_unused(store, {h: store.chunk_path(h) for h in orphaned}, _used_chunks)
+        _remove_unused(store, {tombstone.uri: store.manifest_path(manifest_hash)}, _referenced_uris)
+        return
+
+    # file:// / s3:// blob: removal is idempotent, so the queue row goes only once it succeeded
+    if not _referenced(tombstone.uri) and not _rewritten(tombstone):
+        delete_uri(tombstone.uri)
+        if tombstone.kind == "database":
+            delete_row_index(tombstone.uri)
+    db.session.delete(tombstone)
+    db.session.commit()
+
+
+def _rewritten(tombstone):
+    """
+    True when a local blob was written again after its row was deleted: upload paths
+    are the file names, so a re-upload under the same name (row not committed yet)
+    owns the file now. Should that upload never commit, the sweep removes the file.
+    """
+    if not tombstone.uri.startswith(LocalBackend.scheme):
+        return False
+    try:
+        mtime = os.stat(LocalBackend().path(tombstone.uri)).st_mtime
+    except FileNotFoundError:
+        return False
+    return mtime >= tombstone.created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _remove_unused(store, paths, in_use, cutoff=None):
+    """
+    Remove chunk store files (`paths`: chunk hash / cas uri -> path) unless
+    in_use(keys) reports them; returns the removed paths. An upload can find a
+    chunk or manifest already stored just before it goes and commit its reference
+    only after that, so each file is moved aside first and put back when a
+    reference (or, for the sweep, an mtime at or past `cutoff`) shows up meanwhile.
+    The upload checks its files again once its references are committed
+    (restore_missing): one of the two always sees the other.
+    """
+    aside = {}
+    for key, path in paths.items():
+        moved = store.set_aside(path)
+        if moved is not None:
+            aside[key] = (path, moved)
+    used = in_use(list(aside))
+    removed = []
+    for key, (path, moved) in aside.items():
+        if key in used or (cutoff is not None and os.stat(moved).st_mtime >= cutoff):
+            store.put_back(moved, path)
+        else:
+            os.remove(moved)
+            removed.append(path)
+    return removed
+
+
+def _used_chunks(chunk_hashes):
+    return _existing(ModelChunk.hash, chunk_hashes)
+
+
+def process_tombstones(limit=None):
+    """ Drain up to `limit` queued blobs; failures stay queued with attempts / last_error """
+    config = current_app.config
+    limit = limit or config.get("GC_BATCH", 200)
+    max_attempts = config.get("GC_MAX_ATTEMPTS", 5)
+    pending = StorageTombstone.query.filter(StorageTombstone.attempts < max_attempts) \
+        .order_by(StorageTombstone.id).limit(limit).all()
+
+    collected, failed = 0, []
+    for tombstone in pending:
+        tombstone_id, uri = tombstone.id, tombstone.uri
+        try:
+            _collect(tombstone)
+            collected += 1
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning("Storage GC: could not remove %s: %s", uri, e)
+            StorageTombstone.query.filter(StorageTombstone.id == tombstone_id).update(
+                {StorageTombstone.attempts: StorageTombstone.attempts + 1,
+                 StorageTombstone.last_error: str(e)[:1000]},
+                synchronize_session=False,
+            )
+            db.session.commit()
+            failed.append(tombstone_id)
+    return {"collected": collected, "failed": failed}
+
+
+def _old_files(root, cutoff, skip=()):
+    """ Files under `root` last modified before `cutoff` (epoch seconds) """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) not in skip]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    yield path
+            except FileNotFoundError:
+                pass
+
+
+def _existing(column, values):
+    """ Subset of `values` present in `column` (batched IN queries) """
+    found = set()
+    values = list(values)
+    for i in range(0, len(values), _BATCH):
+        found.update(v for (v,) in db.session.query(column).filter(column.in_(values[i:i + _BATCH])))
+    return found
+
+
+def _referenced_uris(uris):
+    uris = set(uris)
+    found = _existing(StorageTombstone.uri, uris)
+    for model in (AIModel, AIDatabase):
+        for column in _blob_columns(model):
+            found |= _existing(column, uris)
+    return found
+
+
+def _remove(path, removed):
+    try:
+        os.remove(path)
+        removed.append(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep(grace_seconds=None):
+    """
+    Remove local files no catalog row (or pending tombstone) references. Only files
+    older than GC_SWEEP_GRACE_SECONDS are considered, so uploads still in flight
+    (blob written, row not committed yet) are left alone. Remote storage is not swept.
+    """
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get("GC_SWEEP_GRACE_SECONDS", 3600)
+    cutoff = time.time() - grace_seconds
+    removed = []
+
+    # whole blobs + row index sidecars: uploads/models, uploads/databases
+    blobs, indexes = {}, {}
+    for folder in ("models", "databases"):
+        for path in _old_files(os.path.join(UPLOAD_FOLDER, folder), cutoff):
+            if path.endswith(_STALE_SUFFIXES):
+                _remove(path, removed)
+            elif path.endswith(INDEX_SUFFIX):
+                base = LocalBackend.scheme + path[:-len(INDEX_SUFFIX)]
+                indexes[path] = (base, base + COMPRESSED_SUFFIX)
+            else:
+                blobs[path] = LocalBackend.scheme + path
+    referenced = _referenced_uris(list(blobs.values()) + [uri for pair in indexes.values() for uri in pair])
+    for path, uri in blobs.items():
+        if uri not in referenced:
+            _remove(path, removed)
+    for path, (plain, compressed) in indexes.items():
+        if plain not in referenced and compressed not in referenced:
+            _remove(path, removed)
+
+    # chunk store: chunks by refcount row, manifests by cas:// uri
+    manifests_dir = os.path.join(CHUNK_STORE_FOLDER, "manifests")
+    chunks, manifests = {}, {}
+    for path in _old_files(CHUNK_STORE_FOLDER, cutoff, skip={manifests_dir}):
+        if path.endswith(_STALE_SUFFIXES):
+            _remove(path, removed)
+        else:
+            chunks[os.path.basename(path)] = path
+    for path in _old_files(manifests_dir, cutoff):
+        if path.endswith(_STALE_SUFFIXES):
+            _remove(path, removed)
+        elif path.endswith(".json"):
+            manifests[CAS_SCHEME + os.path.basename(path)[:-len(".json")]] = path
+    store = ChunkStore(CHUNK_STORE_FOLDER)
+    used = _used_chunks(chunks)
+    removed += _remove_unused(store, {h: p for h, p in chunks.items() if h not in used}, _used_chunks, cutoff)
+    referenced = _referenced_uris(manifests)
+    removed += _remove_unused(store, {u: p for u, p in manifests.items() if u not in referenced},
+                              _referenced_uris, cutoff)
+
+    return removed
+
+
+def _acquire_worker_lock():
+    """ Only one GC per host, even with several app workers (None if another one holds it) """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    lock_file = open(os.path.join(UPLOAD_FOLDER, ".gc.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_background_gc(app):
+    """ Start the GC thread when GC_ENABLED is set """
+    if not app.config.get("GC_ENABLED"):
+        return None
+    lock = _acquire_worker_lock()
+    if lock is None:
+        return None
+
+    def loop():
+        last_sweep = time.monotonic()  # first sweep after one interval, not at startup
+        while True:
+            try:
+                with app.app_context():
+                    result = process_tombstones()
+                    if result["failed"]:
+                        app.logger.error("Storage GC: %d blobs could not be removed", len(result["failed"]))
+                    sweep_interval = app.config.get("GC_SWEEP_INTERVAL_SECONDS")
+                    if sweep_interval and time.monotonic() - last_sweep >= sweep_interval:
+                        last_sweep = time.monotonic()
+                        removed = sweep()
+                        if removed:
+                            app.logger.info("Storage GC: swept %d unreferenced files", len(removed))
+            except Exception:
+                app.logger.exception("Storage GC pass failed")
+            time.sleep(app.config.get("GC_INTERVAL_SECONDS", 30))
+
+    thread = threading.Thread(target=loop, name="storage-gc", daemon=True)
+    thread._lock_file = lock  # keep the flock for the lifetime of the thread
+    thread.start()
+    return thread
+
+
+def register_gc_command(app):
+    @app.cli.command("gc")
+    @click.option("--sweep", "run_sweep", is_flag=True, help="Also remove files no row references.")
+    @click.option("--grace", default=None, type=int, help="Sweep grace period in seconds (default GC_SWEEP_GRACE_SECONDS).")
+    def gc(run_sweep, grace):
+        """Remove the blobs of deleted models / datasets in the foreground."""
+        collected, failed = 0, []
+        while True:
+            result = process_tombstones()
+            collected += result["collected"]
+            failed += result["failed"]
+            if not result["collected"]:
+                break
+        click.echo(f"collected={collected} failed={sorted(set(failed))}")
+        if run_sweep:
+            removed = sweep(grace)
+            click.echo(f"swept={len(removed)}")
+
+
+# ---- bulk delete ----
+
+_FILTERS = {
+    # key -> (column getter, parser)
+    "owner_id": (_owner_column, int),
+    "integrity_status": (lambda model: model.integrity_status, str),
+    "status": (lambda model: AIModel.status if model is AIModel else None, str),
+    "purpose": (lambda model: AIDatabase.purpose if model is AIDatabase else None, str),
+    "created_before": (lambda model: model.created_at, datetime.fromisoformat),
+}
+
+
+def _filter_query(model, criteria):
+    query = db.session.query(model.id, _owner_column(model))
+    for key, value in criteria.items():
+        if key not in _FILTERS:
+            raise ValueError(f"Unknown filter: {key}")
+        column_for, parse = _FILTERS[key]
+        column = column_for(model)
+        if column is None:
+            raise ValueError(f"Unknown filter: {key}")
+        value = parse(value)
+        query = query.filter(column < value if key == "created_before" else column == value)
+    return query
+
+
+def bulk_delete(model, payload, user):
+    """
+    Body of POST .../bulk-delete: {"ids": [...]} or {"filter": {...}}. Everything
+    matched is deleted (and its blobs queued) in one transaction, or nothing is.
+    """
+    max_rows = current_app.config.get("BULK_DELETE_MAX_ROWS", 10_000)
+    payload = payload or {}
+    ids, criteria = payload.get("ids"), payload.get("filter")
+    if (ids is None) == (criteria is None):
+        return {"message": "Provide either ids or filter."}, 400
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return {"message": "ids must be a list of integers."}, 400
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > max_rows:
+            return {"message": f"At most {max_rows} rows per bulk delete."}, 400
+        rows = []
+        for i in range(0, len(ids), _BATCH):
+            rows.extend(db.session.query(model.id, _owner_column(model)).filter(model.id.in_(ids[i:i + _BATCH])))
+        missing = sorted(set(ids) - {row_id for row_id, _ in rows})
+    else:
+        if not isinstance(criteria, dict) or not criteria:
+            return {"message": "filter must be a non-empty object."}, 400
+        if not user.is_admin:
+            try:
+                owner_id = int(criteria.get("owner_id", user.id))
+            except (TypeError, ValueError):
+                return {"message": "owner_id must be an integer."}, 400
+            if owner_id != user.id:
+                return {"message": "Forbidden"}, 403
+            criteria = {**criteria, "owner_id": user.id}
+        try:
+            query = _filter_query(model, criteria)
+        except (TypeError, ValueError) as e:
+            return {"message": str(e)}, 400
+        rows = query.limit(max_rows + 1).all()
+        if len(rows) > max_rows:
+            return {"message": f"Filter matches more than {max_rows} rows; narrow it down."}, 400
+        missing = []
+
+    if not user.is_admin:
+        foreign = sorted(row_id for row_id, owner_id in rows if owner_id != user.id)
+        if foreign:
+            return {"message": "Forbidden", "ids": foreign}, 403
+
+    deleted = tombstone_rows(model, [row_id for row_id, _ in rows])
+    db.session.commit()
+    return {"deleted": sorted(deleted), "missing": missing}, 200
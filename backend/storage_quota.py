@@ -0,0 +1,83 @@
+# backend/storage_quota.py
+# Per-user storage quotas. Usage lives in users.storage_used_bytes, kept up to
+# date by AIModel/AIDatabase save() and delete() in the same transaction as the
+# row itself; `flask reconcile-usage` recomputes it from the catalog and fixes
+# any drift (bulk inserts, crashes between blob and row, ...).
+import click
+from flask import current_app, request
+from sqlalchemy import func
+
+from backend.externals import db
+from backend.models import AIDatabase, AIModel, User
+
+
+def quota_bytes(user_quota_bytes, is_admin, config):
+    """ Effective quota in bytes, None for unlimited """
+    if is_admin:
+        return None
+    if user_quota_bytes is not None:
+        return user_quota_bytes
+    quota_mb = config.get("USER_STORAGE_QUOTA_MB")
+    return int(quota_mb * 1024 * 1024) if quota_mb is not None else None
+
+
+def usage(user):
+    """ Usage / quota fields for /auth/me, read off the user row (no aggregation) """
+    return {
+        "storage_used_bytes": user.storage_used_bytes or 0,
+        "storage_quota_bytes": quota_bytes(user.storage_quota_bytes, user.is_admin, current_app.config),
+    }
+
+
+def check_quota(user_id, incoming_bytes=None):
+    """
+    Error response when `incoming_bytes` more would exceed the user's quota, else None.
+    Defaults to the request Content-Length, so it can run before the body is read.
+    """
+    if incoming_bytes is None:
+        incoming_bytes = request.content_length or 0
+    row = db.session.query(User.storage_used_bytes, User.storage_quota_bytes, User.is_admin) \
+        .filter(User.id == user_id).first()
+    if row is None:
+        return {"message": "User not found"}, 404
+    limit = quota_bytes(row.storage_quota_bytes, row.is_admin, current_app.config)
+    if limit is not None and (row.storage_used_bytes or 0) + incoming_bytes > limit:
+        return {
+            "message": "Storage quota exceeded",
+            "storage_used_bytes": row.storage_used_bytes or 0,
+            "storage_quota_bytes": limit,
+            "upload_bytes": incoming_bytes,
+        }, 413
+    return None
+
+
+def _bytes(column):
+    return func.coalesce(func.sum(func.round(column * 1024 * 1024)), 0)
+
+
+def reconcile_usage():
+    """ Recompute every user's usage from the catalog; returns [(user_id, old, new), ...] for the ones fixed """
+    totals = {}
+    for owner_column, size_column in ((AIModel.uploader_id, AIModel.size_mb), (AIDatabase.user_id, AIDatabase.size_mb)):
+        for owner, size in db.session.query(owner_column, _bytes(size_column)).group_by(owner_column):
+            totals[owner] = totals.get(owner, 0) + int(size)
+
+    fixed = []
+    for user_id, used in db.session.query(User.id, User.storage_used_bytes):
+        expected = totals.get(user_id, 0)
+        if (used or 0) != expected:
+            fixed.append((user_id, used, expected))
+            User.query.filter(User.id == user_id).update({User.storage_used_bytes: expected},
+                                                        synchronize_session=False)
+    db.session.commit()
+    return fixed
+
+
+def register_usage_command(app):
+    @app.cli.command("reconcile-usage")
+    def reconcile_usage_command():
+        """Recompute per-user storage usage counters from the catalog."""
+        fixed = reconcile_usage()
+        for user_id, old, new in fixed:
+            click.echo(f"user {user_id}: {old} -> {new} bytes")
+        click.echo(f"{len(fixed)} counter(s) fixed")
@@ -1,37 +1,16 @@
 import unittest
 import io
-from backend.main import create_app
-from backend.configuration_classes_for_flask import TestConfig
+import hashlib
+import importlib.util
+import os
+from unittest.mock import patch
 from backend.externals import db
+from backend.models import ModelChunk
+from backend.storage_gc import process_tombstones
+from backend.constants import UPLOAD_FOLDER
+from backend.testing import AppTestCase
 
-class APITestCase(unittest.TestCase):
-    def setUp(self):
-        self.app = create_app(TestConfig)
-        self.client = self.app.test_client(self)
-        with self.app.app_context():
-            db.create_all()
-
-    def signup_and_login(self, username="testuser", email="testuser@test.com", password="password"):
-        # helper to register and login, returns access_token and user_id
-        signup_response = self.client.post('/auth/signup',
-            json={
-                "username": username,
-                "email": email,
-                "password": password
-            })
-        self.assertIn(signup_response.status_code, (200, 201))
-
-        login_response = self.client.post('/auth/login',
-            json={
-                "identifier": username,
-                "password": password
-            })
-        self.assertEqual(login_response.status_code, 200)
-        data = login_response.get_json()
-        access_token = data.get("access_token")
-        user_id = data.get("user_id")
-        return access_token, user_id
-
+class APITestCase(AppTestCase):
     def test_signup(self):
         signup_response = self.client.post('/auth/signup',
             json={
@@ -121,10 +100,235 @@ class APITestCase(unittest.TestCase):
         status_code = delete_database_response.status_code
         self.assertEqual(status_code, 200)
 
+    def test_update_database_keeps_file_fields(self):
+        access_token, user_id = self.signup_and_login(password="password1234")
+        headers = {"Authorization": f"Bearer {access_token}"}
+        upload_response = self.client.post('/databases/databases/upload', headers=headers, data={
+            "name": "Sized", "purpose": "training", "file": (io.BytesIO(b"a,b\n1,2\n"), "sized.csv")})
+        self.assertEqual(upload_response.status_code, 201)
+        uploaded = upload_response.get_json()
+
+        response = self.client.put(f'/databases/databases/{uploaded["id"]}', headers=headers, json={
+            "description": "resized", "size_mb": 1e9, "user_id": user_id + 1, "storage_uri": "file:///etc/passwd"})
+        self.assertEqual(response.status_code, 200)
+        updated = response.get_json()
+        self.assertEqual(updated["description"], "resized")
+        self.assertEqual((updated["size_mb"], updated["storage_uri"]), (uploaded["size_mb"], uploaded["storage_uri"]))
+
+        self.client.delete(f'/databases/databases/{uploaded["id"]}', headers=headers)
+        me = self.client.get('/auth/me', headers=headers).get_json()
+        self.assertEqual(me["storage_used_bytes"], 0)
+
+    def test_preview_and_sample_database(self):
+        access_token, user_id = self.signup_and_login(password="password1234")
+
+        csv_body = "id,value\n" + "".join(f"{i},v{i}\n" for i in range(1000))
+        upload_database_response = self.client.post('/databases/databases/upload',
+            data={
+                "name": "Rows",
+                "purpose": "training",
+                "file": (io.BytesIO(csv_body.encode()), "rows.csv"),
+            },
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        self.assertEqual(upload_database_response.status_code, 201)
+        db_id = upload_database_response.get_json()["id"]
+
+        preview = self.client.get(f'/databases/databases/{db_id}/preview?rows=3').get_json()
+        self.assertEqual(preview["columns"], ["id", "value"])
+        self.assertEqual(preview["row_count"], 1000)
+        self.assertEqual(preview["rows"], [["0", "v0"], ["1", "v1"], ["2", "v2"]])
+
+        sample = self.client.get(f'/databases/databases/{db_id}/sample?n=50&seed=7').get_json()
+        again = self.client.get(f'/databases/databases/{db_id}/sample?n=50&seed=7').get_json()
+        self.assertEqual(sample["rows"], again["rows"])
+        self.assertEqual(len(sample["rows"]), 50)
+        for row_number, row in zip(sample["row_numbers"], sample["rows"]):
+            self.assertEqual(row, [str(row_number), f"v{row_number}"])
+
+        self.client.delete(f'/databases/databases/{db_id}',
+            headers={"Authorization": f"Bearer {access_token}"})
+
+    @unittest.skipUnless(importlib.util.find_spec("zstandard"), "zstandard not installed")
+    def test_upload_database_compressed(self):
+        self.app.config["STORAGE_COMPRESSION"] = "zstd"
+        access_token, user_id = self.signup_and_login(password="password1234")
+
+        csv_body = ("id,value\n" + "".join(f"{i},v{i}\n" for i in range(5000))).encode()
+        response = self.client.post('/databases/databases/upload',
+            data={
+                "name": "Compressed",
+                "purpose": "training",
+                "file": (io.BytesIO(csv_body), "compressed.csv"),
+            },
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertTrue(data["storage_uri"].endswith(".blob.zst"))
+        # hash is over the uncompressed content
+        self.assertEqual(data["data_hash"], hashlib.sha256(csv_body).hexdigest())
+
+        preview = self.client.get(f'/databases/databases/{data["id"]}/preview?rows=2').get_json()
+        self.assertEqual(preview["rows"], [["0", "v0"], ["1", "v1"]])
+
+        self.client.delete(f'/databases/databases/{data["id"]}',
+            headers={"Authorization": f"Bearer {access_token}"})
+
+    def test_model_versions_share_chunks(self):
+        self.app.config.update(MODEL_DEDUP=True, CDC_MIN_SIZE=4 * 1024, CDC_AVG_SIZE=16 * 1024, CDC_MAX_SIZE=64 * 1024)
+        access_token, user_id = self.signup_and_login(password="password1234")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        base = os.urandom(2 * 1024 * 1024)
+        tuned = base[:1024 * 1024] + b"fine-tuned" + base[1024 * 1024 + 10:]
+
+        with patch("backend.ai_model_api_endpoints.call_register_model",
+                   return_value={"txid": "tx", "model_pda": "pda"}):
+            r1 = self.client.post('/models/models/upload', headers=headers, data={
+                "name": "base", "file": (io.BytesIO(base), "base.bin")})
+            self.assertEqual(r1.status_code, 201)
+            base_id = r1.get_json()["id"]
+            r2 = self.client.post('/models/models/upload', headers=headers, data={
+                "name": "tuned", "parent_id": str(base_id), "file": (io.BytesIO(tuned), "tuned.bin")})
+            self.assertEqual(r2.status_code, 201)
+
+        v2 = r2.get_json()
+        self.assertEqual(v2["parent_id"], base_id)
+        self.assertTrue(v2["storage_uri"].startswith("cas://"))
+        # only the chunks around the edit are new
+        self.assertLess(v2["stored_size_mb"], 0.25 * v2["size_mb"])
+
+        versions = self.client.get(f'/models/models/{base_id}/versions').get_json()
+        self.assertEqual([v["id"] for v in versions], [v2["id"]])
+
+        for model_id in (base_id, v2["id"]):
+            self.client.delete(f'/models/models/{model_id}', headers=headers)
+        with self.app.app_context():
+            self.assertGreater(ModelChunk.query.count(), 0)  # released by the GC, not inline
+            self.assertEqual(process_tombstones()["collected"], 2)
+            self.assertEqual(ModelChunk.query.count(), 0)
+
+    @unittest.skipUnless(importlib.util.find_spec("prometheus_client"), "prometheus_client not installed")
+    def test_metrics_endpoint(self):
+        access_token, user_id = self.signup_and_login(password="password1234")
+        upload_response = self.client.post('/databases/databases/upload',
+            data={
+                "name": "Metrics",
+                "purpose": "training",
+                "file": (io.BytesIO(b"a,b\n1,2\n"), "metrics.csv"),
+            },
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        self.client.get('/databases/databases')
+
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count{endpoint="/databases/databases"', body)
+        self.assertIn('upload_phase_seconds_count{kind="databases",phase="hash"}', body)
+        self.assertIn('db_queries_total{statement="SELECT"}', body)
+
+        # a failed statement leaves no start time behind on the pooled connection
+        from sqlalchemy.exc import OperationalError
+        with self.app.app_context():
+            with db.engine.connect() as conn:
+                with self.assertRaises(OperationalError):
+                    conn.exec_driver_sql("SELECT * FROM no_such_table")
+                conn.exec_driver_sql("SELECT 1")
+                self.assertFalse(conn.info.get("query_start"))
+
+        self.client.delete(f'/databases/databases/{upload_response.get_json()["id"]}',
+            headers={"Authorization": f"Bearer {access_token}"})
+
+    def test_owner_checks_use_token_claims(self):
+        from sqlalchemy import event
+        from backend.models import User
+        access_token, user_id = self.signup_and_login(password="password1234")
+        headers = {"Authorization": f"Bearer {access_token}"}
+        upload_response = self.client.post('/databases/databases/upload', headers=headers, data={
+            "name": "Claims", "purpose": "training", "file": (io.BytesIO(b"a,b\n1,2\n"), "claims.csv")})
+        db_id = upload_response.get_json()["id"]
+
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = self.client.put(f'/databases/databases/{db_id}', headers=headers, json={"description": "updated"})
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([s for s in statements if "FROM users" in s])
+
+        # a role change makes claims issued before it fall back to the (refreshed) user lookup
+        other_token, _ = self.signup_and_login(username="other", email="other@test.com", password="password1234")
+        other = {"Authorization": f"Bearer {other_token}"}
+        self.assertEqual(self.client.delete(f'/databases/databases/{db_id}', headers=other).status_code, 403)
+        with self.app.app_context():
+            User.query.filter_by(username="other").first().is_admin = True
+            db.session.commit()
+        self.assertEqual(self.client.delete(f'/databases/databases/{db_id}', headers=other).status_code, 200)
+
+    def test_storage_quota_and_usage_counters(self):
+        from backend.models import User
+        from backend.storage_quota import reconcile_usage
+        access_token, user_id = self.signup_and_login(password="password1234")
+        headers = {"Authorization": f"Bearer {access_token}"}
+        with self.app.app_context():
+            db.session.get(User, user_id).storage_quota_bytes = 4096
+            db.session.commit()
+
+        body = b"id,value\n" + b"1,x\n" * 500   # 2009 bytes
+        upload = lambda name: self.client.post('/databases/databases/upload', headers=headers, data={
+            "name": name, "purpose": "training", "file": (io.BytesIO(body), f"{name}.csv")})
+        first = upload("first")
+        self.assertEqual(first.status_code, 201)
+        me = self.client.get('/auth/me', headers=headers).get_json()
+        self.assertEqual((me["storage_used_bytes"], me["storage_quota_bytes"]), (len(body), 4096))
+
+        self.assertEqual(upload("second").status_code, 413)   # rejected from Content-Length, nothing stored
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_FOLDER, "databases", "second.csv")))
+
+        self.client.delete(f'/databases/databases/{first.get_json()["id"]}', headers=headers)
+        self.assertEqual(self.client.get('/auth/me', headers=headers).get_json()["storage_used_bytes"], 0)
+
+        with self.app.app_context():
+            db.session.get(User, user_id).storage_used_bytes = 12345   # drift
+            db.session.commit()
+            self.assertEqual(reconcile_usage(), [(user_id, 12345, 0)])
+            self.assertEqual(reconcile_usage(), [])
+
+    def test_list_endpoint_fast_path_matches_marshal(self):
+        import gzip
+        import json
+        from flask_restx import marshal
+        from backend.ai_databse_api_endpoints import db_model
+        from backend.models import AIDatabase
+        access_token, user_id = self.signup_and_login(password="password1234")
+        headers = {"Authorization": f"Bearer {access_token}"}
+        ids = [self.client.post('/databases/databases/upload', headers=headers, data={
+            "name": f"List {i}", "purpose": "training", "file": (io.BytesIO(b"a,b\n%d,2\n" % i), f"list{i}.csv"),
+        }).get_json()["id"] for i in range(30)]
+
+        response = self.client.get('/databases/databases', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        with self.app.app_context():
+            expected = json.loads(json.dumps(marshal(AIDatabase.query.order_by(AIDatabase.id).all(), db_model)))
+        self.assertEqual(json.loads(gzip.decompress(response.get_data())), expected)
+        self.assertNotIn("Content-Encoding", self.client.get('/databases/databases').headers)
+
+        swagger = self.client.get('/swagger.json').get_json()
+        schema = swagger["paths"]["/databases/databases"]["get"]["responses"]["200"]["schema"]
+        self.assertEqual(schema, {"type": "array", "items": {"$ref": "#/definitions/AIDatabase"}})
+
+        for db_id in ids:
+            self.client.delete(f'/databases/databases/{db_id}', headers=headers)
+
     def tearDown(self):
         with self.app.app_context():
-            db.session.remove()
-            db.drop_all()
+            process_tombstones()  # blobs of the rows the test deleted
+        super().tearDown()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+
+from backend.catalog_transfer import bulk_import
+from backend.externals import db
+from backend.models import AIDatabase, User
+from backend.utils.hash_utils import merkle_root_from_file
+from backend.testing import AppTestCase
+from backend.utils.storage_backends import local_path
+
+
+class CatalogTransferTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = self.auth_headers("catadmin", is_admin=True)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        with self.app.app_context():
+            for uri, in db.session.query(AIDatabase.storage_uri):
+                if local_path(uri) and os.path.exists(local_path(uri)):
+                    os.remove(local_path(uri))
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def test_bulk_import_then_streaming_export(self):
+        contents = {}
+        for i in range(12):
+            sub = os.path.join(self.tmp_dir.name, f"part{i % 3}")
+            os.makedirs(sub, exist_ok=True)
+            contents[f"rows{i}"] = os.urandom(1000 + i) if i % 2 else b"a,b\n" * (i + 1)
+            with open(os.path.join(sub, f"rows{i}.csv"), "wb") as f:
+                f.write(contents[f"rows{i}"])
+
+        with self.app.app_context():
+            owner = User.query.filter_by(username="catadmin").first()
+            self.assertEqual(bulk_import(self.tmp_dir.name, "database", owner, workers=2, batch_size=5), 12)
+            rows = AIDatabase.query.all()
+            self.assertEqual(len(rows), 12)
+            for row in rows:
+                self.assertEqual(row.data_hash, hashlib.sha256(contents[row.name]).hexdigest())
+                self.assertEqual(row.merkle_root, merkle_root_from_file(local_path(row.storage_uri)))
+            self.assertEqual(db.session.get(User, owner.id).storage_used_bytes,
+                             sum(len(c) for c in contents.values()))
+
+        self.assertEqual(self.client.get('/admin/export?kind=nope', headers=self.headers).status_code, 400)
+        response = self.client.get('/admin/export', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([r["kind"] for r in records], ["user"] + ["database"] * 12)
+        self.assertNotIn("password", records[0])
+        self.assertEqual({r["name"] for r in records[1:]}, set(contents))
+
+
+if __name__ == '__main__':
+    unittest.main()
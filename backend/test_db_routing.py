@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.configuration_classes_for_flask import TestConfig
+from backend.db_routing import Replica
+from backend.externals import db
+from backend.models import AIModel
+from backend.testing import TEST_PASSWORD, AppTestCase
+
+
+class ReplicaRoutingTestCase(AppTestCase):
+    """ SQLite stand-ins: the replica is a file copy of the primary taken mid-test (a frozen snapshot) """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.primary = os.path.join(self.tmp_dir.name, "primary.db")
+        self.replica = os.path.join(self.tmp_dir.name, "replica.db")
+
+        class ReplicaConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + self.primary
+            SQLALCHEMY_REPLICA_URIS = ["sqlite:///" + self.replica]
+            REPLICA_MAX_LAG_SECONDS = 5.0
+            REPLICA_LAG_CHECK_INTERVAL = 0
+
+        self.config_class = ReplicaConfig
+        super().setUp()
+        token, user_id = self.signup_and_login("reader", "reader@test.com", TEST_PASSWORD)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+        with self.app.app_context():
+            self.model = self.add_model(user_id, "before-snapshot")
+        shutil.copy(self.primary, self.replica)
+        with self.app.app_context():
+            self.add_model(user_id, "after-snapshot")
+
+    def tearDown(self):
+        super().tearDown()
+        for engine in self.app.extensions["db_replicas"].engines:
+            engine.dispose()
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def add_model(uploader_id, name):
+        model = AIModel(uploader_id=uploader_id, name=name, model_hash="0" * 64, storage_uri=f"file:///{name}.bin",
+                        size_mb=0.0, description="original")
+        db.session.add(model)
+        db.session.commit()
+        return model.id
+
+    def names(self, headers=None):
+        # anonymous reads come from another address than the one that signed up (a recent writer)
+        environ = {} if headers else {"REMOTE_ADDR": "10.0.0.7"}
+        return [m["name"] for m in self.client.get('/models/models', headers=headers, environ_base=environ).get_json()]
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        self.assertEqual(self.names(), ["before-snapshot"])
+        with self.app.app_context():
+            self.assertEqual(AIModel.query.count(), 2)  # no request: primary
+
+        response = self.client.put(f'/models/models/{self.model}', headers=self.headers, json={"description": "edited"})
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(AIModel, self.model).description, "edited")
+
+    def test_read_your_writes(self):
+        self.client.put(f'/models/models/{self.model}', headers=self.headers, json={"description": "edited"})
+        # the writer reads from the primary until a replica could have caught up ...
+        self.assertEqual(self.client.get(f'/models/models/{self.model}', headers=self.headers).get_json()["description"], "edited")
+        self.assertEqual(self.names(self.headers), ["before-snapshot", "after-snapshot"])
+        # ... while other clients keep using the replica
+        response = self.client.get(f'/models/models/{self.model}', environ_base={"REMOTE_ADDR": "10.0.0.7"})
+        self.assertEqual(response.get_json()["description"], "original")
+
+    def test_lagging_or_unreachable_replica_falls_back_to_the_primary(self):
+        with patch.object(Replica, "measure_lag", return_value=30.0):
+            self.assertEqual(self.names(), ["before-snapshot", "after-snapshot"])
+        with patch.object(Replica, "measure_lag", side_effect=OSError("connection refused")):
+            self.assertEqual(self.names(), ["before-snapshot", "after-snapshot"])
+        with patch.object(Replica, "measure_lag", return_value=0.5):
+            self.assertEqual(self.names(), ["before-snapshot"])
+
+
+if __name__ == '__main__':
+    unittest.main()
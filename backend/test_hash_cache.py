@@ -0,0 +1,97 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.utils import hash_cache
+from backend.utils.hash_cache import FINGERPRINT_BYTES, HashCache
+from backend.utils.hash_utils import file_sha256_stream, merkle_root_from_file, merkle_root_from_leaves
+
+
+class HashCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = HashCache(os.path.join(self.tmp_dir.name, "cache", ".hashcache"), max_entries=100)
+
+    def tearDown(self):
+        hash_cache.configure({"HASH_CACHE_ENABLED": False})
+        self.tmp_dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def digests(self, path, leaf_size=1024):
+        """ cache.digests plus the results of the lookups it made """
+        with patch.object(hash_cache, "observe_hash_cache") as observe, \
+                patch.object(hash_cache, "hash_file", wraps=hash_cache.hash_file) as reads:
+            result = self.cache.digests(path, leaf_size)
+        return result, [c.args[0] for c in observe.call_args_list], reads.call_count
+
+    def test_unchanged_files_are_not_read_again(self):
+        data = os.urandom(5000)
+        path = self.write("model.bin", data)
+        (sha, leaves), results, reads = self.digests(path)
+        self.assertEqual((sha, results, reads), (hashlib.sha256(data).hexdigest(), ["miss"], 1))
+        self.assertEqual(leaves, [hashlib.sha256(data[i:i + 1024]).digest() for i in range(0, 5000, 1024)])
+
+        self.assertEqual(self.digests(path), ((sha, leaves), ["hit"], 0))
+        # persisted: a new process (here: instance) on the same file still hits
+        self.cache = HashCache(self.cache.path)
+        self.assertEqual(self.digests(path)[1:], (["hit"], 0))
+
+        # rewritten with the same size: new mtime, new digest
+        os.utime(path, ns=(0, 0))
+        changed = os.urandom(5000)
+        with open(path, "r+b") as f:
+            f.write(changed)
+        self.assertEqual(self.digests(path)[0][0], hashlib.sha256(changed).hexdigest())
+
+    def test_same_bytes_under_a_new_identity_reuse_the_leaves(self):
+        data = os.urandom(3 * FINGERPRINT_BYTES)
+        original = self.write("first.bin", data)
+        expected, _, _ = self.digests(original)
+
+        copy = os.path.join(self.tmp_dir.name, "upload.bin")
+        shutil.copyfile(original, copy)
+        with patch.object(hash_cache, "hash_file", wraps=hash_cache.hash_file) as reads:
+            self.assertEqual(self.cache.digests(copy, 1024), expected)
+        reads.assert_called_once_with(copy, 1024, leaves=False)  # sha256 only, to confirm the match
+        self.assertEqual(self.digests(copy)[1:], (["hit"], 0))
+
+        # same size, head and tail, different middle: the fingerprint matches but the digest does not
+        middle = bytearray(data)
+        middle[FINGERPRINT_BYTES + 10] ^= 0xFF
+        forged = self.write("forged.bin", bytes(middle))
+        (sha, leaves), results, _ = self.digests(forged)
+        self.assertEqual(results, ["miss"])
+        self.assertEqual(sha, hashlib.sha256(bytes(middle)).hexdigest())
+        self.assertNotEqual(leaves, expected[1])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.max_entries = 3  # an identity and a fingerprint entry per file
+        paths = [self.write(f"f{i}", os.urandom(100 + i)) for i in range(3)]
+        self.digests(paths[0])
+        self.digests(paths[1])   # evicts the fingerprint entry of paths[0]
+        self.digests(paths[0])   # most recently used again
+        self.digests(paths[2])   # evicts both entries of paths[1]
+        self.assertEqual(self.digests(paths[0])[1], ["hit"])
+        self.assertEqual(self.digests(paths[1])[1], ["miss"])
+
+    def test_hash_utils_go_through_the_configured_cache(self):
+        data = os.urandom(10_000)
+        path = self.write("dataset.csv", data)
+        self.assertIsNotNone(hash_cache.configure({"HASH_CACHE_FILE": ":memory:"}))
+        self.assertEqual(file_sha256_stream(path), hashlib.sha256(data).hexdigest())
+        with patch.object(hash_cache, "hash_file") as reads:
+            # the leaves were recorded by the sha256 pass
+            self.assertEqual(merkle_root_from_file(path), merkle_root_from_leaves([hashlib.sha256(data).digest()]))
+        reads.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
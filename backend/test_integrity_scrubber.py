@@ -0,0 +1,84 @@
+import unittest
+import io
+import os
+from unittest.mock import patch
+
+from backend.externals import db
+from backend.models import AIDatabase, AIModel, ScrubCheckpoint
+from backend.integrity_scrubber import run_pass
+from backend.storage_gc import process_tombstones
+from backend.testing import AppTestCase
+from backend.utils.storage_backends import _chunk_store, local_path
+
+
+class IntegrityScrubberTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config.update(SCRUB_IO_BYTES_PER_SEC=0, SCRUB_ARTIFACTS_PER_PASS=1)
+        self.headers = self.auth_headers("scrubber")
+
+        self.ids = []
+        for i in range(2):
+            response = self.client.post('/databases/databases/upload', headers=self.headers, data={
+                "name": f"scrub-{i}", "purpose": "training",
+                "file": (io.BytesIO(b"row %d\n" % i * 1000), f"scrub-{i}.txt")})
+            self.assertEqual(response.status_code, 201)
+            self.ids.append(response.get_json()["id"])
+
+    def tearDown(self):
+        for db_id in self.ids:
+            self.client.delete(f'/databases/databases/{db_id}', headers=self.headers)
+        with self.app.app_context():
+            process_tombstones()
+        super().tearDown()
+
+    def test_passes_resume_from_checkpoint_and_flag_corruption(self):
+        with self.app.app_context():
+            first = run_pass(self.app.config)
+            second = run_pass(self.app.config)
+            self.assertEqual(first["checked"], 1)
+            self.assertEqual(second["checked"], 1)
+            self.assertEqual(db.session.get(ScrubCheckpoint, "default").last_id, self.ids[1])
+            self.assertEqual({e.integrity_status for e in AIDatabase.query.all()}, {"ok"})
+
+            # flip bytes behind the first dataset
+            path = local_path(db.session.get(AIDatabase, self.ids[0]).storage_uri)
+            with open(path, "r+b") as f:
+                f.write(b"XXXX")
+
+            result = run_pass(self.app.config)  # wraps around to the first dataset
+            self.assertEqual(result["corrupted"], [("databases", self.ids[0])])
+            self.assertEqual(db.session.get(AIDatabase, self.ids[0]).integrity_status, "corrupted")
+            self.assertEqual(db.session.get(ScrubCheckpoint, "default").passes, 1)
+
+    def test_missing_chunk_flags_the_model_and_the_scrubber_moves_on(self):
+        self.app.config.update(MODEL_DEDUP=True, SCRUB_ARTIFACTS_PER_PASS=4)
+        models = []
+        with patch("backend.ai_model_api_endpoints.call_register_model",
+                   return_value={"txid": "tx", "model_pda": "pda"}):
+            for i in range(2):
+                response = self.client.post('/models/models/upload', headers=self.headers, data={
+                    "name": f"chunked-{i}", "file": (io.BytesIO(os.urandom(256 * 1024)), f"chunked-{i}.bin")})
+                self.assertEqual(response.status_code, 201)
+                models.append(response.get_json())
+        try:
+            self.assertTrue(models[0]["storage_uri"].startswith("cas://"))
+            store = _chunk_store()
+            first_chunk = store.read_manifest(models[0]["storage_uri"][len("cas://"):])["chunks"][0][0]
+            os.remove(store.chunk_path(first_chunk))
+
+            with self.app.app_context():
+                result = run_pass(self.app.config)  # both datasets, then both models
+                self.assertEqual(result["checked"], 4)
+                self.assertEqual(result["corrupted"], [("models", models[0]["id"])])
+                self.assertEqual(db.session.get(AIModel, models[0]["id"]).integrity_status, "corrupted")
+                self.assertEqual(db.session.get(AIModel, models[1]["id"]).integrity_status, "ok")
+                cp = db.session.get(ScrubCheckpoint, "default")
+                self.assertEqual((cp.kind, cp.last_id), ("models", models[1]["id"]))
+        finally:
+            for model in models:
+                self.client.delete(f'/models/models/{model["id"]}', headers=self.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from backend.model_conversion import convert_in_worker, safetensors_canonical_hash
+from backend.storage_gc import process_tombstones
+from backend.testing import AppTestCase
+from backend.utils.hash_utils import canonical_state_dict_hash, torch
+from backend.utils.storage_backends import local_path
+
+
+@unittest.skipIf(torch is None, "torch not installed")
+class ModelConversionTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = {username: self.auth_headers(username) for username in ("converter", "stranger", "renter")}
+
+    def tearDown(self):
+        with self.app.app_context():
+            process_tombstones()
+        super().tearDown()
+
+    def upload(self, state_dict, filename, username="converter"):
+        buf = io.BytesIO()
+        torch.save(state_dict, buf)
+        buf.seek(0)
+        with patch("backend.ai_model_api_endpoints.call_register_model",
+                   return_value={"txid": "tx", "model_pda": "pda"}):
+            response = self.client.post('/models/models/upload', headers=self.headers[username], data={
+                "name": filename, "file": (buf, filename)})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def test_checkpoint_is_stored_as_safetensors_too(self):
+        state_dict = {
+            "encoder.weight": torch.randn(16, 8),
+            "encoder.bias": torch.randn(16),
+            "decoder.weight": torch.randn(8, 16).t(),  # non-contiguous
+            "steps": torch.tensor(1234),
+            "mask": torch.tensor([True, False, True]),
+        }
+        model = self.upload(state_dict, "tiny.pt")
+
+        # same canonical hash as before the conversion existed, and the copy hashes to it too
+        self.assertEqual(model["model_hash"], canonical_state_dict_hash(state_dict))
+        self.assertIn(f'/safetensors/{model["model_hash"]}-', model["safetensors_uri"])
+        self.assertEqual(safetensors_canonical_hash(local_path(model["safetensors_uri"])), model["model_hash"])
+
+        listing = self.client.get(f'/models/models/{model["id"]}/tensors').get_json()
+        self.assertEqual([t["name"] for t in listing["tensors"]], sorted(state_dict))
+        self.assertEqual(listing["tensors"][1], {"name": "encoder.bias", "dtype": "F32", "shape": [16], "nbytes": 64})
+
+        url = f'/models/models/{model["id"]}/tensors/decoder.weight'
+        self.assertEqual(self.client.get(url, headers=self.headers["stranger"]).status_code, 403)
+        with patch("backend.ai_model_api_endpoints.call_rent_model", return_value="rent-tx"):
+            self.client.post(f'/models/models/{model["id"]}/rent', headers=self.headers["renter"])
+        self.assertEqual(self.client.get(url, headers=self.headers["renter"]).status_code, 200)
+        response = self.client.get(url, headers=self.headers["converter"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.headers["X-Tensor-Dtype"], response.headers["X-Tensor-Shape"]), ("F32", "16,8"))
+        weights = np.frombuffer(response.get_data(), dtype="<f4").reshape(16, 8)
+        np.testing.assert_array_equal(weights, state_dict["decoder.weight"].numpy())
+        self.assertEqual(self.client.get(f'/models/models/{model["id"]}/tensors/nope',
+                                         headers=self.headers["converter"]).status_code, 404)
+
+        # both artifacts are collected with the model
+        self.client.delete(f'/models/models/{model["id"]}', headers=self.headers["converter"])
+        with self.app.app_context():
+            process_tombstones()
+        self.assertFalse(os.path.exists(local_path(model["safetensors_uri"])))
+
+    def test_same_file_name_from_another_user_keeps_its_own_copy(self):
+        first = {"w": torch.zeros(4)}
+        second = {"w": torch.ones(4)}
+        models = [self.upload(first, "model.pt"), self.upload(second, "model.pt", username="stranger")]
+        self.assertNotEqual(models[0]["safetensors_uri"], models[1]["safetensors_uri"])
+        for model, state_dict, username in zip(models, (first, second), ("converter", "stranger")):
+            response = self.client.get(f'/models/models/{model["id"]}/tensors/w', headers=self.headers[username])
+            np.testing.assert_array_equal(np.frombuffer(response.get_data(), dtype="<f4"), state_dict["w"].numpy())
+            self.client.delete(f'/models/models/{model["id"]}', headers=self.headers[username])
+
+    def test_conversion_past_the_timeout_is_killed_without_output(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_path = os.path.join(tmp_dir, "slow.pt")
+            torch.save({"w": torch.randn(64, 64)}, src_path)
+            with self.assertRaises(TimeoutError):
+                convert_in_worker(src_path, {"MODEL_CONVERT_TIMEOUT": 0.01})
+            self.assertEqual(os.listdir(tmp_dir), ["slow.pt"])
+
+            canonical, dst_path, _ = convert_in_worker(src_path, {})
+            self.assertEqual(os.path.dirname(dst_path), tmp_dir)
+            self.assertEqual(safetensors_canonical_hash(dst_path), canonical)
+
+    def test_model_card_is_built_during_ingest(self):
+        state_dict = {
+            "encoder.layers.0.weight": torch.randn(32, 16),
+            "encoder.layers.0.bias": torch.randn(32),
+            "encoder.norm.weight": torch.ones(32, dtype=torch.float16),
+            "head.weight": torch.randn(4, 32),
+            "steps": torch.tensor(7),
+        }
+        model = self.upload(state_dict, "card.pt")
+        self.assertNotIn("model_card", model)
+
+        card = self.client.get(f'/models/models/{model["id"]}').get_json()["model_card"]
+        self.assertEqual(card["tensors"], 5)
+        self.assertEqual(card["parameters"], 32 * 16 + 32 + 32 + 4 * 32 + 1)
+        self.assertEqual(card["bytes"], (32 * 16 + 32 + 4 * 32) * 4 + 32 * 2 + 8)
+        self.assertEqual(card["dtypes"]["float16"], {"tensors": 1, "parameters": 32})
+        self.assertEqual(card["modules"]["encoder"]["parameters"], 32 * 16 + 32 + 32)
+        self.assertEqual(card["modules"]["encoder"]["children"]["layers"], {"tensors": 2, "parameters": 32 * 16 + 32})
+        self.assertNotIn("steps", card["modules"])
+        self.assertEqual(card["largest"][0], {"name": "encoder.layers.0.weight", "shape": [32, 16],
+                                              "dtype": "float32", "parameters": 512})
+
+        # the same card without the conversion worker (in-process canonical hash)
+        card_out = {}
+        canonical_state_dict_hash(state_dict, card_out=card_out)
+        self.assertEqual(card_out, card)
+        self.client.delete(f'/models/models/{model["id"]}', headers=self.headers["converter"])
+
+    def test_non_state_dict_checkpoints_are_kept_as_is(self):
+        model = self.upload({"model": {"w": torch.ones(2)}, "epoch": 3}, "nested.pt")
+        self.assertIsNone(model["safetensors_uri"])
+        self.assertEqual(self.client.get(f'/models/models/{model["id"]}/tensors').status_code, 404)
+        self.client.delete(f'/models/models/{model["id"]}', headers=self.headers["converter"])
+
+
+if __name__ == '__main__':
+    unittest.main()
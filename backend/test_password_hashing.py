@@ -0,0 +1,47 @@
+import unittest
+
+from backend.main import create_app
+from backend.configuration_classes_for_flask import TestConfig
+from backend.externals import db
+from backend.models import User
+from backend.password_hashing import Pbkdf2Hasher, ScryptHasher, check_password, hash_password
+
+
+class PasswordHashingTestCase(unittest.TestCase):
+    def test_check_password_accepts_any_scheme_and_requests_upgrade(self):
+        config = {"PASSWORD_HASHER": "scrypt", "SCRYPT_N": 2 ** 14}
+        old = Pbkdf2Hasher(iterations=1000).hash("secret-password")
+
+        self.assertEqual(check_password(old, "wrong-password", config), (False, None))
+        ok, new_hash = check_password(old, "secret-password", config)
+        self.assertTrue(ok)
+        self.assertTrue(new_hash.startswith("scrypt:16384:8:1$"))
+        self.assertEqual(check_password(new_hash, "secret-password", config), (True, None))
+        self.assertFalse(ScryptHasher(n=2 ** 14).needs_rehash(hash_password("x", config)))
+
+    def test_login_rehashes_with_current_parameters(self):
+        app = create_app(TestConfig)
+        app.config.update(PASSWORD_HASHER="pbkdf2", PBKDF2_ITERATIONS=1000)
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+        try:
+            client.post('/auth/signup', json={"username": "hasher", "email": "hasher@test.com",
+                                              "password": "password1234"})
+            with app.app_context():
+                self.assertTrue(User.query.filter_by(username="hasher").first().password.startswith("pbkdf2:sha256:1000$"))
+
+            app.config.update(PASSWORD_HASHER="scrypt", SCRYPT_N=2 ** 14)
+            self.assertEqual(client.post('/auth/login', json={"identifier": "hasher", "password": "nope"}).status_code, 401)
+            response = client.post('/auth/login', json={"identifier": "hasher@test.com", "password": "password1234"})
+            self.assertEqual(response.status_code, 200)
+            with app.app_context():
+                self.assertTrue(User.query.filter_by(username="hasher").first().password.startswith("scrypt:16384:8:1$"))
+        finally:
+            with app.app_context():
+                db.session.remove()
+                db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
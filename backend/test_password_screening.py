@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+import unittest
+
+from backend.password_screening import password_similarity, screen_password
+from backend.utils.bloom_filter import BloomFilter, build_bloom_filter
+
+
+class PasswordScreeningTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "breached.bloom")
+        words = [b"correcthorsebattery", b"qwertyuiop123"] + [b"leaked-%d" % i for i in range(20000)]
+        build_bloom_filter(iter(words), self.path, len(words), fp_rate=0.001)
+        self.config = {"BREACHED_PASSWORDS_FILTER": self.path, "PASSWORD_SIMILARITY_CHECK": True}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_bloom_filter_membership(self):
+        bloom = BloomFilter(self.path)
+        try:
+            self.assertIn(b"leaked-123", bloom)
+            self.assertIn(b"correcthorsebattery", bloom)
+            false_positives = sum(b"fresh-%d" % i in bloom for i in range(20000))
+            self.assertLess(false_positives, 60)  # ~0.1% expected
+        finally:
+            bloom.close()
+
+    def test_screen_password(self):
+        self.assertIsNone(screen_password("a-reasonable passphrase", "alice", "alice@test.com", self.config))
+        self.assertIn("breached", screen_password("CorrectHorseBattery", "alice", "alice@test.com", self.config))
+        self.assertIn("criteria", screen_password("short", "alice", "alice@test.com", self.config))
+        if password_similarity is not None:
+            self.assertIn("similar", screen_password("J0hnSm1th-2024", "johnsmith", "js@test.com", self.config))
+            self.assertIn("similar", screen_password("bobbytables99", "someone", "bobbytables@test.com", self.config))
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            screen_password("a-reasonable passphrase", "alice", "alice@test.com", self.config)
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
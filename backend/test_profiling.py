@@ -0,0 +1,63 @@
+import unittest
+import time
+
+from backend.configuration_classes_for_flask import TestConfig
+from backend.profiling import profiler
+from backend.testing import AppTestCase
+
+
+class ProfilingTestConfig(TestConfig):
+    SLOW_REQUEST_THRESHOLD_MS = 0.001  # every request counts as slow
+
+
+class ProfilingTestCase(AppTestCase):
+    config_class = ProfilingTestConfig
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {
+            "profadmin": self.auth_headers("profadmin", is_admin=True),
+            "profuser": self.auth_headers("profuser"),
+        }
+
+    def test_profiler_is_admin_only_and_returns_collapsed_stacks(self):
+        response = self.client.post('/admin/profile', headers=self.headers["profuser"], json={"seconds": 0.1})
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post('/admin/profile', headers=self.headers["profadmin"],
+                                    json={"seconds": 0.2, "interval_ms": 2})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.post('/admin/profile', headers=self.headers["profadmin"],
+                                          json={"seconds": 0.2}).status_code, 409)
+        profiler._thread.join()
+
+        response = self.client.get('/admin/profile', headers=self.headers["profadmin"])
+        self.assertEqual(response.status_code, 200)
+        lines = response.get_data(as_text=True).strip().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(";", stack)
+
+        response = self.client.get('/admin/profile?format=json', headers=self.headers["profadmin"])
+        self.assertGreater(response.get_json()["samples"], 0)
+        response = self.client.get('/admin/profile?format=json&top=1', headers=self.headers["profadmin"])
+        self.assertEqual(len(response.get_json()["stacks"]), 1)
+        for top, status in (("0", 400), ("-3", 400), ("abc", 200)):  # not a number: the default
+            response = self.client.get(f'/admin/profile?format=json&top={top}', headers=self.headers["profadmin"])
+            self.assertEqual(response.status_code, status)
+
+    def test_slow_requests_keep_sql_statements(self):
+        self.client.get('/auth/me', headers=self.headers["profuser"])
+        time.sleep(0.05)
+
+        self.assertEqual(self.client.get('/admin/slow-requests', headers=self.headers["profuser"]).status_code, 403)
+        body = self.client.get('/admin/slow-requests', headers=self.headers["profadmin"]).get_json()
+        self.assertTrue(body["enabled"])
+        me = [r for r in body["requests"] if r["path"] == "/auth/me"]
+        self.assertTrue(me)
+        self.assertTrue(any("FROM users" in q["statement"] for q in me[0]["sql"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
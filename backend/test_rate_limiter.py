@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from backend.rate_limiter import BucketTable, parse_limit
+from backend.testing import AppTestCase
+
+
+def _drain(path, key, n):
+    table = BucketTable(path, slots=64)
+    for _ in range(n):
+        table.take(key, 5, 1.0, now=1000.0)
+
+
+class RateLimiterTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "ratelimit")
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmp_dir.cleanup()
+
+    def test_token_bucket_refills_and_is_shared_between_processes(self):
+        self.assertEqual(parse_limit("30/minute"), (30, 0.5))
+        table = BucketTable(self.path, slots=64)
+        self.assertEqual(table.take("a", 2, 1.0, now=0.0), 0)
+        self.assertEqual(table.take("a", 2, 1.0, now=0.0), 0)
+        self.assertAlmostEqual(table.take("a", 2, 1.0, now=0.0), 1.0)
+        self.assertEqual(table.take("b", 2, 1.0, now=0.0), 0)   # other keys have their own bucket
+        self.assertEqual(table.take("a", 2, 1.0, now=1.0), 0)   # one token refilled after a second
+
+        proc = multiprocessing.get_context("fork").Process(target=_drain, args=(self.path, "shared", 5))
+        proc.start()
+        proc.join()
+        self.assertGreater(table.take("shared", 5, 1.0, now=1000.0), 0)
+
+    def test_login_gets_429_over_the_limit(self):
+        self.app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_STATE_FILE=self.path,
+                               RATE_LIMITS={"login": "2/minute"})
+        statuses = [self.client.post('/auth/login', json={"identifier": "nobody", "password": "x"}).status_code
+                    for _ in range(3)]
+        self.assertEqual(statuses, [401, 401, 429])
+        response = self.client.post('/auth/login', json={"identifier": "nobody", "password": "x"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import base64
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from backend.externals import db
+from backend.models import ChainCursor, ModelRentalStats, Rental, UploaderRentalStats
+from backend.rental_analytics import (
+    MODEL_RENTED_DISCRIMINATOR, _MODEL_RENTED, rebuild_rental_stats, sync_chain_rentals,
+)
+from backend.solana_client import b58encode
+from backend.storage_gc import process_tombstones
+from backend.testing import AppTestCase
+
+
+class FakeRpc:
+    """ getSignaturesForAddress / getTransaction over a fixed list of program transactions (newest first) """
+
+    def __init__(self, transactions):
+        self.transactions = transactions    # [(signature, err, log messages)]
+        self.requests = []
+
+    def call(self, method, *params):
+        self.requests.append((method, params))
+        if method == "getSignaturesForAddress":
+            until = params[1].get("until")
+            page = []
+            for signature, err, _ in self.transactions:
+                if signature == until:
+                    break
+                page.append({"signature": signature, "err": err})
+            return page
+        if method == "getTransaction":
+            logs = next(logs for signature, _, logs in self.transactions if signature == params[0])
+            return {"meta": {"logMessages": logs}}
+        raise AssertionError(method)
+
+
+def rented_log(pda, renter, amount, timestamp):
+    data = MODEL_RENTED_DISCRIMINATOR + _MODEL_RENTED.pack(pda, renter, amount, timestamp)
+    return ["Program log: Instruction: RentModel", "Program data: " + base64.b64encode(data).decode()]
+
+
+class RentalAnalyticsTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config["LEADERBOARD_CACHE_SECONDS"] = 0
+        self.headers = {username: self.auth_headers(username) for username in ("author", "renter")}
+        self.pdas = {}
+        self.models = {name: self.upload(name, price) for name, price in (("popular", 500), ("pricey", 2000))}
+
+    def tearDown(self):
+        for model_id in self.models.values():
+            self.client.delete(f'/models/models/{model_id}', headers=self.headers["author"])
+        with self.app.app_context():
+            process_tombstones()
+        super().tearDown()
+
+    def upload(self, name, price):
+        pda = os.urandom(32)
+        with patch("backend.ai_model_api_endpoints.call_register_model",
+                   return_value={"txid": f"create-{name}", "model_pda": b58encode(pda)}):
+            response = self.client.post('/models/models/upload', headers=self.headers["author"], data={
+                "name": name, "price_lamports": str(price), "file": (io.BytesIO(os.urandom(1024)), f"{name}.bin")})
+        self.assertEqual(response.status_code, 201)
+        self.pdas[name] = pda
+        return response.get_json()["id"]
+
+    def rent(self, name, txid):
+        with patch("backend.ai_model_api_endpoints.call_rent_model", return_value=txid):
+            response = self.client.post(f'/models/models/{self.models[name]}/rent', headers=self.headers["renter"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_rentals_update_the_aggregates_and_the_leaderboard(self):
+        for i in range(3):
+            self.rent("popular", f"tx-popular-{i}")
+        self.rent("pricey", "tx-pricey-0")
+        self.rent("pricey", "tx-pricey-0")  # same transaction reported twice: one rental
+
+        stats = self.client.get(f'/models/models/{self.models["popular"]}/stats').get_json()
+        self.assertEqual((stats["rentals"], stats["lamports_earned"]), (3, 1500))
+        self.assertIsNotNone(stats["last_rented_at"])
+
+        board = self.client.get('/models/models/leaderboard').get_json()["items"]
+        self.assertEqual([(b["rank"], b["name"], b["rentals"]) for b in board], [(1, "popular", 3), (2, "pricey", 1)])
+        board = self.client.get('/models/models/leaderboard?by=lamports&limit=1').get_json()["items"]
+        self.assertEqual([(b["name"], b["lamports_earned"]) for b in board], [("pricey", 2000)])
+        self.assertEqual(self.client.get('/models/models/leaderboard?by=views').status_code, 400)
+
+        earnings = self.client.get('/models/models/earnings', headers=self.headers["author"]).get_json()
+        self.assertEqual((earnings["rentals"], earnings["lamports_earned"]), (4, 3500))
+
+        # a deleted model leaves the leaderboard; what its uploader earned stays
+        self.client.delete(f'/models/models/{self.models["popular"]}', headers=self.headers["author"])
+        board = self.client.get('/models/models/leaderboard').get_json()["items"]
+        self.assertEqual([b["name"] for b in board], ["pricey"])
+        earnings = self.client.get('/models/models/earnings', headers=self.headers["author"]).get_json()
+        self.assertEqual(earnings["rentals"], 4)
+
+        with self.app.app_context():
+            incremental = sorted((s.model_id, s.rentals, s.lamports) for s in ModelRentalStats.query)
+            self.assertEqual(rebuild_rental_stats(), (1, 1))
+            self.assertEqual(sorted((s.model_id, s.rentals, s.lamports) for s in ModelRentalStats.query), incremental)
+            self.assertEqual(db.session.get(UploaderRentalStats, earnings["uploader_id"]).rentals, 4)
+
+    def test_chain_sync_records_rentals_made_outside_the_api(self):
+        self.rent("pricey", "sig-api")
+        wallet = os.urandom(32)
+        rpc = FakeRpc([
+            ("sig-direct", None, rented_log(self.pdas["popular"], wallet, 500, 1_700_000_100)),
+            ("sig-foreign", None, rented_log(os.urandom(32), wallet, 9, 1_700_000_090)),   # not one of our models
+            ("sig-failed", {"InstructionError": [0, "Custom"]}, []),
+            ("sig-api", None, rented_log(self.pdas["pricey"], wallet, 2000, 1_700_000_050)),  # already recorded
+            ("sig-create", None, ["Program log: Instruction: CreateModel"]),
+        ])
+        with self.app.app_context():
+            self.assertEqual(sync_chain_rentals(self.app.config, rpc=rpc, program_id=os.urandom(32)), 1)
+            rental = Rental.query.filter_by(txid="sig-direct").one()
+            self.assertEqual((rental.model_id, rental.source, rental.renter_wallet, rental.renter_id),
+                             (self.models["popular"], "chain", b58encode(wallet), None))
+            self.assertEqual(Rental.query.count(), 2)
+            self.assertEqual(db.session.get(ChainCursor, "rentals").signature, "sig-direct")
+            self.assertNotIn("sig-failed", [p[0] for m, p in rpc.requests if m == "getTransaction"])
+
+            # the next pass only asks for what is newer than the cursor
+            rpc.requests.clear()
+            self.assertEqual(sync_chain_rentals(self.app.config, rpc=rpc, program_id=os.urandom(32)), 0)
+            self.assertEqual(rpc.requests[0][1][1]["until"], "sig-direct")
+            self.assertEqual([m for m, _ in rpc.requests], ["getSignaturesForAddress"])
+
+        stats = self.client.get(f'/models/models/{self.models["popular"]}/stats').get_json()
+        self.assertEqual((stats["rentals"], stats["lamports_earned"]), (1, 500))
+
+
+if __name__ == '__main__':
+    unittest.main()
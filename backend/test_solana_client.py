@@ -0,0 +1,245 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from backend import solana_client
+from backend.configuration_classes_for_flask import TestConfig
+from backend.storage_gc import process_tombstones
+from backend.testing import AppTestCase
+from backend.solana_client import (
+    SYSTEM_PROGRAM_ID,
+    b58decode,
+    b58encode,
+    compact_u16,
+    find_program_address,
+    is_on_curve,
+)
+
+BLOCKHASH = b58encode(hashlib.sha256(b"recorded blockhash").digest())
+PROGRAM_ID = b58decode(solana_client.DEFAULT_PROGRAM_ID)
+
+
+class RecordedRpc:
+    """ JSON-RPC stand-in replaying validator-shaped responses and recording what was sent """
+
+    def __init__(self):
+        self.requests = []
+        self.transactions = []
+        self.accounts = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                body = json.dumps({"jsonrpc": "2.0", "id": payload["id"], **server.reply(payload)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reply(self, payload):
+        method, params = payload["method"], payload["params"]
+        self.requests.append(method)
+        if method == "getLatestBlockhash":
+            return {"result": {"context": {"slot": 1}, "value": {"blockhash": BLOCKHASH, "lastValidBlockHeight": 100}}}
+        if method == "getAccountInfo":
+            data = self.accounts.get(params[0])
+            value = data and {"data": [base64.b64encode(data).decode(), "base64"], "executable": False,
+                              "lamports": 1, "owner": solana_client.DEFAULT_PROGRAM_ID, "rentEpoch": 0}
+            return {"result": {"context": {"slot": 1}, "value": value}}
+        if method == "sendTransaction":
+            raw = base64.b64decode(params[0])
+            self.transactions.append(raw)
+            return {"result": b58encode(raw[1:65])}
+        if method == "getSignatureStatuses":
+            return {"result": {"context": {"slot": 2}, "value": [
+                {"slot": 2, "confirmations": 1, "err": None, "confirmationStatus": "confirmed"}]}}
+        return {"error": {"code": -32601, "message": "Method not found"}}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_transaction(raw):
+    """ (signatures, header, account keys, blockhash, [(program index, account indexes, data)], message) """
+    assert raw[0] < 0x80
+    signatures = [raw[1 + 64 * i:65 + 64 * i] for i in range(raw[0])]
+    message = raw[1 + 64 * raw[0]:]
+    header, n_keys = message[:3], message[3]
+    keys = [message[4 + 32 * i:36 + 32 * i] for i in range(n_keys)]
+    pos = 4 + 32 * n_keys
+    blockhash = message[pos:pos + 32]
+    pos += 32
+    n_instructions, pos = message[pos], pos + 1
+    instructions = []
+    for _ in range(n_instructions):
+        program, n_accounts = message[pos], message[pos + 1]
+        accounts = list(message[pos + 2:pos + 2 + n_accounts])
+        pos += 2 + n_accounts
+        data_len, pos = message[pos], pos + 1
+        if data_len & 0x80:
+            data_len, pos = (data_len & 0x7F) | (message[pos] << 7), pos + 1
+        instructions.append((program, accounts, message[pos:pos + data_len]))
+        pos += data_len
+    return signatures, header, keys, blockhash, instructions, message
+
+
+class SolanaClientTestCase(AppTestCase):
+    def setUp(self):
+        self.rpc = RecordedRpc()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.key = Ed25519PrivateKey.generate()
+        self.public_key = self.key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+        secret = self.key.private_bytes_raw() + self.public_key
+        self.wallet = os.path.join(self.tmp_dir.name, "id.json")
+        with open(self.wallet, "w") as f:
+            json.dump(list(secret), f)
+
+        class ChainConfig(TestConfig):
+            CHAIN_CLIENT = "python"
+            SOLANA_RPC_URL = self.rpc.url
+            SOLANA_PROGRAM_ID = None
+            SOLANA_IDL_PATH = os.path.join(self.tmp_dir.name, "missing-idl.json")
+            SOLANA_WALLET_PATH = self.wallet
+
+        self.config_class = ChainConfig
+        super().setUp()
+
+    def tearDown(self):
+        with self.app.app_context():
+            process_tombstones()  # blobs of the rows the test deleted
+        super().tearDown()
+        self.rpc.close()
+        self.tmp_dir.cleanup()
+
+    def test_encoding_and_pda(self):
+        self.assertEqual(b58encode(bytes(32)), "11111111111111111111111111111111")
+        self.assertEqual(b58decode(solana_client.DEFAULT_PROGRAM_ID).hex(), PROGRAM_ID.hex())
+        self.assertEqual(b58decode(b58encode(b"\0\0abc")), b"\0\0abc")
+        self.assertEqual(compact_u16(127), b"\x7f")
+        self.assertEqual(compact_u16(300), b"\xac\x02")
+        self.assertTrue(is_on_curve(self.public_key))
+
+        pda, bump = find_program_address([b"model", bytes(range(32))], PROGRAM_ID)
+        self.assertFalse(is_on_curve(pda))
+        for higher in range(bump + 1, 256):  # every higher bump lands on the curve
+            digest = hashlib.sha256(b"model" + bytes(range(32)) + bytes([higher]) + PROGRAM_ID
+                                    + b"ProgramDerivedAddress").digest()
+            self.assertTrue(is_on_curve(digest))
+
+    def test_register_and_rent_in_process(self):
+        headers = self.auth_headers("chain")
+        response = self.client.post('/models/models/upload', headers=headers, data={
+            "name": "onchain", "price_lamports": "1500", "file": (io.BytesIO(os.urandom(4096)), "onchain.bin")})
+        self.assertEqual(response.status_code, 201)
+        model = response.get_json()
+        self.assertEqual(model["status"], "registered")
+
+        signatures, header, keys, blockhash, instructions, message = parse_transaction(self.rpc.transactions[0])
+        self.assertEqual(blockhash, b58decode(BLOCKHASH))
+        self.assertEqual(keys[0], self.public_key)                 # fee payer / uploader
+        self.assertEqual(bytes(header), bytes([1, 0, 2]))          # 1 signer; system program + program read-only
+        Ed25519PublicKey.from_public_bytes(self.public_key).verify(signatures[0], message)
+        program, accounts, data = instructions[0]
+        self.assertEqual(keys[program], PROGRAM_ID)
+        self.assertEqual(data[:8], hashlib.sha256(b"global:create_model").digest()[:8])
+        onchain_hash = data[8:40]
+        pda = keys[accounts[0]]
+        self.assertEqual(b58encode(pda), model["model_pda"])
+        self.assertEqual(pda, find_program_address([b"model", onchain_hash], PROGRAM_ID)[0])
+        self.assertEqual([keys[i] for i in accounts[1:]], [self.public_key, SYSTEM_PROGRAM_ID])
+        self.assertEqual(data[40:72].hex(), model["merkle_root"])
+        uri = model["storage_uri"].encode()
+        self.assertEqual(data[72:76 + len(uri)], struct.pack("<I", len(uri)) + uri)
+        self.assertEqual(struct.unpack("<Q", data[76 + len(uri):]), (1500,))
+
+        # the validator now has the account: discriminator + uploader + model_hash + ...
+        uploader = Ed25519PrivateKey.generate().public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+        self.rpc.accounts[model["model_pda"]] = (hashlib.sha256(b"account:ModelAccount").digest()[:8]
+                                                 + uploader + onchain_hash + bytes(32) + b"\x01")
+        response = self.client.post(f'/models/models/{model["id"]}/rent', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        signatures, header, keys, blockhash, instructions, message = parse_transaction(self.rpc.transactions[1])
+        self.assertEqual(response.get_json()["txid"], b58encode(signatures[0]))
+        program, accounts, data = instructions[0]
+        self.assertEqual(data, hashlib.sha256(b"global:rent_model").digest()[:8] + onchain_hash)
+        self.assertEqual([keys[i] for i in accounts], [pda, self.public_key, uploader, SYSTEM_PROGRAM_ID])
+
+        # one blockhash fetch for both transactions (cached), no process spawned
+        self.assertEqual(self.rpc.requests.count("getLatestBlockhash"), 1)
+        self.client.delete(f'/models/models/{model["id"]}', headers=headers)
+
+    def test_wallet_paths_from_the_request_are_ignored(self):
+        # the server only ever signs with its own SOLANA_WALLET_PATH
+        other = os.path.join(self.tmp_dir.name, "other.json")
+        other_key = Ed25519PrivateKey.generate()
+        with open(other, "w") as f:
+            json.dump(list(other_key.private_bytes_raw() + other_key.public_key().public_bytes(
+                Encoding.Raw, PublicFormat.Raw)), f)
+        headers = self.auth_headers("chain")
+        response = self.client.post('/models/models/upload', headers=headers, data={
+            "name": "mine", "uploader_wallet_path": other,
+            "file": (io.BytesIO(os.urandom(4096)), "mine.bin")})
+        self.assertEqual(response.status_code, 201)
+        model = response.get_json()
+        self.assertEqual(model["status"], "registered")
+        _, _, keys, _, instructions, _ = parse_transaction(self.rpc.transactions[0])
+        self.assertEqual(keys[0], self.public_key)
+
+        onchain_hash = instructions[0][2][8:40]
+        self.rpc.accounts[model["model_pda"]] = (hashlib.sha256(b"account:ModelAccount").digest()[:8]
+                                                 + self.public_key + onchain_hash + bytes(32) + b"\x01")
+        response = self.client.post(f'/models/models/{model["id"]}/rent', headers=headers,
+                                    data={"renter_wallet_path": "/nonexistent/id.json"})
+        self.assertEqual(response.status_code, 200)
+        _, _, keys, _, _, _ = parse_transaction(self.rpc.transactions[1])
+        self.assertEqual(keys[0], self.public_key)
+        self.client.delete(f'/models/models/{model["id"]}', headers=headers)
+
+    def test_batch_upload_groups_registrations(self):
+        headers = self.auth_headers("batch")
+        blobs = [os.urandom(2048 + i) for i in range(7)]
+        files = [(io.BytesIO(b), f"epoch{i}.bin") for i, b in enumerate(blobs)] + [(io.BytesIO(b"x"), "epoch0.bin")]
+        response = self.client.post('/models/models/upload-batch', headers=headers,
+                                    data={"files": files, "price_lamports": "10"})
+        self.assertEqual(response.status_code, 201)
+        items = response.get_json()["items"]
+        self.assertEqual([item["name"] for item in items], [f"epoch{i}" for i in range(7)] + ["epoch0"])
+        self.assertEqual(items[-1]["error"], "Duplicate file name in batch")
+        self.assertTrue(all(item["status"] == "registered" for item in items[:7]))
+        self.assertEqual([item["model_hash"] for item in items[:7]], [hashlib.sha256(b).hexdigest() for b in blobs])
+
+        # 7 create_model instructions packed into 2 transactions, each within the packet size
+        self.assertEqual(len(self.rpc.transactions), 2)
+        self.assertTrue(all(len(raw) <= solana_client.MAX_TRANSACTION_SIZE for raw in self.rpc.transactions))
+        pdas = [keys[ix[1][0]] for raw in self.rpc.transactions
+                for _, _, keys, _, instructions, _ in [parse_transaction(raw)] for ix in instructions]
+        self.assertEqual([b58encode(p) for p in pdas], [item["model_pda"] for item in items[:7]])
+        me = self.client.get('/auth/me', headers=headers).get_json()
+        self.assertEqual(me["storage_used_bytes"], sum(len(b) for b in blobs))
+
+        for item in items[:7]:
+            self.client.delete(f'/models/models/{item["id"]}', headers=headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from backend.testing import AppTestCase
+from backend.utils import storage_backends
+from backend.utils.storage_backends import LocalBackend, S3Backend
+
+HAS_MOTO = importlib.util.find_spec("moto") is not None
+
+
+class LocalBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.backend = LocalBackend(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_put_get_stat_delete(self):
+        uri = self.backend.put_stream("databases/a.bin", io.BytesIO(b"0123456789"))
+        self.assertEqual(uri, "file://" + os.path.join(self.root, "databases", "a.bin"))
+        self.assertEqual(self.backend.get_range(uri, 2, 3), b"234")
+        self.assertEqual(self.backend.get_range(uri, 7), b"789")
+        self.assertEqual(self.backend.stat(uri).size, 10)
+
+        self.backend.delete(uri)
+        self.assertIsNone(self.backend.stat(uri))
+
+
+@unittest.skipUnless(HAS_MOTO, "moto not installed")
+class S3BackendTestCase(unittest.TestCase):
+    def setUp(self):
+        from moto import mock_aws
+        self.mock = mock_aws()
+        self.mock.start()
+        self.env = patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"})
+        self.env.start()
+        self.backend = S3Backend("artifacts", prefix="solana", region_name="us-east-1",
+                                 part_size=5 * 1024 * 1024, max_concurrency=3)
+        self.backend.client.create_bucket(Bucket="artifacts")
+
+    def tearDown(self):
+        self.env.stop()
+        self.mock.stop()
+
+    def test_multipart_upload_and_ranged_get(self):
+        data = os.urandom(12 * 1024 * 1024 + 123)  # 3 parts
+        with patch.object(self.backend.client, "upload_part", wraps=self.backend.client.upload_part) as upload_part:
+            uri = self.backend.put_stream("models/big.bin", io.BytesIO(data))
+        self.assertEqual(upload_part.call_count, 3)
+        self.assertEqual(uri, "s3://artifacts/solana/models/big.bin")
+
+        self.assertEqual(self.backend.stat(uri).size, len(data))
+        self.assertEqual(self.backend.get_range(uri, 6 * 1024 * 1024, 100), data[6 * 1024 * 1024:6 * 1024 * 1024 + 100])
+        with self.backend.open(uri) as f:
+            f.seek(-50, os.SEEK_END)
+            self.assertEqual(f.read(), data[-50:])
+
+        self.backend.delete(uri)
+        self.assertIsNone(self.backend.stat(uri))
+
+    def test_small_object_single_put(self):
+        uri = self.backend.put_stream("databases/small.csv", io.BytesIO(b"a,b\n1,2\n"))
+        self.assertEqual(self.backend.get_range(uri), b"a,b\n1,2\n")
+
+    def test_open_uri_routes_by_scheme(self):
+        uri = self.backend.put_stream("databases/x.txt", io.BytesIO(b"hello"))
+        with patch.dict(storage_backends._backends, clear=True), \
+                patch.object(storage_backends, "_s3_backend", return_value=self.backend):
+            with storage_backends.open_uri(uri) as f:
+                self.assertEqual(f.read(), b"hello")
+
+
+@unittest.skipUnless(HAS_MOTO, "moto not installed")
+class S3UploadAPITestCase(AppTestCase):
+    def setUp(self):
+        from moto import mock_aws
+        self.mock = mock_aws()
+        self.mock.start()
+        self.env = patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"})
+        self.env.start()
+        storage_backends._backends.clear()
+
+        super().setUp()
+        self.app.config.update(STORAGE_BACKEND="s3", S3_BUCKET="datasets", S3_REGION="us-east-1")
+        with self.app.app_context():
+            storage_backends.default_backend().client.create_bucket(Bucket="datasets")
+
+    def tearDown(self):
+        super().tearDown()
+        storage_backends._backends.clear()
+        self.env.stop()
+        self.mock.stop()
+
+    def test_upload_preview_delete_on_s3(self):
+        headers = self.auth_headers("s3user")
+
+        csv_body = "id,value\n" + "".join(f"{i},v{i}\n" for i in range(500))
+        response = self.client.post('/databases/databases/upload', headers=headers, data={
+            "name": "remote", "purpose": "training",
+            "file": (io.BytesIO(csv_body.encode()), "remote.csv")})
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertEqual(data["storage_uri"], "s3://datasets/databases/remote.csv")
+
+        preview = self.client.get(f'/databases/databases/{data["id"]}/preview?rows=2').get_json()
+        self.assertEqual(preview["rows"], [["0", "v0"], ["1", "v1"]])
+
+        self.assertEqual(self.client.delete(f'/databases/databases/{data["id"]}', headers=headers).status_code, 200)
+        with self.app.app_context():
+            from backend.storage_gc import process_tombstones
+            process_tombstones()
+            self.assertIsNone(storage_backends.stat_uri(data["storage_uri"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
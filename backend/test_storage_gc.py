@@ -0,0 +1,175 @@
+import io
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from backend.constants import CHUNK_STORE_FOLDER, UPLOAD_FOLDER
+from backend.externals import db
+from backend.models import AIDatabase, ModelChunk, StorageTombstone
+from backend.storage_gc import process_tombstones, sweep, tombstone_rows
+from backend.testing import AppTestCase
+from backend.utils.chunk_store import ChunkStore
+from backend.utils.storage_backends import local_path, open_uri
+
+
+class StorageGCTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = {username: self.auth_headers(username) for username in ("gcowner", "gcother")}
+
+    def tearDown(self):
+        with self.app.app_context():
+            tombstone_rows(AIDatabase, [db_id for db_id, in db.session.query(AIDatabase.id)])
+            db.session.commit()
+            process_tombstones()
+        super().tearDown()
+
+    def upload(self, name, username="gcowner"):
+        response = self.client.post('/databases/databases/upload', headers=self.headers[username], data={
+            "name": name, "purpose": "training",
+            "file": (io.BytesIO(f"id,value\n1,{name}\n".encode()), f"{name}.csv")})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def usage(self, username="gcowner"):
+        return self.client.get('/auth/me', headers=self.headers[username]).get_json()["storage_used_bytes"]
+
+    def test_delete_queues_blob_and_gc_retries(self):
+        data = self.upload("queued")
+        path = local_path(data["storage_uri"])
+        self.assertEqual(self.client.delete(f'/databases/databases/{data["id"]}',
+                                            headers=self.headers["gcowner"]).status_code, 200)
+        # row and usage are gone right away, the file waits for the GC
+        self.assertEqual(self.usage(), 0)
+        self.assertTrue(os.path.exists(path))
+
+        with self.app.app_context():
+            with patch("backend.storage_gc.delete_uri", side_effect=OSError("disk busy")):
+                self.assertEqual(process_tombstones()["collected"], 0)
+            tombstone = StorageTombstone.query.one()
+            self.assertEqual((tombstone.attempts, tombstone.last_error), (1, "disk busy"))
+            self.assertTrue(os.path.exists(path))
+
+            self.assertEqual(process_tombstones(), {"collected": 1, "failed": []})
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(StorageTombstone.query.count(), 0)
+
+    def test_reupload_under_a_deleted_name_keeps_its_file(self):
+        data = self.upload("reused")
+        path = local_path(data["storage_uri"])
+        self.client.delete(f'/databases/databases/{data["id"]}', headers=self.headers["gcowner"])
+        # the same name uploaded again: file written, row not committed yet when the GC runs
+        with open(path, "w") as f:
+            f.write("id,value\n1,again\n")
+        later = time.time() + 1
+        os.utime(path, (later, later))
+
+        with self.app.app_context():
+            self.assertEqual(process_tombstones(), {"collected": 1, "failed": []})
+            self.assertEqual(StorageTombstone.query.count(), 0)
+        self.assertTrue(os.path.exists(path))
+        for leftover in (path, path + ".rowidx"):
+            os.remove(leftover)
+
+    def test_sweep_removes_only_old_unreferenced_files(self):
+        kept = self.upload("kept")
+        orphan = os.path.join(UPLOAD_FOLDER, "databases", "gc-orphan.csv")
+        fresh = os.path.join(UPLOAD_FOLDER, "databases", "gc-fresh.csv")
+        for path in (orphan, orphan + ".rowidx", fresh):
+            with open(path, "w") as f:
+                f.write("id\n1\n")
+        old = time.time() - 7200
+        for path in (orphan, orphan + ".rowidx", local_path(kept["storage_uri"])):
+            os.utime(path, (old, old))
+
+        with self.app.app_context():
+            removed = sweep()
+        self.assertEqual(sorted(removed), [orphan, orphan + ".rowidx"])
+        self.assertTrue(os.path.exists(local_path(kept["storage_uri"])))
+        self.assertTrue(os.path.exists(fresh))
+        os.remove(fresh)
+
+    def test_bulk_delete_by_ids_and_filter(self):
+        mine = [self.upload(f"mine{i}")["id"] for i in range(3)]
+        theirs = self.upload("theirs", username="gcother")["id"]
+        owner = self.headers["gcowner"]
+
+        # someone else's row in the list: 403 and nothing is deleted
+        response = self.client.post('/databases/databases/bulk-delete', headers=owner, json={"ids": mine + [theirs]})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.get_json()["ids"], [theirs])
+        self.assertEqual(len(self.client.get('/databases/databases').get_json()), 4)
+
+        response = self.client.post('/databases/databases/bulk-delete', headers=owner, json={"ids": mine[:2] + [9999]})
+        self.assertEqual(response.get_json(), {"deleted": mine[:2], "missing": [9999]})
+
+        # a filter only ever matches the caller's own rows
+        self.assertEqual(self.client.post('/databases/databases/bulk-delete', headers=owner,
+                                          json={"filter": {"nope": 1}}).status_code, 400)
+        owner_id = self.client.get('/auth/me', headers=owner).get_json()["id"]
+        for other_owner, status in (("abc", 400), (owner_id + 1, 403)):
+            self.assertEqual(self.client.post('/databases/databases/bulk-delete', headers=owner, json={
+                "filter": {"purpose": "training", "owner_id": other_owner}}).status_code, status)
+        response = self.client.post('/databases/databases/bulk-delete', headers=owner,
+                                    json={"filter": {"purpose": "training", "owner_id": str(owner_id)}})
+        self.assertEqual(response.get_json(), {"deleted": [mine[2]], "missing": []})
+        self.assertEqual(self.usage(), 0)
+        self.assertGreater(self.usage("gcother"), 0)
+
+        self.app.config["BULK_DELETE_MAX_ROWS"] = 0
+        response = self.client.post('/databases/databases/bulk-delete', headers=self.headers["gcother"],
+                                    json={"filter": {"purpose": "training"}})
+        self.assertEqual(response.status_code, 400)
+
+        with self.app.app_context():
+            self.assertEqual(StorageTombstone.query.count(), 3)
+            self.assertEqual(process_tombstones()["collected"], 3)
+
+    def test_chunks_found_by_an_upload_in_flight_survive_the_gc(self):
+        self.app.config.update(MODEL_DEDUP=True, CDC_MIN_SIZE=4 * 1024, CDC_AVG_SIZE=16 * 1024, CDC_MAX_SIZE=64 * 1024)
+        blob = os.urandom(256 * 1024)
+        store = ChunkStore(CHUNK_STORE_FOLDER)
+        acquire = ModelChunk.acquire
+
+        def upload_model(name, gc=None):
+            """ Upload `blob`; `gc` runs after the chunks were stored, before their references are taken """
+            def racing_acquire(chunks):
+                if gc:
+                    gc()
+                acquire(chunks)
+            with patch("backend.ai_model_api_endpoints.call_register_model",
+                       return_value={"txid": "tx", "model_pda": "pda"}), \
+                    patch.object(ModelChunk, "acquire", staticmethod(racing_acquire)):
+                response = self.client.post('/models/models/upload', headers=self.headers["gcowner"], data={
+                    "name": name, "file": (io.BytesIO(blob), f"{name}.bin")})
+            self.assertEqual(response.status_code, 201)
+            data = response.get_json()
+            with open_uri(data["storage_uri"]) as f:
+                self.assertEqual(f.read(), blob)
+            return data
+
+        # the tombstone of an identical model releases the last references meanwhile
+        first = upload_model("first")
+        self.client.delete(f'/models/models/{first["id"]}', headers=self.headers["gcowner"])
+        second = upload_model("second", gc=process_tombstones)
+        self.assertEqual(second["storage_uri"], first["storage_uri"])
+
+        # orphaned chunks + manifest (no rows) older than the sweep grace period
+        self.client.delete(f'/models/models/{second["id"]}', headers=self.headers["gcowner"])
+        with self.app.app_context():
+            process_tombstones()
+        staged = os.path.join(UPLOAD_FOLDER, "models", "gc-orphan.bin")
+        with open(staged, "wb") as f:
+            f.write(blob)
+        manifest_hash, chunks, _ = store.ingest_file(staged, 4 * 1024, 16 * 1024, 64 * 1024)
+        os.remove(staged)
+        old = time.time() - 7200
+        for path in [store.chunk_path(h) for h, _ in chunks] + [store.manifest_path(manifest_hash)]:
+            os.utime(path, (old, old))
+        third = upload_model("third", gc=lambda: sweep(grace_seconds=3600))
+        self.client.delete(f'/models/models/{third["id"]}', headers=self.headers["gcowner"])
+
+
+if __name__ == '__main__':
+    unittest.main()
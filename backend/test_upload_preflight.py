@@ -0,0 +1,125 @@
+import hashlib
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from werkzeug.test import EnvironBuilder
+
+from backend.constants import UPLOAD_FOLDER
+from backend.models import AIDatabase
+from backend.storage_gc import process_tombstones
+from backend.testing import AppTestCase
+
+
+class CountingStream(io.BytesIO):
+    """ Request body that remembers how much of it the server read """
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.consumed += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        self.consumed += n
+        return n
+
+
+class UploadPreflightTestCase(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = self.auth_headers("uploader")
+
+    def tearDown(self):
+        with self.app.app_context():
+            for row in AIDatabase.query.all():
+                row.delete()
+            process_tombstones()
+        super().tearDown()
+
+    def post(self, path, fields):
+        """ POST `fields` as multipart; returns (response, body stream) """
+        environ = EnvironBuilder(method="POST", data=fields).get_environ()
+        body = CountingStream(environ["wsgi.input"].read())
+        response = self.client.post(path, headers=self.headers, input_stream=body,
+                                    content_type=environ["CONTENT_TYPE"], content_length=len(body.getvalue()))
+        return response, body
+
+    def test_bad_uploads_are_refused_from_the_head_of_the_body(self):
+        big = 8 * 1024 * 1024
+        limit = self.app.config["UPLOAD_PREFLIGHT_BYTES"]
+
+        response, body = self.post('/models/models/upload', {"name": "fake", "file": (io.BytesIO(b"MZ" * (big // 2)), "fake.pt")})
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(response.get_json()["message"], "File content does not match its .pt extension")
+        self.assertLessEqual(body.consumed, limit)
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_FOLDER, "models", "fake.pt")))
+
+        response, body = self.post('/models/models/upload', {"name": "tool", "file": (io.BytesIO(os.urandom(big)), "tool.exe")})
+        self.assertEqual(response.status_code, 415)
+        self.assertIn("Unsupported file type .exe", response.get_json()["message"])
+        self.assertLessEqual(body.consumed, limit)
+
+        response, body = self.post('/databases/databases/upload', {"name": "rows", "file": (io.BytesIO(b"a,b\n" * (big // 4)), "rows.csv")})
+        self.assertEqual((response.status_code, response.get_json()["message"]), (400, "Missing purpose"))
+        self.assertLessEqual(body.consumed, limit)
+
+        response, body = self.post('/models/models/upload', {"name": "x", "price_lamports": "lots", "file": (io.BytesIO(b"x"), "x.bin")})
+        self.assertEqual((response.status_code, response.get_json()["message"]), (400, "price_lamports must be an integer"))
+
+        self.app.config["MAX_CONTENT_LENGTH"] = 1024 * 1024
+        response, body = self.post('/databases/databases/upload', {
+            "name": "rows", "purpose": "training", "file": (io.BytesIO(b"a,b\n" * (big // 4)), "rows.csv")})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(body.consumed, 0)
+
+    def test_accepted_uploads_see_the_whole_body(self):
+        # larger than the pre-flight window: the bytes read for the checks are replayed to the form parser
+        csv_body = ("id,value\n" + "".join(f"{i},v{i}\n" for i in range(100_000))).encode()
+        self.assertGreater(len(csv_body), self.app.config["UPLOAD_PREFLIGHT_BYTES"])
+        response, body = self.post('/databases/databases/upload', {
+            "name": "Rows", "purpose": "training", "file": (io.BytesIO(csv_body), "preflight-rows.csv")})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["data_hash"], hashlib.sha256(csv_body).hexdigest())
+        self.assertEqual(body.consumed, len(body.getvalue()))
+
+    def test_batch_files_are_checked_one_by_one(self):
+        blob = os.urandom(4096)
+        files = [(io.BytesIO(blob), "ok.bin"), (io.BytesIO(b"not a checkpoint"), "bad.pt")]
+        # the parts are streamed to disk by the endpoint, never spooled by the form parser
+        with patch("backend.ai_model_api_endpoints.call_register_models",
+                   return_value=[{"txid": "tx", "model_pda": "pda"}]), \
+                patch("werkzeug.formparser.FormDataParser.parse", side_effect=AssertionError("spooled")):
+            response, body = self.post('/models/models/upload-batch', {"files": files})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(body.consumed, len(body.getvalue()))
+        ok, bad = response.get_json()["items"]
+        self.assertEqual(ok["model_hash"], hashlib.sha256(blob).hexdigest())
+        self.assertEqual(bad["error"], "File content does not match its .pt extension")
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_FOLDER, "models", "bad.pt")))
+        self.client.delete(f'/models/models/{ok["id"]}', headers=self.headers)
+
+    def test_refused_batches_leave_no_staged_files(self):
+        staged = os.path.join(UPLOAD_FOLDER, "models", "batch0.bin")
+        blobs = [os.urandom(4096) for _ in range(3)]
+        self.app.config["MODEL_BATCH_MAX_FILES"] = 2
+        response, _ = self.post('/models/models/upload-batch', {
+            "files": [(io.BytesIO(b), f"batch{i}.bin") for i, b in enumerate(blobs)]})
+        self.assertEqual((response.status_code, response.get_json()["message"]), (400, "At most 2 files per batch"))
+        self.assertFalse(os.path.exists(staged))
+
+        self.app.config["MODEL_BATCH_MAX_FILES"] = 64
+        with patch("backend.ai_model_api_endpoints._ingest_model_file", side_effect=OSError("disk full")):
+            response, _ = self.post('/models/models/upload-batch', {"files": [(io.BytesIO(blobs[0]), "batch0.bin")]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["items"][0]["error"], "disk full")
+        self.assertFalse(os.path.exists(staged))
+
+
+if __name__ == '__main__':
+    unittest.main()
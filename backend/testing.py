@@ -0,0 +1,58 @@
+# backend/testing.py
+# Base of the API test cases: a fresh app + schema per test and the signup /
+# login helpers. Subclasses set `config_class` (or assign it in setUp before
+# calling super) and call super().tearDown() after their own cleanup.
+import unittest
+
+from backend.main import create_app
+from backend.configuration_classes_for_flask import TestConfig
+from backend.externals import db
+from backend.models import User
+
+TEST_PASSWORD = "password1234"
+
+
+class AppTestCase(unittest.TestCase):
+    config_class = TestConfig
+
+    def setUp(self):
+        self.app = create_app(self.config_class)
+        self.client = self.app.test_client(self)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def signup_and_login(self, username="testuser", email="testuser@test.com", password="password", is_admin=False):
+        # helper to register and login, returns access_token and user_id
+        signup_response = self.client.post('/auth/signup',
+            json={
+                "username": username,
+                "email": email,
+                "password": password
+            })
+        self.assertIn(signup_response.status_code, (200, 201))
+        if is_admin:
+            # before the login: the token carries the admin claim
+            with self.app.app_context():
+                User.query.filter_by(username=username).first().is_admin = True
+                db.session.commit()
+
+        login_response = self.client.post('/auth/login',
+            json={
+                "identifier": username,
+                "password": password
+            })
+        self.assertEqual(login_response.status_code, 200)
+        data = login_response.get_json()
+        access_token = data.get("access_token")
+        user_id = data.get("user_id")
+        return access_token, user_id
+
+    def auth_headers(self, username, is_admin=False):
+        """ Sign `username` up, log in, return the Authorization header """
+        token, _ = self.signup_and_login(username, f"{username}@test.com", TEST_PASSWORD, is_admin)
+        return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,171 @@
+# backend/upload_preflight.py
+# Pre-flight checks of the upload endpoints. They run after auth and the rate
+# limit and before the multipart body is parsed or spooled to disk: the
+# Content-Type, Content-Length against MAX_CONTENT_LENGTH, then, from the first
+# UPLOAD_PREFLIGHT_BYTES of the body only, the metadata fields sent ahead of the
+# file, the file extension and its magic bytes. A bad upload is refused after
+# one small read instead of a multi-GB transfer and disk write. The bytes read
+# are replayed, so the regular form parsing still sees the whole body.
+# Required fields are only checked early when the client sends metadata ahead
+# of the file (any field before the file part); otherwise the endpoint
+# validates them once the body is parsed, as before.
+import io
+from functools import wraps
+
+from flask import current_app, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from backend.utils.dataset_index import LINE_FORMATS
+
+DEFAULT_PREFLIGHT_BYTES = 256 * 1024
+MAGIC_BYTES = 512                       # enough for every signature below (tar: offset 257)
+_READ_SIZE = 16 * 1024
+
+_ZIP = (b"PK\x03\x04", b"PK\x05\x06")
+_PICKLE = tuple(bytes([0x80, protocol]) for protocol in range(2, 6))  # legacy (non-zip) torch.save
+
+
+def _torch(head):
+    return head.startswith(_ZIP + _PICKLE)
+
+
+def _text(head):
+    return b"\0" not in head
+
+
+# extension -> check of the first bytes; extensions without an entry are not inspected
+MODEL_SIGNATURES = {
+    "pt": _torch, "pth": _torch, "ptm": _torch,
+    "zip": lambda head: head.startswith(_ZIP),
+    "tar": lambda head: head[257:262] == b"ustar",
+    "onnx": lambda head: head[:1] == b"\x08",   # ModelProto starts with ir_version (field 1, varint)
+}
+DATABASE_SIGNATURES = {
+    "parquet": lambda head: head.startswith(b"PAR1"),
+    **{ext: _text for ext in LINE_FORMATS},
+}
+
+
+def file_error(filename, head, extensions=None, signatures=None):
+    """ Why `filename` starting with `head` is refused, None when it is acceptable """
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extensions is not None and ext not in extensions:
+        return f"Unsupported file type .{ext or '?'} (allowed: {', '.join(sorted(extensions))})"
+    check = (signatures or {}).get(ext)
+    if check is not None and not check(head):
+        return f"File content does not match its .{ext} extension"
+    return None
+
+
+class _Replay(io.RawIOBase):
+    """ `prefix`, then the rest of `stream` """
+
+    def __init__(self, prefix, stream):
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _peek(stream, boundary, file_fields, limit):
+    """
+    Parse the head of a multipart body: (fields before the file, file name,
+    first bytes of the file, raw bytes read). File name is None when no file
+    part started within `limit` bytes.
+    """
+    decoder = MultipartDecoder(boundary)
+    raw, total, finished = [], 0, False
+    fields, current, parts = {}, None, []
+    filename, head = None, b""
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            if finished or total >= limit:
+                break
+            chunk = stream.read(min(_READ_SIZE, limit - total))
+            raw.append(chunk)
+            total += len(chunk)
+            finished = not chunk
+            decoder.receive_data(chunk or None)
+        elif isinstance(event, Field):
+            current, parts = event.name, []
+        elif isinstance(event, File):
+            if event.name in file_fields:
+                filename, current = event.filename or "", None
+            else:
+                current = None  # some other file part: skip it
+        elif isinstance(event, Data):
+            if filename is not None:
+                head += event.data
+                if len(head) >= MAGIC_BYTES or not event.more_data:
+                    break
+            elif current is not None:
+                parts.append(event.data)
+                if not event.more_data:
+                    fields[current] = b"".join(parts).decode("utf-8", "replace")
+                    current = None
+        elif isinstance(event, Epilogue):
+            break
+    return fields, filename, head, b"".join(raw)
+
+
+def preflight(file_fields=("file",), required=(), integers=(), extensions=None, signatures=None):
+    """ Raise an HTTP error for an upload that can be refused before its body is read """
+    if request.mimetype != "multipart/form-data":
+        raise UnsupportedMediaType("Uploads must be multipart/form-data")
+    max_length = current_app.config.get("MAX_CONTENT_LENGTH")
+    if max_length is not None and (request.content_length or 0) > max_length:
+        raise RequestEntityTooLarge(f"Upload exceeds the {max_length} byte limit")
+    boundary = request.mimetype_params.get("boundary")
+    if not boundary:
+        raise BadRequest("Missing multipart boundary")
+
+    stream = request.stream  # bounded by Content-Length / MAX_CONTENT_LENGTH
+    limit = current_app.config.get("UPLOAD_PREFLIGHT_BYTES", DEFAULT_PREFLIGHT_BYTES)
+    try:
+        fields, filename, head, raw = _peek(stream, boundary.encode("latin-1"), file_fields, limit)
+    except ValueError:
+        raise BadRequest("Malformed multipart body") from None
+    request.stream = _Replay(raw, stream)
+
+    for name in integers:
+        if fields.get(name):
+            try:
+                int(fields[name])
+            except ValueError:
+                raise BadRequest(f"{name} must be an integer") from None
+    if filename is None:
+        return  # no file part within the first bytes: the endpoint reports what is missing
+    missing = [name for name in required if not fields.get(name)]
+    if missing and fields:
+        # the client sends its metadata ahead of the file, so what is missing is not coming
+        raise BadRequest(f"Missing {', '.join(missing)}")
+    error = file_error(filename, head, extensions, signatures)
+    if error:
+        raise UnsupportedMediaType(error)
+
+
+def upload_preflight(**checks):
+    """ Decorator for upload resources: preflight(**checks) before the method runs """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            preflight(**checks)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
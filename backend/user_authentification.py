@@ -1,13 +1,16 @@
 # backend/user_authentication.py
 import re
 from flask_restx import Resource, Namespace, fields
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import (JWTManager,
-create_access_token, create_refresh_token, jwt_required, get_jwt_identity,
-get_jwt_identity)
-from flask import request
+create_access_token, create_refresh_token, jwt_required, get_jwt_identity)
+from flask import current_app, request
+from backend.externals import db
 from backend.models import User
-from backend.strenght_of_a_password import validate_password
+from backend.password_hashing import HashingBusy, check_password, hash_password
+from backend.principal_cache import load_principal, principal_claims
+from backend.rate_limiter import rate_limited
+from backend.password_screening import screen_password
+from backend.storage_quota import usage
 
 auth_ns = Namespace('auth', description='A namespace for Authentication')
 
@@ -31,9 +34,10 @@ login_model = auth_ns.model(
 def verify_if_user_or_email_exists(identifier):
     return User.query.filter((User.username == identifier) | (User.email == identifier)).first() is not None
 
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 def verify_if_the_identifier_is_email(identifier):
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(regex, identifier) is not None
+    return EMAIL_REGEX.match(identifier) is not None
 
 def find_user_by_identifier(identifier):
     if verify_if_the_identifier_is_email(identifier):
@@ -44,6 +48,7 @@ def find_user_by_identifier(identifier):
 @auth_ns.route('/signup')
 class SignUp(Resource):
     @auth_ns.expect(signup_model)
+    @rate_limited("signup")
     def post(self):
         data = request.get_json() or {}
 
@@ -60,13 +65,19 @@ class SignUp(Resource):
         if verify_if_user_or_email_exists(email):
             return {"message": f"User with email {email} already exists."}, 409
 
-        if not validate_password(password):
-            return {"message": "Password does not meet the required criteria."}, 400
+        rejected = screen_password(password, username, email, current_app.config)
+        if rejected:
+            return {"message": rejected}, 400
+
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            return {"message": "Server busy, please retry."}, 503
 
         new_user = User(
             username=username,
             email=email,
-            password=generate_password_hash(password)
+            password=password_hash
         )
         new_user.save()
 
@@ -75,6 +86,7 @@ class SignUp(Resource):
 @auth_ns.route('/login')
 class Login(Resource):
     @auth_ns.expect(login_model)
+    @rate_limited("login")
     def post(self):
         data = request.get_json() or {}
         identifier = data.get('identifier')
@@ -84,15 +96,22 @@ class Login(Resource):
             return {"message": "identifier and password required"}, 400
 
         db_user = find_user_by_identifier(identifier)
-        print("DB user found:", db_user)
         if db_user:
-            print("Password hash:", db_user.password)
+            try:
+                ok, new_hash = check_password(db_user.password, password)
+            except HashingBusy:
+                return {"message": "Server busy, please retry."}, 503
         else:
-            print("User not found")
+            ok, new_hash = False, None
 
-        if db_user and check_password_hash(db_user.password, password):
+        if ok:
+            if new_hash:
+                # hashed with an older scheme / cost: upgrade while we have the plain password
+                db_user.password = new_hash
+                db.session.commit()
             # use user.id as identity for robustness
-            access_token = create_access_token(identity=str(db_user.id))
+            # uid / is_admin claims let protected endpoints authorize without loading the user
+            access_token = create_access_token(identity=str(db_user.id), additional_claims=principal_claims(db_user))
             refresh_token = create_refresh_token(identity=str(db_user.id))
             return {"access_token": access_token, "refresh_token": refresh_token, "user_id": db_user.id}, 200
 
@@ -103,20 +122,25 @@ class MeResource(Resource):
     @jwt_required()
     def get(self):
         identity = get_jwt_identity()
-        user = User.query.get(identity)
+        user = db.session.get(User, identity)
         if not user:
             return {"message": "User not found"}, 404
         return {
             "id": user.id,
             "username": user.username,
             "email": user.email,
-            "is_admin": user.is_admin
+            "is_admin": user.is_admin,
+            # counters maintained on upload / delete: no scan over the user's uploads
+            **usage(user),
         }, 200
 
-auth_ns.route('/refresh')
+@auth_ns.route('/refresh')
 class RefreshResource(Resource):
     @jwt_required(refresh=True)
     def post(self):
         identity = get_jwt_identity()
-        new_access_token = create_access_token(identity=identity)
+        principal = load_principal(int(identity))
+        if principal is None:
+            return {"message": "User not found"}, 404
+        new_access_token = create_access_token(identity=identity, additional_claims=principal_claims(principal))
         return {"access_token": new_access_token}, 200
\ No newline at end of file
@@ -0,0 +1,70 @@
+# backend/utils/bloom_filter.py
+# Read-only Bloom filter stored in a file and memory-mapped, so every worker
+# shares the same page-cache pages (a 10M entry list at 0.1% false positives is
+# ~17 MiB). Lookups hash the item once (blake2b) and probe k bits.
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+MAGIC = b"BLM1"
+_HEADER = struct.Struct("<4sQIQ")   # magic, bits (m), hashes (k), items (n)
+
+
+def _probes(item, m, k):
+    digest = hashlib.blake2b(item, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    # double hashing: bit_i = h1 + i * h2 (mod m)
+    return ((h1 + i * h2) % m for i in range(k))
+
+
+def optimal_parameters(n, fp_rate):
+    """ (bits, hashes) for `n` items at false positive rate `fp_rate` """
+    n = max(n, 1)
+    m = math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))
+    m = (m + 7) // 8 * 8
+    k = max(1, round(m / n * math.log(2)))
+    return m, k
+
+
+def build_bloom_filter(items, path, n, fp_rate=0.001):
+    """ Write a filter holding the byte strings of `items` (at most `n` of them) to `path` """
+    m, k = optimal_parameters(n, fp_rate)
+    bits = bytearray(m // 8)
+    count = 0
+    for item in items:
+        for bit in _probes(item, m, k):
+            bits[bit >> 3] |= 1 << (bit & 7)
+        count += 1
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, m, k, count))
+        f.write(bits)
+    os.replace(tmp_path, path)
+    return count
+
+
+class BloomFilter:
+    """ `item in BloomFilter(path)`: False means definitely absent """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.bits, self.hashes, self.items = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or len(self._map) < _HEADER.size + self.bits // 8:
+            self.close()
+            raise ValueError(f"{path} is not a bloom filter file")
+
+    def __contains__(self, item):
+        data = self._map
+        base = _HEADER.size
+        for bit in _probes(item, self.bits, self.hashes):
+            if not data[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def close(self):
+        self._map.close()
+        self._file.close()
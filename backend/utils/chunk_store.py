@@ -0,0 +1,251 @@
+# backend/utils/chunk_store.py
+# Content-defined chunking (FastCDC style) + a content addressed chunk store
+# shared by all model artifacts. A stored artifact is a manifest of chunk
+# hashes, so versions of the same model only add the chunks that changed.
+import hashlib
+import io
+import json
+import os
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+CAS_SCHEME = "cas://"
+
+DEFAULT_MIN_SIZE = 256 * 1024
+DEFAULT_AVG_SIZE = 1024 * 1024
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024
+_READ_SIZE = 8 * 1024 * 1024
+_WINDOW_BITS = 5  # gear hash window = 2**5 = 32 bytes (one uint32 worth of shifts)
+
+# gear table derived from sha256 so chunk boundaries never change between versions / platforms
+_GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "little") for i in range(256)],
+    dtype=np.uint32,
+)
+
+
+def _gear_hashes(buf):
+    """
+    Rolling gear hash h[i] = sum(G[b[i-k]] << k, k < 32) for every position of `buf`.
+    Computed with log2(32) vectorized doubling steps instead of a per-byte loop:
+    S_2w(i) = S_w(i) + (S_w(i-w) << w).
+    """
+    h = _GEAR[np.frombuffer(buf, dtype=np.uint8)]
+    tmp = np.empty_like(h)
+    w = 1
+    for _ in range(_WINDOW_BITS):
+        # in place: tmp is computed from the previous level before h is updated
+        np.left_shift(h[:-w], np.uint32(w), out=tmp[w:])
+        h[w:] += tmp[w:]
+        w *= 2
+    return h
+
+
+def _mask(bits):
+    # high bits of the gear hash depend on the whole window
+    return np.uint32(((1 << bits) - 1) << (32 - bits))
+
+
+def _cut_points(buf, min_size, avg_size, max_size, final):
+    """ Offsets where chunks end inside `buf`; the tail after the last cut is left for the next read """
+    bits = max(avg_size.bit_length() - 1, 3)
+    hashes = _gear_hashes(buf)
+    loose = np.flatnonzero((hashes & _mask(bits - 2)) == 0)   # after avg size: easier to cut
+    # before avg size: harder to cut (the strict mask is a superset of the loose one)
+    strict = loose[(hashes[loose] & _mask(bits + 2)) == 0]
+
+    cuts = []
+    start = 0
+    n = len(buf)
+    while start < n:
+        if n - start <= min_size:
+            if final:
+                cuts.append(n)
+            break
+        end = None
+        i = np.searchsorted(strict, start + min_size)
+        if i < len(strict) and strict[i] < min(start + avg_size, n):
+            end = int(strict[i]) + 1
+        else:
+            j = np.searchsorted(loose, start + avg_size)
+            if j < len(loose) and loose[j] < min(start + max_size, n):
+                end = int(loose[j]) + 1
+            elif start + max_size <= n:
+                end = start + max_size
+        if end is None:
+            if final:
+                cuts.append(n)
+            break
+        cuts.append(end)
+        start = end
+    return cuts
+
+
+def iter_chunks(f, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE):
+    """ Yield content-defined chunks (bytes) read from the binary file object `f` """
+    buf = b""
+    while True:
+        data = f.read(_READ_SIZE)
+        final = not data
+        buf = buf + data if buf else data
+        if not buf:
+            return
+        start = 0
+        for end in _cut_points(buf, min_size, avg_size, max_size, final):
+            yield buf[start:end]
+            start = end
+        buf = buf[start:]
+        if final:
+            return
+
+
+class ChunkStore:
+    """ Chunks live under <root>/ab/cd/<sha256>, manifests under <root>/manifests/<sha256>.json """
+
+    def __init__(self, root):
+        self.root = root
+
+    def chunk_path(self, chunk_hash):
+        return os.path.join(self.root, chunk_hash[:2], chunk_hash[2:4], chunk_hash)
+
+    def manifest_path(self, manifest_hash):
+        return os.path.join(self.root, "manifests", manifest_hash + ".json")
+
+    def has_chunk(self, chunk_hash):
+        return os.path.exists(self.chunk_path(chunk_hash))
+
+    def put_chunk(self, data):
+        """ Store a chunk if it is new. Returns (hash, written_bytes) """
+        chunk_hash = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(chunk_hash)
+        try:
+            os.utime(path)  # already stored: the orphan sweep counts its grace period from now
+            return chunk_hash, 0
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+        return chunk_hash, len(data)
+
+    @staticmethod
+    def set_aside(path):
+        """ Move a chunk / manifest out of the store before deciding to delete it; returns its new path (None if gone) """
+        aside = f"{path}.{os.getpid()}.gc.tmp"
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:
+            return None
+        return aside
+
+    @staticmethod
+    def put_back(aside, path):
+        os.replace(aside, path)
+
+    def restore_missing(self, path, chunks):
+        """
+        Write back the manifest and the chunks of `path` ([(hash, size), ...] in file
+        order, as returned by ingest_file) that are not in the store anymore. Returns
+        how many chunks were written.
+        """
+        self.write_manifest(chunks)
+        restored = 0
+        offset = 0
+        with open(path, "rb") as f:
+            for chunk_hash, size in chunks:
+                if not self.has_chunk(chunk_hash):
+                    f.seek(offset)
+                    self.put_chunk(f.read(size))
+                    restored += 1
+                offset += size
+        return restored
+
+    def write_manifest(self, chunks):
+        """ `chunks` is [(hash, size), ...]; returns the manifest hash """
+        body = json.dumps(
+            {"version": 1, "size": sum(s for _, s in chunks), "chunks": [[h, s] for h, s in chunks]},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        manifest_hash = hashlib.sha256(body).hexdigest()
+        path = self.manifest_path(manifest_hash)
+        try:
+            os.utime(path)  # same artifact stored before: refresh it like put_chunk does
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(body)
+            os.replace(tmp_path, path)
+        return manifest_hash
+
+    def read_manifest(self, manifest_hash):
+        with open(self.manifest_path(manifest_hash), "rb") as f:
+            return json.load(f)
+
+    def ingest_file(self, path, min_size=DEFAULT_MIN_SIZE, avg_size=DEFAULT_AVG_SIZE, max_size=DEFAULT_MAX_SIZE):
+        """
+        Chunk `path` and write only the chunks the store does not have yet.
+        Returns (manifest_hash, [(hash, size), ...], new_bytes).
+        """
+        chunks = []
+        new_bytes = 0
+        with open(path, "rb") as f:
+            for data in iter_chunks(f, min_size, avg_size, max_size):
+                chunk_hash, written = self.put_chunk(data)
+                chunks.append((chunk_hash, len(data)))
+                new_bytes += written
+        return self.write_manifest(chunks), chunks, new_bytes
+
+    def open(self, manifest_hash):
+        """ Seekable, buffered reader over the artifact described by a manifest """
+        return io.BufferedReader(ManifestReader(self, self.read_manifest(manifest_hash)), buffer_size=64 * 1024)
+
+
+class ManifestReader(io.RawIOBase):
+    """ Reassembles an artifact from its chunks; ranged reads only open the chunks they touch """
+
+    def __init__(self, store, manifest):
+        super().__init__()
+        self._store = store
+        self._chunks = manifest["chunks"]
+        self._starts = []
+        total = 0
+        for _, size in self._chunks:
+            self._starts.append(total)
+            total += size
+        self._size = total
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b):
+        if self._pos >= self._size or not len(b):
+            return 0
+        i = bisect_right(self._starts, self._pos) - 1
+        chunk_hash, size = self._chunks[i]
+        start = self._pos - self._starts[i]
+        n = min(len(b), size - start)
+        with open(self._store.chunk_path(chunk_hash), "rb") as f:
+            f.seek(start)
+            n = f.readinto(memoryview(b)[:n])
+        self._pos += n
+        return n
@@ -0,0 +1,175 @@
+# backend/utils/compressed_blob.py
+"""
+Compressed storage tier for uploaded blobs.
+
+Blobs are written in the zstd "seekable" format: the content is cut into
+frames of MERKLE_CHUNK_SIZE uncompressed bytes, every frame is compressed
+independently and a seek table (skippable frame) is appended at the end.
+The file is still a valid .zst stream, but a ranged read only decompresses
+the frames that overlap the range. Hashes / merkle roots are always computed
+over the uncompressed bytes, so the frame boundaries match the merkle leaves.
+"""
+import io
+import os
+import struct
+from bisect import bisect_right
+
+from backend.constants import MERKLE_CHUNK_SIZE
+
+COMPRESSED_SUFFIX = ".blob.zst"  # distinct from plain .zst files users may upload
+
+_SKIPPABLE_MAGIC = 0x184D2A5E
+_SEEKABLE_MAGIC = 0x8F92EAB1
+_ENTRY = struct.Struct("<II")       # compressed size, decompressed size
+_FOOTER = struct.Struct("<IBI")     # number of frames, descriptor, seekable magic
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstandard is required for compressed storage")
+    return zstandard
+
+
+def is_compressed(path):
+    return path.endswith(COMPRESSED_SUFFIX)
+
+
+def logical_path(path):
+    """ Path of the blob without the compression suffix (used for sidecar files / format detection) """
+    return path[:-len(COMPRESSED_SUFFIX)] if is_compressed(path) else path
+
+
+def compress_file(src_path, dst_path, frame_size=MERKLE_CHUNK_SIZE, level=3):
+    """
+    Compress `src_path` into `dst_path` using independent frames of `frame_size` bytes.
+    Returns (raw_size, compressed_size).
+    """
+    cctx = _zstd().ZstdCompressor(level=level)
+    entries = []
+    raw_size = 0
+    tmp_path = dst_path + ".tmp"
+    with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+        while True:
+            chunk = src.read(frame_size)
+            if not chunk:
+                break
+            frame = cctx.compress(chunk)
+            dst.write(frame)
+            entries.append((len(frame), len(chunk)))
+            raw_size += len(chunk)
+
+        table = b"".join(_ENTRY.pack(c, d) for c, d in entries)
+        footer = _FOOTER.pack(len(entries), 0, _SEEKABLE_MAGIC)
+        dst.write(struct.pack("<II", _SKIPPABLE_MAGIC, len(table) + len(footer)))
+        dst.write(table)
+        dst.write(footer)
+    os.replace(tmp_path, dst_path)
+    return raw_size, os.path.getsize(dst_path)
+
+
+def read_seek_table(f):
+    """ Return [(compressed_offset, raw_offset, compressed_size, raw_size), ...] for an open blob """
+    f.seek(-_FOOTER.size, os.SEEK_END)
+    num_frames, descriptor, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != _SEEKABLE_MAGIC:
+        raise ValueError("not a seekable zstd blob")
+    entry_size = _ENTRY.size + (4 if descriptor & 0x80 else 0)  # optional per-frame checksum
+    f.seek(-(_FOOTER.size + num_frames * entry_size), os.SEEK_END)
+    raw_table = f.read(num_frames * entry_size)
+
+    frames = []
+    c_off = r_off = 0
+    for i in range(num_frames):
+        c_size, r_size = _ENTRY.unpack_from(raw_table, i * entry_size)
+        frames.append((c_off, r_off, c_size, r_size))
+        c_off += c_size
+        r_off += r_size
+    return frames
+
+
+class SeekableBlobReader(io.RawIOBase):
+    """
+    File-like reader over the uncompressed content of a seekable zstd blob.
+    Only frames touched by read() are decompressed (the last one is cached).
+    """
+
+    def __init__(self, path_or_file):
+        super().__init__()
+        # a path, or any seekable binary file object (e.g. a remote ranged reader)
+        self._f = open(path_or_file, "rb") if isinstance(path_or_file, str) else path_or_file
+        self._frames = read_seek_table(self._f)
+        self._size = self._frames[-1][1] + self._frames[-1][3] if self._frames else 0
+        self._raw_starts = [fr[1] for fr in self._frames]
+        self._dctx = _zstd().ZstdDecompressor()
+        self._pos = 0
+        self._cached = (None, b"")
+
+    @property
+    def size(self):
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def _frame(self, i):
+        if self._cached[0] != i:
+            c_off, _, c_size, r_size = self._frames[i]
+            self._f.seek(c_off)
+            data = self._dctx.decompress(self._f.read(c_size), max_output_size=r_size)
+            self._cached = (i, data)
+        return self._cached[1]
+
+    def readinto(self, b):
+        if self._pos >= self._size or not len(b):
+            return 0
+        i = bisect_right(self._raw_starts, self._pos) - 1
+        data = self._frame(i)
+        start = self._pos - self._frames[i][1]
+        n = min(len(b), len(data) - start)
+        b[:n] = data[start:start + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+def open_blob(path):
+    """ Open a stored blob for reading its uncompressed bytes (buffered, seekable) """
+    if is_compressed(path):
+        return io.BufferedReader(SeekableBlobReader(path), buffer_size=64 * 1024)
+    return open(path, "rb")
+
+
+def blob_size(path):
+    """ Uncompressed size of a stored blob """
+    if is_compressed(path):
+        with open(path, "rb") as f:
+            frames = read_seek_table(f)
+        return frames[-1][1] + frames[-1][3] if frames else 0
+    return os.path.getsize(path)
+
+
+def read_range(path, offset, length):
+    """ Read `length` uncompressed bytes starting at `offset` """
+    with open_blob(path) as f:
+        f.seek(offset)
+        return f.read(length)
@@ -0,0 +1,265 @@
+# backend/utils/dataset_index.py
+import os
+import csv
+import hashlib
+import json
+import mmap
+import random
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+from backend.constants import UPLOAD_FOLDER
+from backend.utils.compressed_blob import logical_path, open_blob
+from backend.utils.storage_backends import delete_uri, local_path, open_uri, stat_uri
+
+# formate citite linie cu linie (un rand = o linie)
+LINE_FORMATS = {"csv", "tsv", "txt", "jsonl", "ndjson", "json"}
+COLUMNAR_FORMATS = {"parquet"}
+
+DEFAULT_STRIDE = 256
+INDEX_SUFFIX = ".rowidx"
+# local copies of the row indexes of datasets kept in remote storage (s3://)
+INDEX_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, "index_cache")
+
+# header: magic, stride, row_count, data_start (offset dupa headerul CSV)
+_MAGIC = b"RIDX1\0"
+_HEADER = struct.Struct("<6sIQQ")
+_OFFSET = struct.Struct("<Q")
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def _open(source):
+    # `source` is either a local path or a storage uri
+    return open_uri(source) if "://" in source else open_blob(source)
+
+
+def _remote_index_uri(source):
+    """ Storage uri of the index sidecar for remote datasets (None for local ones) """
+    if "://" in source and local_path(source) is None:
+        return logical_path(source) + INDEX_SUFFIX
+    return None
+
+
+def detect_format(path):
+    """ Return the dataset format from the file extension (or None); `path` may be a storage uri """
+    name = os.path.basename(logical_path(path))
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if ext == "json":
+        # .json is only line based when it is really JSON lines, not one big array
+        with _open(path) as f:
+            first = f.readline().strip()
+        try:
+            return "jsonl" if isinstance(json.loads(first), dict) else None
+        except Exception:
+            return None
+    if ext in LINE_FORMATS or ext in COLUMNAR_FORMATS:
+        return ext
+    return None
+
+
+def index_path_for(path):
+    """ Local path of the row index for a dataset path / storage uri """
+    remote = _remote_index_uri(path)
+    if remote:
+        return os.path.join(INDEX_CACHE_FOLDER, hashlib.sha256(remote.encode("utf-8")).hexdigest() + INDEX_SUFFIX)
+    return logical_path(local_path(path) if "://" in path else path) + INDEX_SUFFIX
+
+
+def build_row_index(path, fmt, stride=DEFAULT_STRIDE):
+    """
+    Build a sparse row-offset index for a line based file: the byte offset
+    of every `stride`-th row is stored, so any row can be reached with one
+    seek plus at most `stride - 1` skipped lines.
+    Returns the number of indexed rows.
+    """
+    offsets = array("Q")
+    row_count = 0
+    with _open(path) as f:
+        if fmt in ("csv", "tsv"):
+            f.readline()  # header row is not a data row
+        data_start = f.tell()
+        pos = data_start
+        for line in f:
+            if row_count % stride == 0:
+                offsets.append(pos)
+            pos += len(line)
+            row_count += 1
+
+    if sys.byteorder == "big":
+        offsets.byteswap()  # the index file is always little-endian
+
+    tmp_path = index_path_for(path) + ".tmp"
+    os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, stride, row_count, data_start))
+        offsets.tofile(out)
+    os.replace(tmp_path, index_path_for(path))
+    return row_count
+
+
+class RowIndex:
+    """ Read-only view over a `.rowidx` file (mmap, O(1) per lookup) """
+
+    def __init__(self, index_path):
+        self._file = open(index_path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("empty row index")
+        magic, self.stride, self.row_count, self.data_start = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError("invalid row index file")
+
+    def block_offset(self, block):
+        return _OFFSET.unpack_from(self._mm, _HEADER.size + block * _OFFSET.size)[0]
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_row_index(path, fmt, stride=DEFAULT_STRIDE):
+    """ Open the row index for `path`, building it first for files uploaded before indexing existed """
+    idx_path = index_path_for(path)
+    if not os.path.exists(idx_path):
+        remote = _remote_index_uri(path)
+        if remote and stat_uri(remote) is not None:
+            # fetch the sidecar stored next to the remote blob once, then mmap the local copy
+            os.makedirs(INDEX_CACHE_FOLDER, exist_ok=True)
+            tmp_path = f"{idx_path}.{os.getpid()}.tmp"
+            with open_uri(remote) as src, open(tmp_path, "wb") as out:
+                while True:
+                    block = src.read(1024 * 1024)
+                    if not block:
+                        break
+                    out.write(block)
+            os.replace(tmp_path, idx_path)
+        else:
+            build_row_index(path, fmt, stride)
+    return RowIndex(idx_path)
+
+
+def delete_row_index(path):
+    """ Remove the row index of a dataset (local sidecar, cached copy and remote sidecar) """
+    idx_path = index_path_for(path)
+    if os.path.exists(idx_path):
+        os.remove(idx_path)
+    remote = _remote_index_uri(path)
+    if remote:
+        delete_uri(remote)
+
+
+def _read_lines(path, index, row_numbers):
+    """ Yield raw lines for sorted `row_numbers`, seeking via the sparse index """
+    with _open(path) as f:
+        cur_row = None  # row number the file is currently positioned at
+        for r in row_numbers:
+            block = r // index.stride
+            if cur_row is None or r < cur_row or cur_row // index.stride != block:
+                f.seek(index.block_offset(block))
+                cur_row = block * index.stride
+            while cur_row < r:
+                f.readline()
+                cur_row += 1
+            line = f.readline()
+            cur_row += 1
+            yield line
+
+
+def _csv_header(path, delimiter):
+    with _open(path) as f:
+        first = f.readline().decode("utf-8", errors="replace").rstrip("\r\n")
+    return next(csv.reader([first], delimiter=delimiter), [])
+
+
+def _decode_line(raw, fmt):
+    text = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+    if fmt in ("csv", "tsv"):
+        return next(csv.reader([text], delimiter="\t" if fmt == "tsv" else ","), [])
+    if fmt in ("jsonl", "ndjson"):
+        try:
+            return json.loads(text)
+        except Exception:
+            return text
+    return text
+
+
+def _line_rows(path, fmt, row_numbers_fn, stride):
+    with open_row_index(path, fmt, stride) as index:
+        row_numbers = row_numbers_fn(index.row_count)
+        rows = [_decode_line(raw, fmt) for raw in _read_lines(path, index, row_numbers)]
+        result = {"format": fmt, "row_count": index.row_count, "rows": rows}
+    if fmt in ("csv", "tsv"):
+        result["columns"] = _csv_header(path, "\t" if fmt == "tsv" else ",")
+    return result, row_numbers
+
+
+def _parquet_file(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise UnsupportedFormat("pyarrow is required to preview parquet datasets")
+    return pq.ParquetFile(_open(path))
+
+
+def preview_rows(path, rows, stride=DEFAULT_STRIDE):
+    """ Return the first `rows` rows of a dataset """
+    fmt = detect_format(path)
+    if fmt in COLUMNAR_FORMATS:
+        pf = _parquet_file(path)
+        batch = next(pf.iter_batches(batch_size=max(rows, 1)), None)
+        data = batch.to_pylist()[:rows] if batch is not None else []
+        return {"format": fmt, "row_count": pf.metadata.num_rows,
+                "columns": pf.schema_arrow.names, "rows": data}
+    if fmt is None:
+        raise UnsupportedFormat("preview is not supported for this file format")
+    result, _ = _line_rows(path, fmt, lambda total: range(min(rows, total)), stride)
+    return result
+
+
+def sample_rows(path, n, seed, stride=DEFAULT_STRIDE):
+    """
+    Return a reproducible random sample of `n` rows (same seed -> same rows).
+    Line formats seek through the sparse index, parquet only reads the row
+    groups that contain sampled rows.
+    """
+    rng = random.Random(seed)
+    fmt = detect_format(path)
+    if fmt in COLUMNAR_FORMATS:
+        pf = _parquet_file(path)
+        md = pf.metadata
+        starts, total = [], 0
+        for i in range(md.num_row_groups):
+            starts.append(total)
+            total += md.row_group(i).num_rows
+        picks = sorted(rng.sample(range(total), min(n, total)))
+        by_group = {}
+        for r in picks:
+            g = bisect_right(starts, r) - 1
+            by_group.setdefault(g, []).append(r - starts[g])
+        data = []
+        for g, local in sorted(by_group.items()):
+            data.extend(pf.read_row_group(g).take(local).to_pylist())
+        return {"format": fmt, "row_count": total, "columns": pf.schema_arrow.names,
+                "rows": data, "row_numbers": picks, "seed": seed}
+    if fmt is None:
+        raise UnsupportedFormat("sampling is not supported for this file format")
+    result, picks = _line_rows(
+        path, fmt, lambda total: sorted(rng.sample(range(total), min(n, total))), stride
+    )
+    result["row_numbers"] = picks
+    result["seed"] = seed
+    return result
@@ -0,0 +1,168 @@
+# backend/utils/hash_cache.py
+# Persistent memo of file digests (sha256 + merkle leaves), so hashing a file
+# that was hashed before costs a stat() instead of a full read. Entries are
+# keyed by file identity (device, inode, size, mtime_ns). A file with a new
+# identity (e.g. the same bytes uploaded again) is looked up by a fingerprint
+# of its size and first / last 64 KiB: on a match only its sha256 is computed,
+# and the stored merkle leaves are reused once that digest confirms the match.
+# Entries live in a SQLite file shared by the workers; the least recently used
+# ones are evicted past HASH_CACHE_MAX_ENTRIES.
+# Meant for "what did these bytes hash to"; the integrity scrubber must keep
+# reading the bytes (bit rot does not change mtime).
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from backend.constants import UPLOAD_FOLDER
+from backend.metrics import observe_hash_cache
+
+LEAF_SIZE = 4 * 1024 * 1024             # same leaf size as merkle_root_from_file
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def identity_key(st):
+    return f"id:{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def fingerprint_key(path, size):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            h.update(f.read(FINGERPRINT_BYTES))
+    return f"fp:{size}:{h.hexdigest()}"
+
+
+def hash_file(path, leaf_size=LEAF_SIZE, leaves=True):
+    """ (sha256 hex, leaf digests or None) in one read of the file """
+    sha = hashlib.sha256()
+    digests = [] if leaves else None
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(leaf_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+            if leaves:
+                digests.append(hashlib.sha256(chunk).digest())
+    return sha.hexdigest(), digests
+
+
+def _split(blob):
+    return [blob[i:i + 32] for i in range(0, len(blob), 32)]
+
+
+class HashCache:
+    def __init__(self, path, max_entries=100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # opened lazily and per process: a connection must not cross a fork (gunicorn --preload)
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "key TEXT PRIMARY KEY, sha256 TEXT NOT NULL, leaf_size INTEGER NOT NULL, "
+                "leaves BLOB NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS digests_used ON digests (used)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """ (sha256 hex, leaf size, joined leaves) or None; a hit makes the entry most recently used """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT sha256, leaf_size, leaves FROM digests WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE digests SET used = ? WHERE key = ?", (time.time(), key))
+        return None if row is None else (row[0], row[1], bytes(row[2]))
+
+    def put(self, keys, sha256, leaf_size, leaves):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO digests (key, sha256, leaf_size, leaves, used) VALUES (?, ?, ?, ?, ?)",
+                [(key, sha256, leaf_size, b"".join(leaves), now) for key in keys],
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM digests").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM digests WHERE key IN (SELECT key FROM digests ORDER BY used, key LIMIT ?)", (excess,)
+                )
+
+    def remember(self, path, sha256, leaves, leaf_size=LEAF_SIZE):
+        """ Record digests computed elsewhere (e.g. while copying the file) for `path` as it is now """
+        st = os.stat(path)
+        self.put((identity_key(st), fingerprint_key(path, st.st_size)), sha256, leaf_size, leaves)
+
+    def lookup(self, path, leaf_size=LEAF_SIZE):
+        """ (sha256 hex, leaves) when `path` is known by its identity, else None (no read) """
+        hit = self.get(identity_key(os.stat(path)))
+        if hit is not None and hit[1] == leaf_size:
+            observe_hash_cache("hit")
+            return hit[0], _split(hit[2])
+        return None
+
+    def digests(self, path, leaf_size=LEAF_SIZE):
+        """ (sha256 hex, leaves) of `path`: a stat() on a hit, one read otherwise """
+        st = os.stat(path)
+        key = identity_key(st)
+        hit = self.get(key)
+        if hit is not None and hit[1] == leaf_size:
+            observe_hash_cache("hit")
+            return hit[0], _split(hit[2])
+
+        fingerprint = fingerprint_key(path, st.st_size)
+        candidate = self.get(fingerprint)
+        if candidate is not None and candidate[1] == leaf_size:
+            sha256, _ = hash_file(path, leaf_size, leaves=False)
+            if sha256 == candidate[0]:
+                observe_hash_cache("fingerprint_hit")
+                self._store(path, key, fingerprint, sha256, leaf_size, _split(candidate[2]))
+                return sha256, _split(candidate[2])
+
+        observe_hash_cache("miss")
+        sha256, leaves = hash_file(path, leaf_size)
+        self._store(path, key, fingerprint, sha256, leaf_size, leaves)
+        return sha256, leaves
+
+    def _store(self, path, key, fingerprint, sha256, leaf_size, leaves):
+        # a file changed while it was read: the digests match neither its old nor its new bytes
+        if identity_key(os.stat(path)) == key:
+            self.put((key, fingerprint), sha256, leaf_size, leaves)
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM digests")
+
+
+_cache = None
+
+
+def configure(config):
+    """ Set up the process-wide cache from the app config (HASH_CACHE_ENABLED / _FILE / _MAX_ENTRIES) """
+    global _cache
+    if not config.get("HASH_CACHE_ENABLED", True):
+        _cache = None
+        return None
+    path = config.get("HASH_CACHE_FILE") or os.path.join(UPLOAD_FOLDER, ".hashcache")
+    _cache = HashCache(path, config.get("HASH_CACHE_MAX_ENTRIES", 100_000))
+    return _cache
+
+
+def get_cache():
+    """ The configured cache, None when hashing should always read (disabled / no app, e.g. benchmarks) """
+    return _cache
@@ -1,16 +1,23 @@
 # backend/utils/hash_utils.py
 import hashlib
-import torch
 import numpy as np
+from backend.utils.hash_cache import get_cache
+from backend.utils.model_card import ModelCard
+try:
+    import torch
+except ImportError:
+    # only needed for canonical hashes of torch checkpoints; merkle helpers work without it
+    torch = None
 
-def tensor_to_bytes(tensor: torch.Tensor) -> bytes:
+def tensor_to_bytes(tensor: "torch.Tensor") -> bytes:
     arr = tensor.detach().cpu().numpy()
     # ensure little-endian
     if arr.dtype.byteorder == '>':
         arr = arr.byteswap().newbyteorder()
     return arr.tobytes()
 
-def canonical_state_dict_hash(model_or_state_dict) -> str:
+# pass a dict as `card_out` to also get the model card (architecture summary) built in the same pass
+def canonical_state_dict_hash(model_or_state_dict, card_out=None) -> str:
     if hasattr(model_or_state_dict, "state_dict"):
         sd = model_or_state_dict.state_dict()
     else:
@@ -18,6 +25,7 @@ def canonical_state_dict_hash(model_or_state_dict) -> str:
 
     keys = sorted(sd.keys())
     h = hashlib.sha256()
+    card = ModelCard() if card_out is not None else None
     for k in keys:
         v = sd[k]
         h.update(k.encode('utf-8') + b'\0')
@@ -26,10 +34,18 @@ def canonical_state_dict_hash(model_or_state_dict) -> str:
         dtype_bytes = str(v.dtype).encode('utf-8')
         h.update(dtype_bytes + b'\0')
         h.update(tensor_to_bytes(v))
+        if card is not None:
+            card.add(k, v.shape, v.dtype, v.numel() * v.element_size())
+    if card_out is not None:
+        card_out.update(card.as_dict())
     return h.hexdigest()
 
 # streaming sha256 for big files
 def file_sha256_stream(path, chunk_size=4*1024*1024):
+    cache = get_cache()
+    if cache is not None:
+        # also records the merkle leaves, so merkle_root_from_file right after is a stat()
+        return cache.digests(path)[0]
     h = hashlib.sha256()
     with open(path, "rb") as f:
         while True:
@@ -40,18 +56,27 @@ def file_sha256_stream(path, chunk_size=4*1024*1024):
     return h.hexdigest()
 
 # build merkle root from file by chunking (returns hex)
-def merkle_root_from_file(path, chunk_size=4*1024*1024):
-    import math
+# pass a list as `leaves_out` to also get the leaf digests (stored for incremental verification)
+def merkle_root_from_file(path, chunk_size=4*1024*1024, leaves_out=None):
+    cache = get_cache()
+    if cache is not None:
+        leaves = cache.digests(path, chunk_size)[1]
+    else:
+        leaves = []
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                leaves.append(hashlib.sha256(chunk).digest())
+    if leaves_out is not None:
+        leaves_out.extend(leaves)
+    return merkle_root_from_leaves(leaves)
+
+def merkle_root_from_leaves(leaves):
     def sha256_bytes(b):
         return hashlib.sha256(b).digest()
 
-    leaves = []
-    with open(path, "rb") as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-            leaves.append(sha256_bytes(chunk))
     if not leaves:
         # empty file
         return hashlib.sha256(b"").hexdigest()
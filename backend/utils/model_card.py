@@ -0,0 +1,69 @@
+# backend/utils/model_card.py
+# Compact architecture summary of a state dict (model card), fed one tensor at a
+# time by whatever pass already walks the weights (canonical hash, safetensors
+# conversion), so it never costs an extra read of the checkpoint.
+import heapq
+
+TREE_DEPTH = 2      # levels of the module tree kept (e.g. "encoder" -> "layers")
+LARGEST = 5         # largest tensors listed
+
+
+class ModelCard:
+    def __init__(self, tree_depth=TREE_DEPTH, largest=LARGEST):
+        self.tree_depth = tree_depth
+        self.largest_n = largest
+        self.tensors = 0
+        self.parameters = 0
+        self.bytes = 0
+        self.dtypes = {}
+        self.tree = {}
+        self._largest = []   # min-heap of (parameters, name, shape, dtype)
+
+    def add(self, name, shape, dtype, nbytes):
+        """ Account one tensor; `dtype` like "float32" (torch. prefix stripped) """
+        dtype = str(dtype).replace("torch.", "")
+        shape = [int(d) for d in shape]
+        numel = 1
+        for d in shape:
+            numel *= d
+
+        self.tensors += 1
+        self.parameters += numel
+        self.bytes += nbytes
+        entry = self.dtypes.setdefault(dtype, {"tensors": 0, "parameters": 0})
+        entry["tensors"] += 1
+        entry["parameters"] += numel
+
+        # "encoder.layers.0.weight" -> encoder -> layers (the leaf itself is not a module)
+        level = self.tree
+        for part in name.split(".")[:-1][:self.tree_depth]:
+            node = level.setdefault(part, {"tensors": 0, "parameters": 0, "children": {}})
+            node["tensors"] += 1
+            node["parameters"] += numel
+            level = node["children"]
+
+        item = (numel, name, shape, dtype)
+        if len(self._largest) < self.largest_n:
+            heapq.heappush(self._largest, item)
+        elif item > self._largest[0]:
+            heapq.heapreplace(self._largest, item)
+
+    def as_dict(self):
+        def prune(level):
+            return {
+                name: {"tensors": node["tensors"], "parameters": node["parameters"],
+                       **({"children": prune(node["children"])} if node["children"] else {})}
+                for name, node in sorted(level.items())
+            }
+
+        return {
+            "tensors": self.tensors,
+            "parameters": self.parameters,
+            "bytes": self.bytes,
+            "dtypes": dict(sorted(self.dtypes.items())),
+            "modules": prune(self.tree),
+            "largest": [
+                {"name": name, "shape": shape, "dtype": dtype, "parameters": numel}
+                for numel, name, shape, dtype in sorted(self._largest, reverse=True)
+            ],
+        }
@@ -0,0 +1,335 @@
+# backend/utils/storage_backends.py
+# Pluggable storage for uploaded artifacts. Every backend owns one URI scheme
+# (file://, s3://) and supports put-stream, ranged get, delete and stat, so the
+# rest of the code only deals with `storage_uri` values.
+import io
+import os
+import shutil
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.constants import UPLOAD_FOLDER
+from backend.utils.compressed_blob import SeekableBlobReader, is_compressed
+
+BlobStat = namedtuple("BlobStat", ["size", "etag"])
+
+# what a read of stored bytes can raise: a missing file / chunk, or the S3 client's errors
+try:
+    from botocore.exceptions import BotoCoreError, ClientError
+    READ_ERRORS = (OSError, BotoCoreError, ClientError)
+except ImportError:
+    READ_ERRORS = (OSError,)
+
+_COPY_BUFFER = 1024 * 1024
+
+
+class StorageBackend:
+    scheme = None
+
+    def put_stream(self, key, stream):
+        """ Store everything read from `stream` under `key`; returns the storage uri """
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        with open(path, "rb") as f:
+            return self.put_stream(key, f)
+
+    def get_range(self, uri, offset=0, length=None):
+        """ Return `length` bytes starting at `offset` (until the end if length is None) """
+        raise NotImplementedError
+
+    def delete(self, uri):
+        raise NotImplementedError
+
+    def stat(self, uri):
+        """ Return BlobStat or None when the blob does not exist """
+        raise NotImplementedError
+
+    def open(self, uri):
+        """ Seekable binary reader over the stored bytes """
+        return io.BufferedReader(RangedReader(self, uri), buffer_size=_COPY_BUFFER)
+
+
+class LocalBackend(StorageBackend):
+    """ Files under `root`; uri = file://<absolute path> (same layout the uploads always used) """
+    scheme = "file://"
+
+    def __init__(self, root=UPLOAD_FOLDER):
+        self.root = root
+
+    def path(self, uri):
+        return uri[len(self.scheme):]
+
+    def put_stream(self, key, stream):
+        dest_path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = dest_path + ".part"
+        with open(tmp_path, "wb") as out:
+            shutil.copyfileobj(stream, out, _COPY_BUFFER)
+        os.replace(tmp_path, dest_path)
+        return self.scheme + dest_path
+
+    def put_file(self, key, path):
+        dest_path = os.path.join(self.root, key)
+        if os.path.abspath(path) == os.path.abspath(dest_path):
+            return self.scheme + dest_path  # already staged in place, nothing to copy
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.move(path, dest_path)
+        return self.scheme + dest_path
+
+    def get_range(self, uri, offset=0, length=None):
+        with open(self.path(uri), "rb") as f:
+            f.seek(offset)
+            return f.read() if length is None else f.read(length)
+
+    def delete(self, uri):
+        try:
+            os.remove(self.path(uri))
+        except FileNotFoundError:
+            pass
+
+    def stat(self, uri):
+        try:
+            st = os.stat(self.path(uri))
+        except FileNotFoundError:
+            return None
+        return BlobStat(st.st_size, f"{st.st_mtime_ns:x}-{st.st_size:x}")
+
+    def open(self, uri):
+        return open(self.path(uri), "rb")
+
+
+class S3Backend(StorageBackend):
+    """
+    S3 / S3-compatible (minio, ...) object storage. Large objects are sent as
+    multipart uploads with up to `max_concurrency` parts in flight; the boto3
+    client (and its connection pool) is shared by all requests of the process.
+    """
+    scheme = "s3://"
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region_name=None,
+                 part_size=8 * 1024 * 1024, max_concurrency=8, client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # S3 minimum for non-final parts
+        self.max_concurrency = max(1, max_concurrency)
+        if client is None:
+            import boto3
+            from botocore.config import Config as BotoConfig
+            client = boto3.session.Session().client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region_name,
+                config=BotoConfig(max_pool_connections=self.max_concurrency * 2,
+                                  retries={"max_attempts": 5, "mode": "standard"}),
+            )
+        self.client = client
+
+    def _split(self, uri):
+        bucket, _, key = uri[len(self.scheme):].partition("/")
+        return bucket, key
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put_stream(self, key, stream):
+        key = self._key(key)
+        first = stream.read(self.part_size)
+        nxt = stream.read(self.part_size) if first else b""
+        if not nxt:
+            # fits in one request
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=first)
+            return f"{self.scheme}{self.bucket}/{key}"
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+        # bounded number of parts held in memory / in flight
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+
+        def upload(part_number, data):
+            try:
+                resp = self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                               PartNumber=part_number, Body=data)
+                return {"PartNumber": part_number, "ETag": resp["ETag"]}
+            finally:
+                slots.release()
+
+        try:
+            futures = []
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                part_number, data = 1, first
+                while data:
+                    slots.acquire()
+                    futures.append(pool.submit(upload, part_number, data))
+                    part_number += 1
+                    data, nxt = nxt, (stream.read(self.part_size) if nxt else b"")
+            parts = [f.result() for f in futures]
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                                  MultipartUpload={"Parts": parts})
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        return f"{self.scheme}{self.bucket}/{key}"
+
+    def get_range(self, uri, offset=0, length=None):
+        bucket, key = self._split(uri)
+        if length is not None and length <= 0:
+            return b""
+        byte_range = f"bytes={offset}-" if length is None else f"bytes={offset}-{offset + length - 1}"
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.client.get_object(Bucket=bucket, Key=key, Range=byte_range)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                return b""  # offset past the end
+            raise
+        return resp["Body"].read()
+
+    def delete(self, uri):
+        bucket, key = self._split(uri)
+        self.client.delete_object(Bucket=bucket, Key=key)
+
+    def stat(self, uri):
+        bucket, key = self._split(uri)
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return BlobStat(resp["ContentLength"], resp.get("ETag", "").strip('"'))
+
+
+class RangedReader(io.RawIOBase):
+    """ Seekable raw reader implemented with backend ranged gets (used for remote blobs) """
+
+    def __init__(self, backend, uri):
+        super().__init__()
+        self._backend = backend
+        self._uri = uri
+        st = backend.stat(uri)
+        if st is None:
+            raise FileNotFoundError(uri)
+        self._size = st.size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b):
+        if self._pos >= self._size or not len(b):
+            return 0
+        n = min(len(b), self._size - self._pos)
+        data = self._backend.get_range(self._uri, self._pos, n)
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def _config():
+    try:
+        from flask import current_app
+        return current_app.config
+    except RuntimeError:
+        return {}  # outside an app context (scripts / benchmarks)
+
+
+def _s3_backend(config):
+    settings = (
+        config.get("S3_BUCKET"),
+        config.get("S3_PREFIX", ""),
+        config.get("S3_ENDPOINT_URL"),
+        config.get("S3_REGION"),
+        config.get("S3_PART_SIZE", 8 * 1024 * 1024),
+        config.get("S3_MAX_CONCURRENCY", 8),
+    )
+    with _lock:
+        backend = _backends.get(settings)
+        if backend is None:
+            if not settings[0]:
+                raise RuntimeError("S3_BUCKET is not configured")
+            backend = _backends[settings] = S3Backend(*settings)
+    return backend
+
+
+def default_backend():
+    """ Backend new uploads are published to (STORAGE_BACKEND = local | s3) """
+    config = _config()
+    if config.get("STORAGE_BACKEND", "local") == "s3":
+        return _s3_backend(config)
+    return LocalBackend()
+
+
+def backend_for_uri(uri):
+    if uri.startswith(LocalBackend.scheme):
+        return LocalBackend()
+    if uri.startswith(S3Backend.scheme):
+        return _s3_backend(_config())
+    raise ValueError(f"Unsupported storage uri: {uri}")
+
+
+def local_path(uri):
+    """ Filesystem path for file:// uris, None for remote storage """
+    if uri and uri.startswith(LocalBackend.scheme):
+        return uri[len(LocalBackend.scheme):]
+    return None
+
+
+def publish_file(path, key):
+    """ Move a staged upload into the configured backend; returns the storage uri """
+    backend = default_backend()
+    uri = backend.put_file(key, path)
+    if not isinstance(backend, LocalBackend) and os.path.exists(path):
+        os.remove(path)
+    return uri
+
+
+def _chunk_store():
+    from backend.constants import CHUNK_STORE_FOLDER
+    from backend.utils.chunk_store import ChunkStore
+    return ChunkStore(CHUNK_STORE_FOLDER)
+
+
+def open_uri(uri):
+    """ Seekable reader over the logical (uncompressed) content behind a storage uri """
+    if uri.startswith("cas://"):
+        # deduplicated model: reassembled from the shared chunk store
+        return _chunk_store().open(uri[len("cas://"):])
+    backend = backend_for_uri(uri)
+    raw = backend.open(uri)
+    if is_compressed(uri):
+        return io.BufferedReader(SeekableBlobReader(raw), buffer_size=64 * 1024)
+    return raw
+
+
+def stat_uri(uri):
+    if uri.startswith("cas://"):
+        try:
+            manifest = _chunk_store().read_manifest(uri[len("cas://"):])
+        except FileNotFoundError:
+            return None
+        return BlobStat(manifest["size"], uri[len("cas://"):])
+    return backend_for_uri(uri).stat(uri)
+
+
+def delete_uri(uri):
+    backend_for_uri(uri).delete(uri)
@@ -0,0 +1,42 @@
+// Local stand-in for register_model.js / rent_model.js (load tests, offline dev).
+// Same arguments and JSON output as the real clients, no validator needed:
+//   REGISTER_MODEL_CLI=blockchain/clients/local_chain_standin.js
+//   RENT_MODEL_CLI=blockchain/clients/local_chain_standin.js
+// CHAIN_STANDIN_LATENCY_MS simulates the confirmation time (default 400 ms),
+// CHAIN_STANDIN_FAIL_RATE makes a fraction of the calls fail (default 0).
+import crypto from "crypto";
+
+function exitJSON(obj, code = 0) {
+  console.log(JSON.stringify(obj));
+  process.exit(code);
+}
+
+function fakeBase58(seed) {
+  const alphabet = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz";
+  const digest = crypto.createHash("sha256").update(seed).digest();
+  let out = "";
+  for (const b of digest) out += alphabet[b % alphabet.length];
+  return out + out.slice(0, 12);
+}
+
+const argv = process.argv.slice(2);
+if (argv.length < 1 || !/^[0-9a-fA-F]{64}$/.test(argv[0])) {
+  exitJSON({ success: false, error: "Usage: local_chain_standin.js <model_hash_hex> [storage_uri price_lamports]" }, 1);
+}
+
+const latency = parseInt(process.env.CHAIN_STANDIN_LATENCY_MS || "400", 10);
+const failRate = parseFloat(process.env.CHAIN_STANDIN_FAIL_RATE || "0");
+const isRegister = argv.length >= 3;
+
+setTimeout(() => {
+  if (Math.random() < failRate) {
+    exitJSON({ success: false, error: "stand-in: simulated transaction failure" }, 1);
+  }
+  const txid = fakeBase58(`${argv[0]}:${Date.now()}:${Math.random()}`).slice(0, 88);
+  const modelPda = fakeBase58(`model:${argv[0]}`).slice(0, 44);
+  if (isRegister) {
+    exitJSON({ success: true, txid, model_pda: modelPda, program_id: "LocalStandin1111111111111111111111111111111", wallet: "standin" });
+  } else {
+    exitJSON({ success: true, txid, model_pda: modelPda, renter: "standin", uploader: "standin" });
+  }
+}, latency);
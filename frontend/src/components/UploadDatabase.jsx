@@ -18,12 +18,13 @@ export default function UploadDatabase({ token }) {
     if (!file) { setError("Select a file"); return; }
 
     const formData = new FormData();
-    formData.append("file", file);
     formData.append("name", name);
     formData.append("description", description);
     formData.append("model_name", modelName);
     formData.append("purpose", purpose);
     formData.append("user_id", 1);
+    // metadata first: the server validates it before the file is streamed
+    formData.append("file", file);
 
     try {
       const res = await fetch("http://127.0.0.1:5001/databases/databases/upload", {
@@ -19,11 +19,12 @@ export default function UploadModel({ token }) {
     }
 
     const formData = new FormData();
-    formData.append("file", file);
     formData.append("name", name);
     formData.append("description", description);
     formData.append("price_lamports", price);
     if (walletPath) formData.append("uploader_wallet_path", walletPath);
+    // metadata first: the server validates it before the file is streamed
+    formData.append("file", file);
 
     setStatus("Uploading...");
 